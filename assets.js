@@ -0,0 +1,92 @@
+// 资源加载：按 assets.json 分级下载（assets.json 由 tools/gen_manifest.py 从 assets.py 生成，别手改）
+//   critical  菜单出现前必须有
+//   gameplay  开局前要有；启动 Pyodide 的同时在后台下载，开始按钮等它
+//   optional  不预加载，main.py 的 lazy_sprite() 用到时才下载
+// 下载结果放在 PRELOADED_IMAGES / PRELOADED_AUDIO（以路径为键），main.py 的 _to_img 从这里取图。
+// tools/build_sprites.py 缩好的贴图在清单里是 src = 构建产物、orig = assets.py 里的路径：
+// 下载产物，但仍以 orig 为键登记；SPRITE_BUILD（orig -> 清单条目）给 _to_img 按需加载和拆帧用。
+(function (root) {
+  "use strict";
+  root.PRELOADED_IMAGES = root.PRELOADED_IMAGES || {};
+  root.PRELOADED_AUDIO = root.PRELOADED_AUDIO || {};
+  root.SPRITE_BUILD = root.SPRITE_BUILD || new Map();
+  let manifestPromise = null;
+
+  function manifest() {
+    if (!manifestPromise) {
+      manifestPromise = fetch("assets.json").then(r => {
+        if (!r.ok) throw new Error("assets.json: " + r.status);
+        return r.json();
+      }).then(m => {
+        m.assets.forEach(a => { if (a.orig) root.SPRITE_BUILD.set(a.orig, a); });
+        return m;
+      });
+    }
+    return manifestPromise;
+  }
+
+  function loadImage(item) {
+    const key = item.orig || item.src;
+    return new Promise(res => {
+      const img = new Image();
+      // 先占位：加载中就被 main.py 取走的也是这张图，不会再下载一遍
+      root.PRELOADED_IMAGES[key] = img;
+      img.onload = () => res(true);
+      let retried = false;
+      img.onerror = () => {
+        if (item.orig && !retried) {
+          retried = true;
+          // 构建产物取不到：退回原图，也就不再是帧序列图
+          console.warn("Built sprite failed to load, using the original:", item.src);
+          root.SPRITE_BUILD.delete(item.orig);
+          img.src = item.orig;
+          return;
+        }
+        console.warn("Image failed to load:", key);
+        root.PRELOADED_IMAGES[key] = null;
+        res(false);
+      };
+      img.src = item.src;
+    });
+  }
+
+  function loadSound(src) {
+    return new Promise(res => {
+      try {
+        const a = new Audio();
+        a.preload = "auto";
+        a.src = src;
+        let resolved = false;
+        function doResolve(ok) {
+          if (resolved) return;
+          resolved = true;
+          root.PRELOADED_AUDIO[src] = ok ? a : null;
+          res(ok);
+        }
+        a.oncanplaythrough = () => doResolve(true);
+        a.onerror = () => doResolve(false);
+        setTimeout(() => doResolve(false), 1200);
+      } catch (e) {
+        console.warn("Audio preload error:", e);
+        root.PRELOADED_AUDIO[src] = null;
+        res(false);
+      }
+    });
+  }
+
+  // 下载某一级的全部资源；onProgress(done, total, bytesDone, bytesTotal) 每完成一个调用一次
+  async function loadTier(tier, onProgress) {
+    const m = await manifest();
+    const items = m.assets.filter(a => a.tier === tier);
+    const bytesTotal = items.reduce((s, a) => s + (a.bytes || 0), 0);
+    let done = 0, bytesDone = 0;
+    await Promise.all(items.map(a => (a.kind === "image" ? loadImage(a) : loadSound(a.src)).then(() => {
+      done++;
+      bytesDone += a.bytes || 0;
+      if (onProgress) onProgress(done, items.length, bytesDone, bytesTotal);
+    })));
+    return items.length;
+  }
+
+  root.StormAssets = { manifest, loadTier };
+})(window);
@@ -0,0 +1,171 @@
+"""Asset table: every image and sound the game loads, with its load tier.
+
+This is the single source of truth.  main.py builds its sprites and sounds
+from it, and ``tools/gen_manifest.py`` turns it into ``assets.json`` for the
+loader in index.html (assets.js), so the two can no longer drift apart.
+
+Tiers:
+
+``critical``  needed to show the menu; boot waits for these.
+``gameplay``  needed once a run starts; loaded in the background while
+              Pyodide boots, and the start button waits for them.
+``optional``  never preloaded.  FX sprites behind disabled flags, fallback
+              art and unused aliases; main.lazy_sprite() loads one on first use.
+"""
+IMG_BASE = "./img"
+SND_BASE = "./sound"
+
+CRITICAL = "critical"
+GAMEPLAY = "gameplay"
+OPTIONAL = "optional"
+TIERS = (CRITICAL, GAMEPLAY, OPTIONAL)
+
+# 首选命名
+SPRITES = {
+    "player_blue":  f"{IMG_BASE}/blue_plane.png",
+    "player_red":   f"{IMG_BASE}/red_plane.png",
+    "player_purple":f"{IMG_BASE}/purple_plane.png",
+    "enemy_small":  f"{IMG_BASE}/small_enemy.png",
+    "enemy_big":    f"{IMG_BASE}/big_enemy.png",
+    "enemy_medium": f"{IMG_BASE}/middle_enemy.png",
+    "boss":         f"{IMG_BASE}/boss_enemy.png",
+    "boss_crazy":   f"{IMG_BASE}/bossplane_crazy.png",
+    "boss_bomb":    f"{IMG_BASE}/bossplane_bomb.png",
+    "bullet_red":   f"{IMG_BASE}/red_bullet.png",
+    "bullet_blue":  f"{IMG_BASE}/blue_bullet.png",
+    "enemy_bullet": f"{IMG_BASE}/big_enemy_bullet.png",
+    "explosion":    f"{IMG_BASE}/boom.png",
+    "power_weapon": f"{IMG_BASE}/bullet_goods1.png",
+    "power_shield": f"{IMG_BASE}/plane_shield.png",
+    "power_heal":   f"{IMG_BASE}/life_goods.png",
+    "power_missile":f"{IMG_BASE}/missile_goods.png",
+    "text":         f"{IMG_BASE}/text.png",
+    "boss_bullet_default": f"{IMG_BASE}/boss_bullet_default.png",
+    "boss_bullet_triangle": f"{IMG_BASE}/boss_bullet_triangle.png",
+    "boss_bullet_thunderball_red": f"{IMG_BASE}/boss_bullet_thunderball_red.png",
+    "boss_bullet_thunderball_green": f"{IMG_BASE}/boss_bullet_thunderball_green.png",
+    "boss_bullet_hellfire_red": f"{IMG_BASE}/boss_bullet_hellfire_red.png",
+    "boss_bullet_hellfire_yellow": f"{IMG_BASE}/boss_bullet_hellfire_yellow.png",
+    "boss_bullet_sun_particle": f"{IMG_BASE}/boss_bullet_sun_particle.png",
+    # Aliases used by some resource packs
+    "bossbullet_default": f"{IMG_BASE}/bossbullet_default.png",
+    # Player bullet variants
+    "my_bullet_red": f"{IMG_BASE}/my_bullet_red.png",
+    "my_bullet_blue": f"{IMG_BASE}/my_bullet_blue.png",
+    "my_bullet_purple": f"{IMG_BASE}/my_bullet_purple.png",
+    "player_default": f"{IMG_BASE}/myplane.png",
+    "enemy_medium_alt": f"{IMG_BASE}/middle.png",
+    "bullet_purple": f"{IMG_BASE}/purple_bullet.png",
+    "player_single_shooting": f"{IMG_BASE}/blue_shooting.jpg",
+    "player_twin_shooting": f"{IMG_BASE}/red_shooting.gif",
+    "player_spread_shooting": f"{IMG_BASE}/purple_shooting.gif",
+    "enemy_big_shooting": f"{IMG_BASE}/big_enemy_shooting.gif",
+    "boss_pattern_triangle": f"{IMG_BASE}/boss_shooting_triangle.jpg",
+    "boss_pattern_thunder": f"{IMG_BASE}/boss_shooting_thunderball.jpg",
+    "boss_pattern_fire": f"{IMG_BASE}/boss_shooting_fire_array.jpg",
+    "boss_pattern_hellfire": f"{IMG_BASE}/boss_shooting_hellfire.gif",
+    "boss_pattern_sun": f"{IMG_BASE}/boss_shooting_sun_particle.gif",
+    "boss_pattern_pinball": f"{IMG_BASE}/boss_shooting_fire_pinball.jpg",
+    "hud_life_icon": f"{IMG_BASE}/life.png",
+    "hud_life_amount": f"{IMG_BASE}/life_amount.png",
+    "power_missile_btn": f"{IMG_BASE}/missile_bt.png",
+}
+
+# 主图缺失时按顺序尝试的备选图
+SPRITE_FALLBACKS = {
+    "enemy_small":  (f"{IMG_BASE}/small.png",),
+    "enemy_big":    (f"{IMG_BASE}/big.png",),
+    "enemy_medium": (f"{IMG_BASE}/middle.png",),
+    "boss":         (f"{IMG_BASE}/boosplane.png",),
+    "enemy_bullet": (f"{IMG_BASE}/bigplane_bullet.png",),
+    "explosion":    (f"{IMG_BASE}/myplaneexplosion.png",),
+    "player_blue":  (f"{IMG_BASE}/myplane.png", f"{IMG_BASE}/fly.png"),
+    # 备选的武器道具图（存在就换）
+    "power_weapon": (f"{IMG_BASE}/bullet_goods2.png", f"{IMG_BASE}/purple_bullet_goods.png", f"{IMG_BASE}/red_bullet_goods.png"),
+    "power_shield": (f"{IMG_BASE}/plane_shield.png",),
+    "power_heal":   (f"{IMG_BASE}/life_goods.png",),
+    "power_missile":(f"{IMG_BASE}/missile_goods.png", f"{IMG_BASE}/missile_bt.png"),
+}
+
+# 只在 main.py 的 *_FX_ENABLED 开关打开时才画的特效图（几张 GIF 各有数 MB）
+FX_SPRITES = (
+    "player_single_shooting", "player_twin_shooting", "player_spread_shooting",
+    "enemy_big_shooting",
+    "boss_pattern_triangle", "boss_pattern_thunder", "boss_pattern_fire",
+    "boss_pattern_hellfire", "boss_pattern_sun", "boss_pattern_pinball",
+)
+
+# 没有任何代码引用的别名/备用图
+UNUSED_SPRITES = (
+    "boss_bomb", "bullet_red", "bullet_blue", "text", "bossbullet_default",
+    "my_bullet_red", "my_bullet_blue", "my_bullet_purple", "player_default",
+    "enemy_medium_alt", "bullet_purple", "hud_life_icon", "hud_life_amount",
+    "power_missile_btn",
+)
+
+# 每张贴图在游戏里画出来的最大尺寸（CSS px，宽 x 高，见 world.py 的实体尺寸和 main.py 的 draw_*）。
+# tools/build_sprites.py 按它 × 最大渲染分辨率缩图；不在表里的图只重新压缩、不缩小。
+DRAW_SIZES = {
+    "player_blue": (48, 48), "player_red": (48, 48), "player_purple": (48, 48),
+    "enemy_small": (36, 36), "enemy_medium": (48, 48), "enemy_big": (64, 64),
+    "boss": (160, 110), "boss_crazy": (160, 110),
+    "power_weapon": (28, 28), "power_shield": (28, 28), "power_heal": (28, 28), "power_missile": (28, 28),
+    "explosion": (40, 40),
+    "enemy_bullet": (6, 12),
+    "boss_bullet_default": (6, 12), "boss_bullet_triangle": (6, 12), "boss_bullet_sun_particle": (6, 12),
+    "boss_bullet_hellfire_yellow": (10, 10), "boss_bullet_thunderball_red": (10, 12),
+    "boss_bullet_thunderball_green": (11, 12),
+    "player_single_shooting": (56, 30), "player_twin_shooting": (56, 30), "player_spread_shooting": (56, 30),
+    "enemy_big_shooting": (48, 20),
+    "boss_pattern_triangle": (188, 128), "boss_pattern_thunder": (188, 128), "boss_pattern_fire": (188, 128),
+    "boss_pattern_hellfire": (188, 128), "boss_pattern_sun": (188, 128), "boss_pattern_pinball": (188, 128),
+}
+
+SOUNDS = {
+    "shoot":  f"{SND_BASE}/shoot.mp3",
+    "boom":   f"{SND_BASE}/explosion.mp3",
+    "boom2":  f"{SND_BASE}/explosion2.wav",
+    "pickup": f"{SND_BASE}/get_goods.wav",
+    "button": f"{SND_BASE}/button.wav",
+    "bgm":    f"{SND_BASE}/game.mp3",
+    "boom3":  f"{SND_BASE}/explosion3.wav",
+    "bigboom": f"{SND_BASE}/bigexplosion.wav",
+}
+
+# 菜单按钮背景（style.css 引用）和开始按钮音效：菜单出现前就要有
+MENU_IMAGES = (f"{IMG_BASE}/button.png", f"{IMG_BASE}/button2.png", f"{IMG_BASE}/play.png")
+CRITICAL_SOUNDS = ("button",)
+
+
+def sprite_tier(key):
+    if key in FX_SPRITES or key in UNUSED_SPRITES:
+        return OPTIONAL
+    return GAMEPLAY
+
+
+def entries():
+    """(kind, key, src, tier) for every asset, in load order; each src once."""
+    seen = set()
+    out = []
+
+    def add(kind, key, src, tier):
+        if src in seen:
+            return
+        seen.add(src)
+        out.append((kind, key, src, tier))
+
+    for src in MENU_IMAGES:
+        add("image", None, src, CRITICAL)
+    for key in CRITICAL_SOUNDS:
+        add("sound", key, SOUNDS[key], CRITICAL)
+    for key, src in SPRITES.items():
+        if sprite_tier(key) == GAMEPLAY:
+            add("image", key, src, GAMEPLAY)
+    for key, src in SOUNDS.items():
+        add("sound", key, src, GAMEPLAY)
+    for key, src in SPRITES.items():
+        add("image", key, src, OPTIONAL)
+    for key, alts in SPRITE_FALLBACKS.items():
+        for src in alts:
+            add("image", key, src, OPTIONAL)
+    return out
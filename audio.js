@@ -0,0 +1,150 @@
+// 音效引擎：Web Audio 版。音效文件解码一次成 AudioBuffer，播放时只新建一个
+// AudioBufferSourceNode，接到固定数量的“声部”（GainNode）上，不再每次 cloneNode 一个 <audio>。
+//
+//   StormAudio.create()             -> engine；浏览器没有 AudioContext 时返回 null
+//   engine.define(sounds, voices)   sounds: {key: url}，开始下载并解码；voices: {key: 同时最多几个}
+//   engine.play(key, vol)           true 表示已处理（播放，必要时抢占声部；未解锁前直接丢弃）；false 表示还没解码好，调用方自行兜底
+//   engine.music(url, vol)          背景音乐：<audio> 流式播放，经 MediaElementSource 接入同一混音器；返回该 <audio>
+//   engine.resume()                 在用户手势里调用，解除浏览器的自动播放限制
+//
+// 混音：每个声部 gain -> sfx -> master -> destination；music -> master
+(function (root) {
+  "use strict";
+  const MAX_VOICES = 16;        // 同时发声上限，满了抢占最早开始的声部
+  const DEFAULT_POLYPHONY = 4;  // define() 没给上限的 key
+
+  function create(opts) {
+    const AC = root.AudioContext || root.webkitAudioContext;
+    if (!AC) return null;
+    opts = opts || {};
+    const ctx = new AC();
+    const master = ctx.createGain();
+    master.connect(ctx.destination);
+    const sfx = ctx.createGain();
+    sfx.connect(master);
+    const musicGain = ctx.createGain();
+    musicGain.connect(master);
+
+    const voices = [];
+    for (let i = 0; i < (opts.voices || MAX_VOICES); i++) {
+      const gain = ctx.createGain();
+      gain.connect(sfx);
+      voices.push({ gain: gain, src: null, key: null, seq: 0 });
+    }
+    let seq = 0;
+    const buffers = new Map();
+    let limits = {};
+    let bgm = null;
+
+    function decode(key, url) {
+      return fetch(url)
+        .then(r => { if (!r.ok) throw new Error(r.status + " " + url); return r.arrayBuffer(); })
+        .then(data => new Promise((res, rej) => {
+          // 老版 Safari 只支持回调形式
+          const p = ctx.decodeAudioData(data, res, rej);
+          if (p && p.then) p.then(res, rej);
+        }))
+        .then(buf => { buffers.set(key, buf); })
+        .catch(e => console.warn("audio decode failed:", key, e));
+    }
+
+    function define(sounds, voiceLimits) {
+      limits = Object.assign({}, voiceLimits || {});
+      const jobs = [];
+      for (const key of Object.keys(sounds || {})) {
+        if (key === "bgm" || !sounds[key] || buffers.has(key)) continue;  // BGM 走 music()，不整段解码
+        jobs.push(decode(key, sounds[key]));
+      }
+      return Promise.all(jobs);
+    }
+
+    function release(v) {
+      const src = v.src;
+      if (!src) return;
+      v.src = null;
+      v.key = null;
+      src.onended = null;
+      try { src.stop(); } catch (e) {}
+      try { src.disconnect(); } catch (e) {}
+    }
+
+    function play(key, vol) {
+      const buf = buffers.get(key);
+      if (!buf) return false;
+      if (ctx.state !== "running") {
+        // 还没有用户手势：这时排进去的声音会在 resume 后一起响，直接丢掉
+        if (ctx.state === "suspended") ctx.resume().catch(() => {});
+        return true;
+      }
+      // 找空闲声部，同时数一下这个 key 正在响几个
+      const limit = limits[key] || DEFAULT_POLYPHONY;
+      let free = null, oldest = null, oldestSame = null, same = 0;
+      for (const v of voices) {
+        if (!v.src) { if (!free) free = v; continue; }
+        if (!oldest || v.seq < oldest.seq) oldest = v;
+        if (v.key === key) {
+          same++;
+          if (!oldestSame || v.seq < oldestSame.seq) oldestSame = v;
+        }
+      }
+      // 超过这个 key 的复音上限：重新触发它最早的那个声部；否则用空闲声部，都满了抢最早的
+      const v = same >= limit ? oldestSame : (free || oldest);
+      release(v);
+      const src = ctx.createBufferSource();
+      src.buffer = buf;
+      src.connect(v.gain);
+      v.gain.gain.value = vol;
+      v.src = src;
+      v.key = key;
+      v.seq = ++seq;
+      src.onended = () => {
+        if (v.src !== src) return;
+        v.src = null;
+        v.key = null;
+        try { src.disconnect(); } catch (e) {}
+      };
+      src.start();
+      return true;
+    }
+
+    function music(url, vol) {
+      try {
+        if (!bgm || bgm.url !== url) {
+          // 一个 <audio> 只能 createMediaElementSource 一次，所以同一首曲子复用同一个元素
+          if (bgm) { try { bgm.el.pause(); bgm.node.disconnect(); } catch (e) {} }
+          const el = new Audio(url);
+          el.loop = true;
+          const node = ctx.createMediaElementSource(el);
+          node.connect(musicGain);
+          bgm = { url: url, el: el, node: node };
+        }
+        musicGain.gain.value = vol;
+        bgm.el.currentTime = 0;
+        const p = bgm.el.play();
+        if (p && p.catch) p.catch(() => {});
+        return bgm.el;
+      } catch (e) {
+        console.warn("audio: music failed:", e);
+        return null;
+      }
+    }
+
+    function resume() {
+      if (ctx.state === "suspended") return ctx.resume().catch(() => {});
+      return Promise.resolve();
+    }
+
+    function active() {
+      let n = 0;
+      for (const v of voices) if (v.src) n++;
+      return n;
+    }
+
+    return {
+      ctx: ctx, master: master, sfx: sfx, musicGain: musicGain,
+      define: define, play: play, music: music, resume: resume, active: active,
+    };
+  }
+
+  root.StormAudio = { create: create, MAX_VOICES: MAX_VOICES };
+})(typeof self !== "undefined" ? self : window);
@@ -0,0 +1,107 @@
+// Python 启动步骤，主线程（index.html）和 Worker（worker.js）共用
+(function (root) {
+  "use strict";
+  // 纯 Python 游戏模块（无 js 依赖），main.py 会 import 它们；增删时同步 tools/build_bundle.py 的 MODULES
+  const PY_MODULES = ["spatial.py", "bulletstore.py", "pools.py", "world.py", "drawbuf.py", "hud.py", "assets.py", "replay.py", "profiler.py", "quality.py", "starfield.py"];
+  const PY_SOURCES = ["utils.py"].concat(PY_MODULES, ["main.py"]);
+  const BUNDLE_URL = "pybundle.zip";  // tools/build_bundle.py 打的 .pyc 包
+  const BUNDLE_DIR = "/storm";
+  let sourcesPromise = null;
+  let bundlePromise = null;
+  let usingBundle = false;
+
+  // 并行拉取全部 Python 源码；可以在 loadPyodide() 之前就调用，结果只取一次
+  function fetchSources() {
+    if (!sourcesPromise) {
+      sourcesPromise = Promise.all(PY_SOURCES.map(name => fetch(name).then(r => {
+        if (!r.ok) throw new Error(name + ": " + r.status);
+        return r.text();
+      }).then(code => [name, code]))).then(Object.fromEntries);
+      sourcesPromise.catch(() => {});  // 错误留给 installPython/runMain 报
+    }
+    return sourcesPromise;
+  }
+
+  // 预编译包；没有（本地开发没打包）时为 null
+  function fetchBundle() {
+    if (!bundlePromise) {
+      bundlePromise = fetch(BUNDLE_URL).then(r => r.ok ? r.arrayBuffer() : null).catch(() => null);
+    }
+    return bundlePromise;
+  }
+
+  // 启动时尽早调用：先要预编译包，拿不到再去拉源码
+  function prefetch() {
+    return fetchBundle().then(buf => buf || fetchSources().then(() => null, () => null));
+  }
+
+  // 解包到 BUNDLE_DIR；打包用的 Python 和 Pyodide 的字节码版本不一致时不用它
+  function installBundle(pyodide, buf) {
+    try {
+      pyodide.unpackArchive(buf, "zip", { extractDir: BUNDLE_DIR });
+      const ok = pyodide.runPython(`
+import importlib, importlib.util, json, sys
+with open("${BUNDLE_DIR}/bundle.json") as f:
+    _meta = json.load(f)
+_ok = _meta["magic"] == importlib.util.MAGIC_NUMBER.hex()
+if _ok:
+    sys.path.insert(0, "${BUNDLE_DIR}")
+    importlib.invalidate_caches()
+else:
+    print("pybundle.zip built for Python", _meta["python"], "- loading sources instead")
+del _meta
+_ok`);
+      return ok === true;
+    } catch (e) {
+      console.warn("pybundle.zip unusable, loading sources:", e);
+      return false;
+    }
+  }
+
+  // 把游戏模块装进 Pyodide：优先用预编译包，否则写源码进文件系统；
+  // ?numpy 时先加载 NumPy（子弹改用 bulletstore.py 的数组存储）
+  async function installPython(pyodide) {
+    root.__numpyBullets = new URLSearchParams(root.location.search).has("numpy");
+    const bundle = prefetch();
+    if (root.__numpyBullets) {
+      try { await pyodide.loadPackage("numpy"); }
+      catch (e) { console.warn("numpy load failed, using list bullets:", e); root.__numpyBullets = false; }
+    }
+    const buf = await bundle;
+    usingBundle = !!buf && installBundle(pyodide, buf);
+    mark(usingBundle ? "python-bundle" : "python-sources");
+    if (usingBundle) return;
+    const src = await fetchSources();
+    const utilsCode = src["utils.py"];
+    pyodide.FS.writeFile("/utils.py", utilsCode);
+    try { pyodide.FS.mkdir("utils"); } catch (e) {}
+    pyodide.FS.writeFile("utils/__init__.py", utilsCode);
+    for (const mod of PY_MODULES) pyodide.FS.writeFile(mod, src[mod]);
+  }
+
+  async function runMain(pyodide) {
+    if (usingBundle) {
+      await pyodide.runPythonAsync("import main");
+      return;
+    }
+    const src = await fetchSources();
+    await pyodide.runPythonAsync(src["main.py"]);
+  }
+
+  // 启动计时：距页面导航开始的毫秒数（Worker 里按主线程的 timeOrigin 换算），
+  // 每个名字只记第一次，存进 __bootTimes 并打一条 performance.mark
+  function mark(name) {
+    const perf = root.performance;
+    const origin = root.__hostTimeOrigin || perf.timeOrigin;
+    const t = Math.round(perf.timeOrigin + perf.now() - origin);
+    root.__bootTimes = root.__bootTimes || {};
+    if (!(name in root.__bootTimes)) {
+      root.__bootTimes[name] = t;
+      try { perf.mark("storm:" + name); } catch (e) {}
+      console.log("[boot] " + name + ": " + t + " ms");
+    }
+    return root.__bootTimes[name];
+  }
+
+  root.StormBoot = { PY_MODULES, fetchSources, prefetch, installPython, runMain, mark };
+})(typeof self !== "undefined" ? self : window);
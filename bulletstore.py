@@ -0,0 +1,187 @@
+"""Structure-of-arrays bullet store backed by NumPy (optional).
+
+``World(..., bullet_store="numpy")`` keeps bullets here instead of in a list
+of ``Bullet`` objects: every field is a contiguous array, so integration,
+orb drag, ttl expiry and off-screen culling are one vectorized operation per
+frame instead of a Python method call per bullet.  Homing bullets are the
+exception; they are few and are steered row by row through a callback.
+
+Spawning code keeps calling ``bullets.append(Bullet(...))``; the store copies
+the fields in.  Renderers read the columns through ``draw_columns()``;
+iterating yields ``BulletRow`` snapshots for tools that still want objects.  Rows are kept in spawn order (compaction is
+order-preserving), so seeded runs match the list store exactly.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the Pyodide packages loaded
+    np = None
+
+OWNERS = ("player", "enemy")
+OWNER_PLAYER = 0
+OWNER_ENEMY = 1
+TYPES = ("normal", "laser", "orb", "homing")
+TYPE_LASER = 1
+TYPE_ORB = 2
+_TYPE_IDS = {t: i for i, t in enumerate(TYPES)}
+
+CULL_MARGIN = 40  # px outside the playfield before a bullet is dropped
+
+
+def available():
+    return np is not None
+
+
+class BulletRow:
+    """Read-only snapshot of one stored bullet, shaped like ``world.Bullet``."""
+    __slots__ = ("x", "y", "px", "py", "vx", "vy", "w", "h", "owner", "bullet_type", "sprite_key",
+                 "homing", "damage", "ttl", "speed", "turn_rate")
+
+
+class BulletArray:
+    _FLOAT_FIELDS = ("x", "y", "px", "py", "vx", "vy", "w", "h", "speed", "turn_rate")
+    _INT_FIELDS = ("ttl", "damage", "owner", "type", "sprite")
+
+    def __init__(self, capacity=256):
+        if np is None:
+            raise ImportError("BulletArray needs numpy")
+        self.n = 0
+        self.capacity = 0
+        # sprite keys are interned to small ints; id 0 is "no sprite"
+        self.sprite_keys = [None]
+        self._sprite_ids = {None: 0}
+        self._grow(max(16, int(capacity)))
+
+    def _grow(self, capacity):
+        n = self.n
+        for name in self._FLOAT_FIELDS:
+            arr = np.zeros(capacity, dtype=np.float64)
+            if self.capacity:
+                arr[:n] = getattr(self, name)[:n]
+            setattr(self, name, arr)
+        for name in self._INT_FIELDS:
+            arr = np.zeros(capacity, dtype=np.int64)
+            if self.capacity:
+                arr[:n] = getattr(self, name)[:n]
+            setattr(self, name, arr)
+        homing = np.zeros(capacity, dtype=bool)
+        if self.capacity:
+            homing[:n] = self.homing[:n]
+        self.homing = homing
+        self.capacity = capacity
+
+    def _columns(self):
+        return [getattr(self, name) for name in self._FLOAT_FIELDS + self._INT_FIELDS] + [self.homing]
+
+    def __len__(self):
+        return self.n
+
+    def clear(self):
+        self.n = 0
+
+    def append(self, b):
+        i = self.n
+        if i >= self.capacity:
+            self._grow(self.capacity * 2)
+        self.x[i] = b.x; self.y[i] = b.y
+        self.px[i] = b.x; self.py[i] = b.y
+        self.vx[i] = b.vx; self.vy[i] = b.vy
+        self.w[i] = b.w; self.h[i] = b.h
+        self.speed[i] = b.speed; self.turn_rate[i] = b.turn_rate
+        self.ttl[i] = b.ttl
+        self.damage[i] = b.damage
+        self.owner[i] = OWNER_PLAYER if b.owner == "player" else OWNER_ENEMY
+        self.type[i] = _TYPE_IDS.get(b.bullet_type, 0)
+        sid = self._sprite_ids.get(b.sprite_key)
+        if sid is None:
+            sid = len(self.sprite_keys)
+            self.sprite_keys.append(b.sprite_key)
+            self._sprite_ids[b.sprite_key] = sid
+        self.sprite[i] = sid
+        self.homing[i] = bool(b.homing)
+        self.n = i + 1
+
+    def row(self, i):
+        r = BulletRow()
+        r.x = float(self.x[i]); r.y = float(self.y[i])
+        r.px = float(self.px[i]); r.py = float(self.py[i])
+        r.vx = float(self.vx[i]); r.vy = float(self.vy[i])
+        r.w = float(self.w[i]); r.h = float(self.h[i])
+        r.owner = OWNERS[self.owner[i]]
+        r.bullet_type = TYPES[self.type[i]]
+        r.sprite_key = self.sprite_keys[self.sprite[i]]
+        r.homing = bool(self.homing[i])
+        r.damage = int(self.damage[i])
+        r.ttl = int(self.ttl[i])
+        r.speed = float(self.speed[i]); r.turn_rate = float(self.turn_rate[i])
+        return r
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.row(i)
+
+    def draw_columns(self, a):
+        """Per-row ``(x, y, w, h, owner, bullet_type, homing, sprite_key)`` for renderers.
+
+        x/y are interpolated ``a`` of the way from px/py, like main.py's
+        ``_lerp_pos``.  Reads the columns in bulk instead of building a
+        ``BulletRow`` per bullet.
+        """
+        n = self.n
+        px = self.px[:n]; py = self.py[:n]
+        x = px + (self.x[:n] - px) * a
+        y = py + (self.y[:n] - py) * a
+        keys = self.sprite_keys
+        return zip(x.tolist(), y.tolist(), self.w[:n].tolist(), self.h[:n].tolist(),
+                   [OWNERS[o] for o in self.owner[:n].tolist()],
+                   [TYPES[t] for t in self.type[:n].tolist()],
+                   self.homing[:n].tolist(),
+                   [keys[k] for k in self.sprite[:n].tolist()])
+
+    def compact(self, keep):
+        """Drop rows where ``keep`` (bool array over the live rows) is False."""
+        n = self.n
+        k = int(np.count_nonzero(keep))
+        if k == n:
+            return
+        for arr in self._columns():
+            arr[:k] = arr[:n][keep]
+        self.n = k
+
+    def step(self, width, height, steer):
+        """Integrate one tick, then cull expired lasers and off-screen rows.
+
+        ``steer(owner, cx, cy, vx, vy, speed, turn_rate)`` returns the new
+        velocity of a homing bullet, or None to keep it.
+        """
+        n = self.n
+        if not n:
+            return
+        x = self.x[:n]; y = self.y[:n]
+        vx = self.vx[:n]; vy = self.vy[:n]
+        w = self.w[:n]; h = self.h[:n]
+        ttl = self.ttl[:n]; btype = self.type[:n]
+
+        for i in np.flatnonzero(self.homing[:n]).tolist():
+            xi = float(x[i]); yi = float(y[i])
+            v = steer(OWNERS[self.owner[i]], xi + float(w[i])/2, yi + float(h[i])/2,
+                      float(vx[i]), float(vy[i]), float(self.speed[i]), float(self.turn_rate[i]))
+            if v is not None:
+                vx[i], vy[i] = v
+
+        orb = btype == TYPE_ORB
+        if orb.any():
+            vx[orb] *= 0.997
+            vy[orb] *= 1.004
+        x += vx
+        y += vy
+        ttl[ttl > 0] -= 1
+
+        keep = (ttl != 0) | (btype != TYPE_LASER)
+        keep &= (y >= -CULL_MARGIN) & (y <= height + CULL_MARGIN)
+        keep &= (x >= -CULL_MARGIN) & (x <= width + CULL_MARGIN)
+        self.compact(keep)
+
+    def save_positions(self):
+        n = self.n
+        self.px[:n] = self.x[:n]
+        self.py[:n] = self.y[:n]
@@ -0,0 +1,162 @@
+"""Per-frame draw-command buffer.
+
+The draw_* functions in main.py used to call ``ctx`` directly, and every
+call crosses the Pyodide proxy boundary (a player bullet alone was eight
+calls).  Instead they append fixed-size records to a float32 array here and
+main.py hands the whole array to ``StormRender.flush`` (render.js) once per
+frame, which replays it on the canvas without coming back into Python.
+
+Each record is ``STRIDE`` floats::
+
+    op, id, x, y, w, h, alpha, aux, aux2
+
+``id`` refers to an image or a style (CSS colour string) interned by this
+buffer; new ids are handed to the JS side with ``take_definitions()`` before
+a flush.  ``replay(ctx)`` draws the same records through a canvas context
+from Python, for when render.js is missing.
+"""
+import math
+from array import array
+
+STRIDE = 9
+
+OP_IMAGE = 0      # id=image, x, y, w, h, alpha, aux=fallback style if drawImage throws
+OP_RECT = 1       # id=style, x, y, w, h, alpha
+OP_ELLIPSE = 2    # id=style, x, y = centre, w, h = radii, alpha
+OP_RING = 3       # id=style, x, y = centre, w = radius, h = line width, alpha
+OP_GLOW_RECT = 4  # id=style, x, y, w, h, alpha, aux=shadow style, aux2=shadow blur
+
+
+class DrawBuffer:
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self.capacity = capacity
+        self.data = array("f", bytes(4 * STRIDE * capacity))
+        # id 0 means "nothing" for both tables
+        self.images = [None]
+        self.styles = [None]
+        self._image_ids = {}
+        self._style_ids = {}
+        self._pending = []
+
+    def __len__(self):
+        return self.n
+
+    def reset(self):
+        self.n = 0
+
+    def _grow(self):
+        # Only ever called between flushes, while no JS view of data exists.
+        self.data.extend(array("f", bytes(4 * STRIDE * self.capacity)))
+        self.capacity *= 2
+
+    def _push(self, op, ident, x, y, w, h, alpha, aux=0, aux2=0):
+        if self.n >= self.capacity:
+            self._grow()
+        d = self.data
+        i = self.n * STRIDE
+        d[i] = op; d[i+1] = ident
+        d[i+2] = x; d[i+3] = y; d[i+4] = w; d[i+5] = h
+        d[i+6] = alpha; d[i+7] = aux; d[i+8] = aux2
+        self.n += 1
+
+    # ---- interning ----
+    def image_id(self, key, img):
+        """Id for ``img`` under ``key``; re-registers if the key's image changed."""
+        i = self._image_ids.get(key)
+        if i is None:
+            i = len(self.images)
+            self.images.append(img)
+            self._image_ids[key] = i
+            self._pending.append(("image", i, img))
+        elif self.images[i] is not img:
+            self.images[i] = img
+            self._pending.append(("image", i, img))
+        return i
+
+    def style_id(self, css):
+        i = self._style_ids.get(css)
+        if i is None:
+            i = len(self.styles)
+            self.styles.append(css)
+            self._style_ids[css] = i
+            self._pending.append(("style", i, css))
+        return i
+
+    def take_definitions(self):
+        """(kind, id, value) for every image/style interned since the last call."""
+        pending = self._pending
+        self._pending = []
+        return pending
+
+    # ---- commands ----
+    def image(self, key, img, x, y, w, h, alpha=1.0, fallback=None):
+        """Draw ``img``; if it is missing (or fails to draw) fill ``fallback`` instead."""
+        fb = self.style_id(fallback) if fallback else 0
+        if img is None:
+            if fb:
+                self._push(OP_RECT, fb, x, y, w, h, alpha)
+            return
+        self._push(OP_IMAGE, self.image_id(key, img), x, y, w, h, alpha, fb)
+
+    def rect(self, style, x, y, w, h, alpha=1.0):
+        self._push(OP_RECT, self.style_id(style), x, y, w, h, alpha)
+
+    def ellipse(self, style, cx, cy, rx, ry, alpha=1.0):
+        self._push(OP_ELLIPSE, self.style_id(style), cx, cy, rx, ry, alpha)
+
+    def ring(self, style, cx, cy, r, line_width, alpha=1.0):
+        self._push(OP_RING, self.style_id(style), cx, cy, r, line_width, alpha)
+
+    def glow_rect(self, style, shadow, blur, x, y, w, h, alpha=1.0):
+        self._push(OP_GLOW_RECT, self.style_id(style), x, y, w, h, alpha, self.style_id(shadow), blur)
+
+    # ---- Python-side replay (fallback when render.js is unavailable) ----
+    def replay(self, ctx):
+        d = self.data
+        images = self.images
+        styles = self.styles
+        tau = math.pi * 2
+        cur_alpha = 1.0
+        ctx.globalAlpha = 1.0
+        for k in range(self.n):
+            i = k * STRIDE
+            op = int(d[i]); ident = int(d[i+1])
+            x = d[i+2]; y = d[i+3]; w = d[i+4]; h = d[i+5]
+            alpha = d[i+6]
+            if alpha != cur_alpha:
+                ctx.globalAlpha = alpha
+                cur_alpha = alpha
+            try:
+                if op == OP_IMAGE:
+                    try:
+                        ctx.drawImage(images[ident], x, y, w, h)
+                    except Exception:
+                        fb = int(d[i+7])
+                        if fb:
+                            ctx.fillStyle = styles[fb]
+                            ctx.fillRect(x, y, w, h)
+                elif op == OP_RECT:
+                    ctx.fillStyle = styles[ident]
+                    ctx.fillRect(x, y, w, h)
+                elif op == OP_ELLIPSE:
+                    ctx.fillStyle = styles[ident]
+                    ctx.beginPath()
+                    ctx.ellipse(x, y, w, h, 0, 0, tau)
+                    ctx.fill()
+                elif op == OP_RING:
+                    ctx.strokeStyle = styles[ident]
+                    ctx.lineWidth = h
+                    ctx.beginPath()
+                    ctx.arc(x, y, w, 0, tau)
+                    ctx.stroke()
+                elif op == OP_GLOW_RECT:
+                    ctx.fillStyle = styles[ident]
+                    ctx.shadowColor = styles[int(d[i+7])]
+                    ctx.shadowBlur = d[i+8]
+                    ctx.fillRect(x, y, w, h)
+                    ctx.shadowBlur = 0
+            except Exception:
+                pass
+        if cur_alpha != 1.0:
+            ctx.globalAlpha = 1.0
@@ -0,0 +1,122 @@
+"""Canvas HUD layer.
+
+The HUD (score / lives / difficulty) used to be three DOM elements whose
+``innerText`` was rewritten every frame, which made the browser redo style
+and layout 60 times a second.  It is now drawn on its own small canvas: the
+glyphs are rendered once into an atlas and a field is only repainted when
+its text changes.
+
+Nothing here imports ``js``; main.py passes in the HUD canvas and a canvas
+factory, so the same code runs on the main thread and in the worker.
+"""
+import math
+
+# 数字 + HUD 里出现的全部中文字符（难度名见 main.DIFF_NAME_ZH）
+HUD_CHARS = "0123456789-+：｜分数生命难度简单普通困难动态"
+
+
+class GlyphAtlas:
+    """Every character of ``chars`` rendered once, side by side, on one canvas."""
+
+    def __init__(self, new_canvas, font, size, chars=HUD_CHARS, color="#fff"):
+        self.font = font
+        self.color = color
+        self.ascent = size
+        self.height = int(math.ceil(size * 1.4))
+        self.canvas = new_canvas(1, 1)
+        ctx = self.canvas.getContext("2d")
+        ctx.font = font
+        # ch -> (sx, advance); advance 是排版宽度，贴图格子左右各多留 1px
+        self.glyphs = {}
+        x = 0
+        for ch in chars:
+            if ch in self.glyphs:
+                continue
+            adv = ctx.measureText(ch).width
+            self.glyphs[ch] = (x, adv)
+            x += int(math.ceil(adv)) + 2
+        self.canvas.width = max(1, x)
+        self.canvas.height = self.height
+        ctx.font = font  # resizing the canvas resets the context state
+        ctx.fillStyle = color
+        for ch, (sx, adv) in self.glyphs.items():
+            ctx.fillText(ch, sx + 1, size)
+
+    def text_width(self, text, ctx=None):
+        w = 0
+        glyphs = self.glyphs
+        for ch in text:
+            g = glyphs.get(ch)
+            if g is not None:
+                w += g[1]
+            elif ctx is not None:
+                ctx.font = self.font
+                w += ctx.measureText(ch).width
+        return w
+
+    def draw(self, ctx, text, x, y=0):
+        """Blit ``text`` with its top-left at (x, y); unknown characters fall back to fillText."""
+        glyphs = self.glyphs
+        src = self.canvas
+        h = self.height
+        for ch in text:
+            g = glyphs.get(ch)
+            if g is None:
+                ctx.font = self.font
+                ctx.fillStyle = self.color
+                ctx.fillText(ch, x, y + self.ascent)
+                x += ctx.measureText(ch).width
+                continue
+            sx, adv = g
+            cw = int(math.ceil(adv)) + 2
+            ctx.drawImage(src, sx, 0, cw, h, int(x) - 1, y, cw, h)
+            x += adv
+        return x
+
+
+class HudLayer:
+    """A row of text fields laid out left to right (like the old flex #hud).
+
+    ``set(i, text)`` repaints field ``i`` only if its text changed; when its
+    width changed too, the fields after it move and are repainted as well.
+    """
+
+    def __init__(self, canvas, atlas, nfields, gap):
+        self.canvas = canvas
+        self.ctx = canvas.getContext("2d")
+        self.atlas = atlas
+        self.gap = gap
+        self.texts = [None] * nfields
+        self.xs = [0.0] * nfields      # left edge of each field
+        self.widths = [0.0] * nfields
+        self.repaints = 0              # 重画过的字段数（调试用）
+
+    def set(self, i, text):
+        if text == self.texts[i]:
+            return
+        self.texts[i] = text
+        w = self.atlas.text_width(text, self.ctx)
+        if w == self.widths[i]:
+            self._paint(i, False)
+        else:
+            self.widths[i] = w
+            self._paint(i, True)
+
+    def repaint(self):
+        """Repaint everything, e.g. after the canvas was resized."""
+        self._paint(0, True)
+
+    def _paint(self, start, to_end):
+        ctx = self.ctx
+        x = self.xs[start]
+        # 宽度变了的话后面的字段都要挪，原来的字可能更宽，一直清到画布末尾
+        clear_w = self.canvas.width - x if to_end else self.widths[start]
+        ctx.clearRect(int(x) - 1, 0, int(math.ceil(clear_w)) + 2, self.canvas.height)
+        stop = len(self.texts) if to_end else start + 1
+        for i in range(start, stop):
+            self.xs[i] = x
+            text = self.texts[i]
+            if text:
+                self.atlas.draw(ctx, text, x)
+                x += self.widths[i] + self.gap
+            self.repaints += 1
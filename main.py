@@ -1,17 +1,41 @@
-from js import document, window, console, Math
-from pyodide.ffi import create_proxy
-from utils import rects_collide, clamp, randf, load_sprite
-
-# ---- safe remove helper to avoid "list.remove(x): x not in list" ----
-def safe_remove(seq, item):
-    try:
-        seq.remove(item)
-    except ValueError:
-        pass
+import bisect
+import json
+import math
+import random
+import time
+import js
+from js import console, Math
+from pyodide.ffi import create_proxy, to_js
+try:
+    from js import document, window
+    IN_WORKER = False
+except ImportError:
+    # Web Worker 模式（worker.js）：没有 DOM，画布是主线程转交的 OffscreenCanvas，
+    # 菜单/HUD/声音/输入由主线程（workerhost.js）通过消息代办
+    document = None
+    window = js.self
+    IN_WORKER = True
+from utils import randf, seed as seed_fx
+from world import World
+import replay
+from drawbuf import DrawBuffer
+from hud import GlyphAtlas, HudLayer
+from profiler import FrameProfiler
+from quality import QualityGovernor, LEVEL_NAMES, DEFAULT_LEVEL
+import starfield
+import assets
+
+# 渲染后端：默认 Canvas 2D；?webgl 时用 WebGL2 实例化渲染（render.js），不可用自动退回 2D
+try:
+    RENDERER_KIND = "webgl" if "webgl" in str(window.location.search) else "2d"
+except Exception:
+    RENDERER_KIND = "2d"
+renderer = None
 
-# Lazily ensure canvas exists and return (canvas, ctx)
+# Lazily ensure canvas exists and return (canvas, ctx); ctx is None with the WebGL renderer
 def ensure_canvas_and_ctx():
-    canvas = document.getElementById("game-canvas")
+    global renderer
+    canvas = js.self.__offscreenCanvas if IN_WORKER else document.getElementById("game-canvas")
     if canvas is None:
         # 如果缺失，尝试把 canvas 插入到 #game-container 中，若没有 container 再插到 body
         container = document.getElementById("game-container")
@@ -24,7 +48,18 @@ def ensure_canvas_and_ctx():
         container.appendChild(canvas)
         console.warn("ensure_canvas_and_ctx: created missing #game-canvas element.")
     try:
-        ctx = canvas.getContext("2d")
+        renderer = window.StormRender.create(canvas, RENDERER_KIND)
+        canvas = renderer.canvas  # WebGL 初始化失败时 render.js 会换一个新画布
+        ctx = renderer.ctx
+        console.log("renderer: " + str(renderer.name))
+        return canvas, ctx
+    except Exception as e:
+        console.warn("ensure_canvas_and_ctx: StormRender unavailable, drawing from Python: " + str(e))
+        renderer = None
+    try:
+        # 与 render.js 的 CONTEXT_OPTIONS 相同：不透明、低延迟上屏
+        ctx = canvas.getContext("2d", to_js({"alpha": False, "desynchronized": True},
+                                            dict_converter=js.Object.fromEntries))
     except Exception as e:
         console.warn("ensure_canvas_and_ctx: getContext failed: " + str(e))
         ctx = None
@@ -33,9 +68,87 @@ def ensure_canvas_and_ctx():
 # initialize global references (may create canvas if missing)
 canvas, ctx = ensure_canvas_and_ctx()
 
+# Worker 模式下尺寸由主线程的 resize 消息给出（_host_hud 是 HUD 画布的 CSS 尺寸）
+_host_size = (0, 0, 1)
+_host_hud = (0, 0)
+
+def _new_canvas(w, h):
+    """Offscreen canvas for pre-rendering (OffscreenCanvas inside the worker)."""
+    if IN_WORKER:
+        return js.OffscreenCanvas.new(max(1, int(w)), max(1, int(h)))
+    c = document.createElement("canvas")
+    c.width = max(1, int(w))
+    c.height = max(1, int(h))
+    return c
+
+# HUD 画在单独的小画布上（hud.py），CSS 决定它的尺寸，字号按高度推出来
+hud_canvas = None
+try:
+    hud_canvas = js.self.__hudCanvas if IN_WORKER else document.getElementById("hud-canvas")
+except Exception:
+    pass
+HUD_FIELDS = 3   # 分数、生命、难度
+HUD_GAP = 18     # 字段间距（CSS px），和原来 #hud 的 flex gap 一样
+_hud_layer = None
+_hud_fit = None
+
+def fit_hud(css_w, css_h, dpr):
+    """(Re)build the HUD canvas and glyph atlas when its size or DPR changed."""
+    global _hud_layer, _hud_fit
+    if hud_canvas is None or css_w <= 0 or css_h <= 0 or (css_w, css_h, dpr) == _hud_fit:
+        return
+    _hud_fit = (css_w, css_h, dpr)
+    try:
+        size = max(8, round(css_h / 1.4)) * dpr
+        hud_canvas.width = int(css_w * dpr)
+        hud_canvas.height = int(css_h * dpr)
+        atlas = GlyphAtlas(_new_canvas, f"700 {size}px sans-serif", size)
+        old = _hud_layer
+        _hud_layer = HudLayer(hud_canvas, atlas, HUD_FIELDS, HUD_GAP * dpr)
+        if old is not None:
+            for i, text in enumerate(old.texts):
+                if text:
+                    _hud_layer.set(i, text)
+    except Exception as e:
+        console.warn("fit_hud failed: " + str(e))
+        _hud_layer = None
+
+# 逻辑尺寸（CSS 像素）= world 尺寸，绘制命令都用它；画布实际像素 = 逻辑尺寸 × 渲染分辨率，
+# 由 CSS 拉伸回逻辑尺寸显示。渲染分辨率默认由画质档位决定（见 apply_quality）；
+# ?scale=0.5..2 把它固定下来（如高分屏上 ?scale=2，或 ?scale=0.5 省填充率），画质档位就只管特效。
+# 改渲染分辨率不会改变 world 的尺寸，也就不影响对局。
+view_w = 0
+view_h = 0
+quality_scale = 1.0   # None：跟随 devicePixelRatio
+MIN_RENDER_SCALE = 0.5
+MAX_RENDER_SCALE = 2.0
+try:
+    _scale_param = js.URLSearchParams.new(str(window.location.search)).get("scale")
+    user_scale = min(MAX_RENDER_SCALE, max(MIN_RENDER_SCALE, float(_scale_param))) if _scale_param else None
+except Exception as e:
+    console.warn("?scale ignored: " + str(e))
+    user_scale = None
+_canvas_sx = _canvas_sy = 1.0
+_fit_key = None      # 上次布局的 (view_w, view_h, 画布宽, 画布高)
+_fit_pending = False
+
+def render_scale(dpr):
+    """Canvas pixels per CSS pixel: ?scale if given, else the quality level's (None = DPR)."""
+    if user_scale is not None:
+        return user_scale
+    scale = dpr if quality_scale is None else quality_scale
+    return min(MAX_RENDER_SCALE, max(MIN_RENDER_SCALE, scale))
+
 def fit_canvas():
-    container = document.getElementById("game-container")
-    if container is not None:
+    global view_w, view_h, _canvas_sx, _canvas_sy, _fit_key
+    if IN_WORKER:
+        w, h, dpr = _host_size
+        container = None
+    else:
+        container = document.getElementById("game-container")
+    if IN_WORKER:
+        pass
+    elif container is not None:
         try:
             rect = container.getBoundingClientRect()
             w = rect.width
@@ -49,181 +162,174 @@ def fit_canvas():
         w = window.innerWidth or document.documentElement.clientWidth or 0
         h = window.innerHeight or document.documentElement.clientHeight or 0
 
-    try:
-        dpr = window.devicePixelRatio or 1
-    except Exception:
-        dpr = 1
-
-    if ctx:
+    if not IN_WORKER:
         try:
-            canvas.style.width = str(w) + "px"
-            canvas.style.height = str(h) + "px"
-            canvas.width = int(Math.floor(w))
-            canvas.height = int(Math.floor(h))
+            dpr = window.devicePixelRatio or 1
         except Exception:
-            pass
+            dpr = 1
+
+    if IN_WORKER:
+        fit_hud(_host_hud[0], _host_hud[1], dpr)
+    elif hud_canvas is not None:
+        try:
+            r = hud_canvas.getBoundingClientRect()
+            fit_hud(r.width, r.height, dpr)
+        except Exception as e:
+            console.warn("fit_canvas: hud rect failed: " + str(e))
+
+    view_w = int(Math.floor(w))
+    view_h = int(Math.floor(h))
+    scale = render_scale(dpr)
+    bw = max(1, int(round(view_w * scale)))
+    bh = max(1, int(round(view_h * scale)))
+    key = (view_w, view_h, bw, bh)
+    if key == _fit_key:
+        return
+    _fit_key = key
+    if canvas is not None:
         try:
-            ctx.setTransform(1, 0, 0, 1, 0, 0)
-            ctx.imageSmoothingEnabled = True
-            ctx.imageSmoothingQuality = "low"
+            if not IN_WORKER:
+                canvas.style.width = str(view_w) + "px"
+                canvas.style.height = str(view_h) + "px"
+            # 给 width/height 赋值会清空画布、重置上下文状态，所以只在真的变了时才赋；
+            # 变换不用在这里设，每帧 flush 都会按 _canvas_sx/_canvas_sy 设一次
+            if canvas.width != bw or canvas.height != bh:
+                canvas.width = bw
+                canvas.height = bh
+                if ctx:
+                    ctx.imageSmoothingEnabled = True
+                    ctx.imageSmoothingQuality = "low"
+            _canvas_sx = bw / view_w if view_w else 1.0
+            _canvas_sy = bh / view_h if view_h else 1.0
         except Exception:
             pass
 
     try:
-        if "player" in globals() and player is not None:
-            player.x = clamp(player.x, 0, canvas.width - player.w)
-            player.y = clamp(player.y, 0, canvas.height - player.h)
-        if "bullets" in globals() and bullets is not None:
-            for b in list(bullets):
-                try:
-                    b.x = clamp(b.x, -200, canvas.width + 200)
-                    b.y = clamp(b.y, -200, canvas.height + 200)
-                except Exception:
-                    continue
-        if "powers" in globals() and powers is not None:
-            for p in list(powers):
-                try:
-                    p.x = clamp(p.x, -200, canvas.width + 200)
-                    p.y = clamp(p.y, -200, canvas.height + 200)
-                except Exception:
-                    continue
+        # 回放时世界尺寸只跟录像走；录制中的尺寸变化要记进录像
+        if "world" in globals() and world is not None and replaying is None \
+                and (world.width, world.height) != (view_w, view_h):
+            world.resize(view_w, view_h)
+            if state == "playing":
+                recorder.resize(world.width, world.height)
     except Exception:
         pass
+    # 渲染分辨率变了：预渲染的子弹贴图和缩放好的贴图都要重画
+    if "invalidate_sprites" in globals() and scale != _sprite_scale:
+        invalidate_sprites(scale)
 
-# Run initial fit and register resize + DOMContentLoaded hooks
-fit_canvas()
-window.addEventListener("resize", create_proxy(lambda e: fit_canvas()))
-document.addEventListener("DOMContentLoaded", create_proxy(lambda e: fit_canvas()), {"once": True})
-try:
+def _fit_frame(ts):
+    global _fit_pending
+    _fit_pending = False
     fit_canvas()
-except Exception:
-    pass
 
-# HUD elements
-hud = document.getElementById("hud")
-score_el = document.getElementById("score")
-lives_el = document.getElementById("lives")
-life_fill_el = document.getElementById("life-fill")
-life_text_el = document.getElementById("life-text")
-level_el = document.getElementById("level")
-
-# Menu elements
-menu = document.getElementById("menu")
-start_btn = document.getElementById("start-btn")
-diff_buttons = menu.querySelectorAll(".btns button")
-selected_diff = "normal"
-for i in range(diff_buttons.length):
-    b = diff_buttons.item(i)
-    def on_diff(evt, btn=b):
-        global selected_diff
-        # 切换选中状态
-        for k in range(diff_buttons.length):
-            diff_buttons.item(k).classList.remove("active")
-        btn.classList.add("active")
-        selected_diff = btn.getAttribute("data-diff")
-    b.addEventListener("click", create_proxy(on_diff))
-# 预先设定普通难度为默认
-diff_buttons.item(1).classList.add("active")  # normal default
+_fit_proxy = create_proxy(_fit_frame)
 
-game_over = False
-state = "menu"  # 'menu' -> 'playing' -> 'gameover'
-INITIAL_BOSS_SCORE_THRESHOLD = 500
+def schedule_fit(*_):
+    """Coalesce resize notifications into one fit_canvas() on the next animation frame."""
+    global _fit_pending
+    if _fit_pending:
+        return
+    _fit_pending = True
+    try:
+        window.requestAnimationFrame(_fit_proxy)
+    except Exception:
+        _fit_frame(0)
 
-# Difficulty settings
-DIFF = {
-    "easy":   {"enemy_rate": 0.015, "enemy_speed": (1.0,2.0), "bullet_rate": 0.004, "boss_hp": 1200},
-    "normal": {"enemy_rate": 0.022, "enemy_speed": (1.8,2.8), "bullet_rate": 0.008, "boss_hp": 1800},
-    "hard":   {"enemy_rate": 0.03,  "enemy_speed": (2.6,3.6), "bullet_rate": 0.012, "boss_hp": 2400},
-}
+def _watch_dpr(*_):
+    """Re-fit when devicePixelRatio changes without a resize (window dragged to another screen)."""
+    try:
+        mq = window.matchMedia(f"(resolution: {window.devicePixelRatio or 1}dppx)")
+        mq.addEventListener("change", _watch_dpr_proxy, to_js({"once": True}, dict_converter=js.Object.fromEntries))
+    except Exception:
+        pass
+    schedule_fit()
 
-# --- Dynamic difficulty scaling (based on current score) ---
-# regardless of the initially selected difficulty.
-_DIFFICULTY_THRESHOLDS = [2000, 6000, 12000, 20000, 30000, 45000, 60000, 80000, 105000]
+_watch_dpr_proxy = create_proxy(_watch_dpr)
 
-def _difficulty_tier(sc):
-    t = 0
-    for th in _DIFFICULTY_THRESHOLDS:
-        if sc >= th:
-            t += 1
-        else:
-            break
-    return t
-
-def _scale_param(key, value, tier):
-    # gentle but noticeable scaling; capped to keep the game fair
-    if key == "enemy_rate":
-        return min(value * (1 + 0.12 * tier), 0.09)
-    if key == "enemy_speed":
-        a, b = value
-        mul = 1 + 0.08 * tier
-        return (a * mul, b * mul)
-    if key == "bullet_rate":
-        return min(value * (1 + 0.10 * tier), 0.06)
-    if key == "boss_hp":
-        # Make later bosses tougher
-        return int(value * (1 + 0.18 * tier))
-    return value
-
-class _ParamView:
-    def __init__(self, base):
-        self._base = base
-    def __getitem__(self, k):
-        try:
-            sc = score
-        except Exception:
-            sc = 0
-        tier = _difficulty_tier(int(sc))
-        return _scale_param(k, self._base[k], tier)
+# Run initial fit and register resize + DOMContentLoaded hooks
+if IN_WORKER:
+    try:
+        _host_size = (js.self.__hostWidth or 0, js.self.__hostHeight or 0, js.self.__hostDpr or 1)
+        _host_hud = (js.self.__hudWidth or 0, js.self.__hudHeight or 0)
+    except Exception:
+        pass
+    fit_canvas()
+else:
+    fit_canvas()
+    window.addEventListener("resize", create_proxy(schedule_fit))
+    document.addEventListener("DOMContentLoaded", create_proxy(schedule_fit), {"once": True})
+    _watch_dpr()
 
-class _DiffProxy:
-    def __init__(self, base):
-        self._base = base
-    def __getitem__(self, name):
-        return _ParamView(self._base[name])
+def _post(msg):
+    """Message to the main thread (worker mode only)."""
+    js.postMessage(to_js(msg, dict_converter=js.Object.fromEntries))
 
-# Replace static DIFF with proxy (keep original as _BASE_DIFF in case you need it)
-_BASE_DIFF = DIFF
-DIFF = _DiffProxy(_BASE_DIFF)
+# HUD elements
+if IN_WORKER:
+    hud = score_el = lives_el = life_fill_el = life_text_el = level_el = None
+    menu = start_btn = diff_buttons = None
+    selected_diff = "normal"
+else:
+    hud = document.getElementById("hud")
+    score_el = document.getElementById("score")
+    lives_el = document.getElementById("lives")
+    life_fill_el = document.getElementById("life-fill")
+    life_text_el = document.getElementById("life-text")
+    level_el = document.getElementById("level")
+
+    # Menu elements
+    menu = document.getElementById("menu")
+    start_btn = document.getElementById("start-btn")
+    diff_buttons = menu.querySelectorAll(".btns button")
+    selected_diff = "normal"
+    for i in range(diff_buttons.length):
+        b = diff_buttons.item(i)
+        def on_diff(evt, btn=b):
+            global selected_diff
+            # 切换选中状态
+            for k in range(diff_buttons.length):
+                diff_buttons.item(k).classList.remove("active")
+            btn.classList.add("active")
+            selected_diff = btn.getAttribute("data-diff")
+        b.addEventListener("click", create_proxy(on_diff))
+    # 预先设定普通难度为默认
+    diff_buttons.item(1).classList.add("active")  # normal default
+
+game_over = False
+state = "menu"  # 'menu' -> 'playing' -> 'gameover'
 
 DIFF_NAME_ZH = {"easy": "简单", "normal": "普通", "hard": "困难"}
-WEAPON_TIERS = ("single", "twin", "spread")
-CLEAR_WAVE_DURATION = 60 * 5
-CLEAR_WAVE_PULSE_GAP = 12
 PLAYER_MUZZLE_FX_ENABLED = False
 ENEMY_MUZZLE_FX_ENABLED = False
 BOSS_PATTERN_BG_FX_ENABLED = False
 
-# Performance guardrails: keep the Pyodide canvas loop responsive on low-end devices.
-MAX_ENEMIES = 42
-MAX_BULLETS = 220
-MAX_EFFECTS = 50
-MAX_POWERS = 18
-SOUND_RATE_LIMIT_MS = {
-    "shoot": 80,
-    "boom": 70,
-    "boom2": 90,
-    "boom3": 160,
-    "pickup": 40,
-    "button": 0,
-    "bigboom": 0,
+# 每种音效最多同时几个声部（audio.js）；超出时重新触发最早的那个
+SOUND_VOICES = {
+    "shoot": 2,
+    "boom": 4,
+    "boom2": 3,
+    "boom3": 2,
+    "pickup": 2,
+    "button": 1,
+    "bigboom": 2,
 }
+# 退回 <audio> 元素时没有声部可管，只能按最小间隔限流
+SOUND_FALLBACK_GAP_MS = {"shoot": 80, "boom": 70, "boom2": 90, "boom3": 160, "pickup": 40}
 _last_sound_at = {}
-TIER_TO_SPRITE = {
-    "single": "player_blue",
-    "twin":   "player_red",
-    "spread": "player_purple",
-}
-def _apply_tier_sprite(plr):
+
+# 将路径转成 Image 对象；若主名不存在则用已知别名兜底
+try:
+    from js import Image
+except ImportError:
+    Image = None  # Worker 里没有 Image，只用主线程转交的 ImageBitmap（PRELOADED_IMAGES）
+
+def _built(path):
+    """assets.json entry of the tools/build_sprites.py copy of ``path``, or None (no build / worker)."""
     try:
-        plr.sprite_key = TIER_TO_SPRITE.get(plr.weapon, plr.sprite_key)
+        return window.SPRITE_BUILD.get(path)
     except Exception:
-        pass
-
-IMG_BASE = "./img"
-SND_BASE = "./sound"
+        return None
 
-# 将路径转成 Image 对象；若主名不存在则用已知别名兜底
-from js import Image
 def _to_img(path):
     try:
         if hasattr(window, "PRELOADED_IMAGES"):
@@ -242,67 +348,26 @@ def _to_img(path):
                     continue
     except Exception:
         pass
+    if Image is None:
+        return None
     try:
         try:
             img = Image.new()
         except Exception:
             img = Image()
-        img.src = path
+        # 有构建产物（缩好、重新压缩的 WebP）就下载它；预加载的图已经由 assets.js 换好了
+        built = _built(path)
+        img.src = built.src if built is not None else path
         return img
     except Exception:
         return None
 
-# 首选命名
-SPRITES = {
-    "player_blue":  f"{IMG_BASE}/blue_plane.png",
-    "player_red":   f"{IMG_BASE}/red_plane.png",
-    "player_purple":f"{IMG_BASE}/purple_plane.png",
-    "enemy_small":  f"{IMG_BASE}/small_enemy.png",
-    "enemy_big":    f"{IMG_BASE}/big_enemy.png",
-    "enemy_medium": f"{IMG_BASE}/middle_enemy.png",
-    "boss":         f"{IMG_BASE}/boss_enemy.png",
-    "boss_crazy":   f"{IMG_BASE}/bossplane_crazy.png",
-    "boss_bomb":    f"{IMG_BASE}/bossplane_bomb.png",
-    "bullet_red":   f"{IMG_BASE}/red_bullet.png",
-    "bullet_blue":  f"{IMG_BASE}/blue_bullet.png",
-    "enemy_bullet": f"{IMG_BASE}/big_enemy_bullet.png",
-    "explosion":    f"{IMG_BASE}/boom.png",
-    "power_weapon": f"{IMG_BASE}/bullet_goods1.png",
-    "power_shield": f"{IMG_BASE}/plane_shield.png",
-    "power_heal":   f"{IMG_BASE}/life_goods.png",
-    "power_missile":f"{IMG_BASE}/missile_goods.png",
-    "text":         f"{IMG_BASE}/text.png",
-    "boss_bullet_default": f"{IMG_BASE}/boss_bullet_default.png",
-    "boss_bullet_triangle": f"{IMG_BASE}/boss_bullet_triangle.png",
-    "boss_bullet_thunderball_red": f"{IMG_BASE}/boss_bullet_thunderball_red.png",
-    "boss_bullet_thunderball_green": f"{IMG_BASE}/boss_bullet_thunderball_green.png",
-    "boss_bullet_hellfire_red": f"{IMG_BASE}/boss_bullet_hellfire_red.png",
-    "boss_bullet_hellfire_yellow": f"{IMG_BASE}/boss_bullet_hellfire_yellow.png",
-    "boss_bullet_sun_particle": f"{IMG_BASE}/boss_bullet_sun_particle.png",
-    # Aliases used by some resource packs
-    "bossbullet_default": f"{IMG_BASE}/bossbullet_default.png",
-    # Player bullet variants
-    "my_bullet_red": f"{IMG_BASE}/my_bullet_red.png",
-    "my_bullet_blue": f"{IMG_BASE}/my_bullet_blue.png",
-    "my_bullet_purple": f"{IMG_BASE}/my_bullet_purple.png",
-    "player_default": f"{IMG_BASE}/myplane.png",
-    "enemy_medium_alt": f"{IMG_BASE}/middle.png",
-    "bullet_purple": f"{IMG_BASE}/purple_bullet.png",
-    "player_single_shooting": f"{IMG_BASE}/blue_shooting.jpg",
-    "player_twin_shooting": f"{IMG_BASE}/red_shooting.gif",
-    "player_spread_shooting": f"{IMG_BASE}/purple_shooting.gif",
-    "enemy_big_shooting": f"{IMG_BASE}/big_enemy_shooting.gif",
-    "boss_pattern_triangle": f"{IMG_BASE}/boss_shooting_triangle.jpg",
-    "boss_pattern_thunder": f"{IMG_BASE}/boss_shooting_thunderball.jpg",
-    "boss_pattern_fire": f"{IMG_BASE}/boss_shooting_fire_array.jpg",
-    "boss_pattern_hellfire": f"{IMG_BASE}/boss_shooting_hellfire.gif",
-    "boss_pattern_sun": f"{IMG_BASE}/boss_shooting_sun_particle.gif",
-    "boss_pattern_pinball": f"{IMG_BASE}/boss_shooting_fire_pinball.jpg",
-    "hud_life_icon": f"{IMG_BASE}/life.png",
-    "hud_life_amount": f"{IMG_BASE}/life_amount.png",
-    "power_missile_btn": f"{IMG_BASE}/missile_bt.png",
-}
-for k, p in list(SPRITES.items()):
+# 贴图表见 assets.py；optional 级（特效 GIF、无人引用的别名）不预加载，用 lazy_sprite() 按需加载
+SPRITES = {}
+for k, p in assets.SPRITES.items():
+    if assets.sprite_tier(k) == assets.OPTIONAL:
+        SPRITES[k] = None
+        continue
     try:
         SPRITES[k] = _to_img(p)
     except Exception:
@@ -318,123 +383,161 @@ def _fallback(key, *alts):
         except Exception:
             continue
 
-_fallback("enemy_small", f"{IMG_BASE}/small.png")
-_fallback("enemy_big",   f"{IMG_BASE}/big.png")
-_fallback("enemy_medium",f"{IMG_BASE}/middle.png")
-_fallback("boss",        f"{IMG_BASE}/boosplane.png")
-_fallback("enemy_bullet",f"{IMG_BASE}/bigplane_bullet.png")
-_fallback("explosion",   f"{IMG_BASE}/myplaneexplosion.png")
-_fallback("player_blue", f"{IMG_BASE}/myplane.png", f"{IMG_BASE}/fly.png")
-# 备选的武器道具图（存在就换）
-_fallback("power_weapon", f"{IMG_BASE}/bullet_goods2.png", f"{IMG_BASE}/purple_bullet_goods.png", f"{IMG_BASE}/red_bullet_goods.png")
-_fallback("power_shield", f"{IMG_BASE}/plane_shield.png")
-_fallback("power_heal",   f"{IMG_BASE}/life_goods.png")
-_fallback("power_missile",f"{IMG_BASE}/missile_goods.png", f"{IMG_BASE}/missile_bt.png")
+for k, alts in assets.SPRITE_FALLBACKS.items():
+    _fallback(k, *alts)
 
+_lazy_loading = {}
+
+def lazy_sprite(key):
+    """Sprite from the optional tier: starts loading on first use, None until it is ready."""
+    img = SPRITES.get(key)
+    if img is not None:
+        return img
+    pending = _lazy_loading.get(key)
+    if pending is None:
+        path = assets.SPRITES.get(key)
+        if not path or Image is None:  # Worker 里只有主线程转交的预加载图
+            return None
+        pending = _to_img(path)
+        if pending is None:
+            return None
+        _lazy_loading[key] = pending
+    try:
+        if pending.complete and pending.naturalWidth:
+            SPRITES[key] = pending
+            del _lazy_loading[key]
+            return pending
+    except Exception:
+        pass
+    return None
+
+# build_sprites.py 把动图 GIF 转成了帧序列图（一张图里按行排好各帧）：载入后切成每帧一张小画布，
+# 按时间取帧。每帧有自己的绘制键，WebGL 图集里各占一格，不会每换一帧就重新上传。
+_sheet_frames = {}
+
+def _cut_sheet(key, img):
+    """([(draw key, canvas), ...], cumulative end ms) for a frame sheet; () for a plain image."""
+    built = _built(assets.SPRITES.get(key))
+    if built is None or (built.frames or 1) <= 1:
+        return ()
+    fw, fh, cols = built.w, built.h, built.cols
+    frames = []
+    for i in range(built.frames):
+        off = _new_canvas(fw, fh)
+        off.getContext("2d").drawImage(img, (i % cols) * fw, (i // cols) * fh, fw, fh, 0, 0, fw, fh)
+        frames.append((f"{key}#{i}", off))
+    ends = []
+    t = 0
+    for d in built.durations.to_py():
+        t += max(1, d)
+        ends.append(t)
+    return frames, ends
+
+def draw_lazy(key, x, y, w, h, alpha=1.0):
+    """Draw an optional-tier sprite (lazy_sprite) once it has loaded; False until then."""
+    img = lazy_sprite(key)
+    if img is None:
+        return False
+    sheet = _sheet_frames.get(key)
+    if sheet is None:
+        try:
+            sheet = _cut_sheet(key, img)
+        except Exception as e:
+            console.warn(f"frame sheet {key} failed, drawing it whole: {e}")
+            sheet = ()
+        _sheet_frames[key] = sheet
+    if sheet:
+        frames, ends = sheet
+        draw_key, img = frames[bisect.bisect_right(ends, (time.perf_counter() * 1000) % ends[-1])]
+        draws.image(draw_key, img, x, y, w, h, alpha)
+    else:
+        draws.image(key, img, x, y, w, h, alpha)
+    return True
+
+# 星空背景：starfield.py 在 Python 里把星星画进 RGBA 缓冲区，一次 putImageData 传给离屏画布。
+# 画布尺寸向上取整到 BG_ROUND，窗口缩小或小幅放大时直接沿用旧图；
+# 需要重建时（变大、画质档位换了星空层数）等尺寸稳定 BG_REBUILD_DEBOUNCE_MS 后再建，期间拉伸旧图。
+BG_ROUND = 64
+BG_REBUILD_DEBOUNCE_MS = 150
 bg_offscreen = None
 _bg_offscreen_width = 0
 _bg_offscreen_height = 0
+_bg_layers = 0
+_bg_pixels = starfield.StarfieldBuffer()
+_bg_want = None        # 等待重建时的目标 (view_w, view_h, 层数)
+_bg_want_since = 0.0
 
 def build_bg_offscreen():
-    """Build a tall offscreen canvas (2x screen height) with a procedurally generated dark starfield."""
-    global bg_offscreen, _bg_offscreen_width, _bg_offscreen_height
+    """Build a tall offscreen canvas (at least 2x screen height) with a procedurally generated dark starfield."""
+    global bg_offscreen, _bg_offscreen_width, _bg_offscreen_height, _bg_layers
     try:
-        w = int(Math.floor(canvas.width)) or 1
-        h = int(Math.floor(canvas.height)) or 1
-        off = document.createElement("canvas")
-        off.width = w
-        off.height = h * 2
+        w = -(-(view_w or 1) // BG_ROUND) * BG_ROUND
+        h = -(-(view_h or 1) * 2 // BG_ROUND) * BG_ROUND
+        layers = quality.star_layers
+        pixels = _bg_pixels.render(w, h, starfield.stars(w, h, randf, layers))
+        # 每次新建画布：换了对象，渲染后端才会重新上传纹理
+        off = _new_canvas(w, h)
         offctx = off.getContext("2d")
-
-        # Background: flat black to avoid visible brightness banding when wrapping
+        img = offctx.createImageData(w, h)
         try:
-            offctx.fillStyle = "#000000"
+            img.data.assign(pixels)
         except Exception:
-            pass
-        offctx.fillRect(0, 0, off.width, off.height)
-
-        # Star layers (parallax baked into scroll)
-        import math as _py_math
-        def _lay(count, minr, maxr, alpha_min, alpha_max):
-            for i in range(count):
-                x = Math.floor(Math.random() * w)
-                y = Math.floor(Math.random() * (h * 2))
-                r = randf(minr, maxr)
-                a = randf(alpha_min, alpha_max)
-                try:
-                    offctx.beginPath()
-                    offctx.globalAlpha = a
-                    offctx.arc(x, y, r, 0, Math.PI * 2)
-                    offctx.fillStyle = "#ffffff"
-                    offctx.fill()
-                except Exception:
-                    # Fallback tiny pixel
-                    offctx.globalAlpha = a
-                    offctx.fillStyle = "#ffffff"
-                    offctx.fillRect(x, y, 1, 1)
-            offctx.globalAlpha = 1.0
-
-        area = w * h
-        # Densities scale with area to keep similar feel across screens
-        _lay(max(35,  int(area / 11000)), 0.6, 1.2, 0.35, 0.7)   # distant faint stars
-        _lay(max(18,  int(area / 22000)), 1.0, 1.8, 0.6,  0.9)   # mid stars
-        _lay(max(7,   int(area / 36000)), 1.6, 2.4, 0.8,  1.0)   # near bright stars
-
-        # (Disabled) nebula swirls removed to keep background luminance stable and avoid perceived "reset"
-        # try:
-        #     for _ in range(max(1, int(area / 220000))):
-        #         cx = randf(0, w); cy = randf(0, h * 2)
-        #         rx = randf(120, 240); ry = randf(60, 140)
-        #         offctx.save()
-        #         offctx.translate(cx, cy)
-        #         offctx.rotate(randf(0, Math.PI))
-        #         grd = offctx.createRadialGradient(0,0,0, 0,0, max(rx, ry))
-        #         grd.addColorStop(0.0, "rgba(30,60,120,0.12)")
-        #         grd.addColorStop(1.0, "rgba(0,0,0,0)")
-        #         offctx.fillStyle = grd
-        #         offctx.beginPath()
-        #         offctx.ellipse(0, 0, rx, ry, 0, 0, Math.PI * 2)
-        #         offctx.fill()
-        #         offctx.restore()
-        # except Exception:
-        #     pass
-
+            img.data.set(to_js(pixels))
+        offctx.putImageData(img, 0, 0)
+        # 星星是透明底上的白点：在它们下面铺黑底
+        offctx.globalCompositeOperation = "destination-over"
+        offctx.fillStyle = "#000000"
+        offctx.fillRect(0, 0, w, h)
+        offctx.globalCompositeOperation = "source-over"
         bg_offscreen = off
-        _bg_offscreen_width = off.width
-        _bg_offscreen_height = off.height
-    except Exception:
-        try:
-            window.setTimeout(create_proxy(build_bg_offscreen), 500)
-        except Exception:
-            pass
+        _bg_offscreen_width = w
+        _bg_offscreen_height = h
+        _bg_layers = layers
+    except Exception as e:
+        console.warn("starfield build failed: " + str(e))
 
-build_bg_offscreen()
-
-SOUNDS = {
-    "shoot":  f"{SND_BASE}/shoot.mp3",
-    "boom":   f"{SND_BASE}/explosion.mp3",
-    "boom2":  f"{SND_BASE}/explosion2.wav",
-    "pickup": f"{SND_BASE}/get_goods.wav",
-    "button": f"{SND_BASE}/button.wav",
-    "bgm":    f"{SND_BASE}/game.mp3",
-    "boom3":  f"{SND_BASE}/explosion3.wav",
-    "bigboom": f"{SND_BASE}/bigexplosion.wav",
-}
+SOUNDS = assets.SOUNDS
+
+# Web Audio 引擎（audio.js）：音效预先解码，按 SOUND_VOICES 分配声部；浏览器不支持时为 None
+audio = None
+if IN_WORKER:
+    # Worker 里没有 AudioContext，引擎建在主线程（workerhost.js）
+    _post({"type": "audio", "sounds": SOUNDS, "voices": SOUND_VOICES})
+else:
+    try:
+        audio = window.StormAudio.create()
+        if audio is not None:
+            audio.define(to_js(SOUNDS, dict_converter=js.Object.fromEntries),
+                         to_js(SOUND_VOICES, dict_converter=js.Object.fromEntries))
+    except Exception as e:
+        console.warn("audio engine unavailable, using <audio>: " + str(e))
+        audio = None
+
+_host_sounds = []
+
+def flush_host_sounds():
+    if _host_sounds:
+        _post({"type": "sounds", "list": list(_host_sounds)})
+        _host_sounds.clear()
 
 # Helper: 播放声音
 def play_sound(key, vol=0.7):
-    try:
-        now = window.performance.now()
-    except Exception:
-        now = 0
-    try:
-        limit = SOUND_RATE_LIMIT_MS.get(key, 0)
-        last = _last_sound_at.get(key, -100000)
-        if limit and now - last < limit:
-            return
-        _last_sound_at[key] = now
-    except Exception:
-        pass
+    if IN_WORKER:
+        # 音频留在主线程：攒到本帧末尾一起发过去
+        _host_sounds.append((key, vol))
+        return
+    if audio is not None:
+        try:
+            if audio.play(key, vol):
+                return
+        except Exception:
+            pass
+    # <audio> 兜底（引擎不可用或还没解码完）
+    now = _last_ts or 0
+    gap = SOUND_FALLBACK_GAP_MS.get(key, 0)
+    if gap and now - _last_sound_at.get(key, -100000) < gap:
+        return
+    _last_sound_at[key] = now
 
     try:
         base = None
@@ -462,523 +565,435 @@ def play_sound(key, vol=0.7):
     except Exception:
         pass
 
-class Player:
-    def __init__(self):
-        self.x = canvas.width/2 - 24
-        self.y = canvas.height - 120
-        self.w = 48
-        self.h = 48
-        self.speed = 4
-        self.hp = 100
-        self.sprite_key = "player_blue"
-        self.weapon = "single"  # single | twin | spread
-        self.shoot_cd = 0
-        self.shield = 0  # frames
-        self.homing_combo = False
-        self.clear_wave_timer = 0
-        self.clear_wave_pulse_cd = 0
-        self.alt_fire_cycle = 0
-    def draw(self):
-        img = SPRITES.get(self.sprite_key)
-        if img:
-            try:
-                ctx.drawImage(img, self.x, self.y, self.w, self.h)
-            except Exception:
-                ctx.fillStyle = "#2b7"
-                ctx.fillRect(self.x, self.y, self.w, self.h)
-        else:
-            ctx.fillStyle = "#2b7"
-            ctx.fillRect(self.x, self.y, self.w, self.h)
-        if self.shield > 0:
-            ctx.strokeStyle = "rgba(0,200,255,0.8)"
-            ctx.lineWidth = 3
-            ctx.beginPath()
-            ctx.arc(self.x + self.w/2, self.y + self.h/2, self.w * 0.7, 0, Math.PI * 2)
-            ctx.stroke()
-
-        if PLAYER_MUZZLE_FX_ENABLED and self.shoot_cd >= 7:
-            fx_key = "player_single_shooting"
-            if self.weapon == "twin":
-                fx_key = "player_twin_shooting"
-            elif self.weapon == "spread":
-                fx_key = "player_spread_shooting"
-            fx = SPRITES.get(fx_key)
-            if fx:
-                try:
-                    ctx.globalAlpha = 0.75
-                    ctx.drawImage(fx, self.x - 4, self.y - 30, self.w + 8, 30)
-                    ctx.globalAlpha = 1.0
-                except Exception:
-                    ctx.globalAlpha = 1.0
-    def shoot(self):
-        if self.shoot_cd > 0:
-            return
-        self.shoot_cd = 10
-        play_sound("shoot", 0.25)
-        self.alt_fire_cycle = (self.alt_fire_cycle + 1) % 8
-
-        if len(bullets) >= MAX_BULLETS:
-            return
-
-        if self.homing_combo:
-            bullets.append(Bullet(self.x + self.w/2 - 3, self.y - 10, 0, -8, "player", bullet_type="normal", damage=14))
-            if len(bullets) < MAX_BULLETS:
-                bullets.append(Bullet(self.x + self.w/2 - 3, self.y - 12, 0, -6, "player", bullet_type="homing", homing=True, damage=16))
-            return
+# ---- Rendering: the simulation lives in world.py, these only draw its state ----
+# draw_* 只往 draws 里写命令，每帧末尾 flush_draws() 一次性交给渲染后端（render.js）
+draws = DrawBuffer()
+_draws_proxy = None
 
-        # 每隔几轮发射一次高能激光弹，增加玩法层次但不打破基础节奏
-        if self.weapon != "single" and self.alt_fire_cycle == 0:
-            bullets.append(Bullet(self.x + self.w/2 - 4, self.y - 20, 0, -12, "player", bullet_type="laser", w=8, h=30, damage=30, ttl=24))
+def flush_draws():
+    global renderer, _draws_proxy
+    if renderer:
+        try:
+            for kind, i, value in draws.take_definitions():
+                renderer.define(kind, i, value)
+            if _draws_proxy is None:
+                _draws_proxy = create_proxy(draws.data)
+            renderer.flush(_draws_proxy, draws.n, _canvas_sx, _canvas_sy)
+            draws.reset()
             return
-
-        if self.weapon == "single":
-            bullets.append(Bullet(self.x + self.w/2 - 3, self.y - 10, 0, -8, "player", bullet_type="normal", damage=16))
-        elif self.weapon == "twin":
-            for dx, dy in [(-2, -8), (0, -9), (2, -8)]:
-                bullets.append(Bullet(self.x + self.w/2 - 3, self.y - 10, dx, dy, "player", bullet_type="normal", damage=14))
-        elif self.weapon == "spread":
-            for dx, dy in [(-3, -7.5), (-1.5, -8.5), (0, -9.2), (1.5, -8.5), (3, -7.5)]:
-                bullets.append(Bullet(self.x + self.w/2 - 3, self.y - 10, dx, dy, "player", bullet_type="normal", damage=12))
-    def hit(self, dmg):
-        if self.shield > 0:
-            self.shield = max(0, self.shield - int(dmg * 20))
-            return False
-        self.hp -= dmg
-        if self.homing_combo:
-            self.homing_combo = False
-            self.weapon = "spread"
-            _apply_tier_sprite(self)
-            return True
+        except Exception as e:
+            console.warn("flush_draws: renderer failed, drawing from Python: " + str(e))
+            renderer = None
+    if ctx:
+        ctx.setTransform(_canvas_sx, 0, 0, _canvas_sy, 0, 0)
+        draws.replay(ctx)
+    draws.reset()
+
+# 文字先画到离屏 2D 画布，再作为图片提交，WebGL 后端也能显示
+_text_sprites = {}
+
+def draw_text(text, font, color, x, y):
+    """Draw ``text`` with its alphabetic baseline at ``y`` (like fillText)."""
+    key = (text, font, color)
+    spr = _text_sprites.get(key)
+    if spr is None:
         try:
-            idx = WEAPON_TIERS.index(self.weapon)
-        except Exception:
-            idx = 0
-        if idx > 0:
-            self.weapon = WEAPON_TIERS[idx - 1]
-            _apply_tier_sprite(self)
-        return True
-
-class Enemy:
-    def __init__(self, kind="small"):
-        self.kind = kind
-        self.w = 36 if kind=="small" else (64 if kind=="big" else 48)
-        self.h = 36 if kind=="small" else (64 if kind=="big" else 48)
-        self.x = randf(0, canvas.width-self.w)
-        self.y = -self.h - randf(0, 100)
-        spd_min, spd_max = DIFF[selected_diff]["enemy_speed"]
-        self.vx = randf(-0.6, 0.6)
-        self.vy = randf(spd_min, spd_max)
-        self.hp = 15 if kind=="small" else (40 if kind=="big" else 28)
-        self.cd = 40  # shoot cooldown
-    def draw(self):
-        key = "enemy_small" if self.kind=="small" else ("enemy_big" if self.kind=="big" else "enemy_medium")
-        img = SPRITES.get(key)
-        if img:
-            ctx.drawImage(img, self.x, self.y, self.w, self.h)
-        else:
-            ctx.fillStyle = "#a33" if self.kind=="small" else "#833"
-            ctx.fillRect(self.x, self.y, self.w, self.h)
-
-        if ENEMY_MUZZLE_FX_ENABLED and self.kind == "big" and self.cd >= 35:
-            fx = SPRITES.get("enemy_big_shooting")
-            if fx:
-                try:
-                    ctx.globalAlpha = 0.7
-                    ctx.drawImage(fx, self.x + 8, self.y + self.h - 14, self.w - 16, 20)
-                    ctx.globalAlpha = 1.0
-                except Exception:
-                    ctx.globalAlpha = 1.0
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.x = clamp(self.x, 0, canvas.width-self.w)
-        # Shoot
-        self.cd -= 1
-        if self.cd<=0:
-            self.cd = int(90 - 30*randf(0,1))
-            if Math.random() < DIFF[selected_diff]["bullet_rate"]:
-                # fire at player
-                tx = player.x + player.w/2
-                ty = player.y + player.h/2
-                cx = self.x + self.w/2
-                cy = self.y + self.h
-                vx = tx - cx
-                vy = ty - cy
-                mag = (vx*vx+vy*vy) ** 0.5 + 1e-5
-                vx, vy = vx/mag*3.0, vy/mag*3.0
-                if len(bullets) >= MAX_BULLETS:
-                    return
-                if self.kind == "small":
-                    bullets.append(Bullet(cx-3, cy, vx, vy, "enemy", bullet_type="normal", damage=14))
-                elif self.kind == "medium":
-                    for off in (-0.35, 0, 0.35):
-                        if len(bullets) >= MAX_BULLETS:
-                            break
-                        ang = Math.atan2(vy, vx) + off
-                        bullets.append(Bullet(cx-3, cy, 3.0*Math.cos(ang), 3.0*Math.sin(ang), "enemy", bullet_type="normal", sprite_key="boss_bullet_triangle", damage=12))
-                else:
-                    bullets.append(Bullet(cx-4, cy, vx*0.85, vy*0.85+0.3, "enemy", bullet_type="orb", sprite_key="boss_bullet_hellfire_yellow", w=10, h=10, damage=18))
-                    if len(bullets) < MAX_BULLETS and Math.random() < 0.35:
-                        bullets.append(Bullet(cx-4, cy, vx*0.6, vy*0.6, "enemy", bullet_type="homing", sprite_key="boss_bullet_thunderball_red", w=10, h=10, damage=16, homing=True, speed=3.2, turn_rate=0.2))
-
-class Boss:
-    def __init__(self):
-        self.w = 160
-        self.h = 110
-        self.x = canvas.width/2 - self.w/2
-        self.y = -self.h
-        self.vy = 1.2
-        self.vx = 2.0
-        self.hp = DIFF[selected_diff]["boss_hp"]
-        self.phase = 0
-        self.cd = 120
-        self.pattern_count = 0
-    def draw(self):
-        key = "boss_crazy" if getattr(self, "phase", 0) == 2 and SPRITES.get("boss_crazy") else "boss"
-        img = SPRITES.get(key)
-        if img: ctx.drawImage(img, self.x, self.y, self.w, self.h)
-        else:
-            ctx.fillStyle = "#5522aa"
-            ctx.fillRect(self.x, self.y, self.w, self.h)
-
-        if BOSS_PATTERN_BG_FX_ENABLED:
-            pattern_fx = {
-                0: "boss_pattern_triangle",
-                1: "boss_pattern_thunder",
-                2: "boss_pattern_sun",
-                3: "boss_pattern_hellfire",
-            }.get(getattr(self, "phase", 0), "boss_pattern_fire")
-            fx = SPRITES.get(pattern_fx) or SPRITES.get("boss_pattern_pinball")
-            if fx:
-                try:
-                    ctx.globalAlpha = 0.22
-                    ctx.drawImage(fx, self.x - 14, self.y - 8, self.w + 28, self.h + 18)
-                    ctx.globalAlpha = 1.0
-                except Exception:
-                    ctx.globalAlpha = 1.0
-        # HP bar
-        ctx.fillStyle = "rgba(0,0,0,0.5)"
-        ctx.fillRect(20, 20, canvas.width-40, 12)
-        ctx.fillStyle = "#e33"
-        ratio = max(0, self.hp)/DIFF[selected_diff]["boss_hp"]
-        ctx.fillRect(20, 20, (canvas.width-40)*ratio, 12)
-    def update(self):
-        # Enter from top, then patrol horizontally at y=40
-        if self.y < 40:
-            self.y += self.vy
-        else:
-            # Horizontal patrol & edge bounce
-            self.x += self.vx
-            if self.x <= 0 or self.x + self.w >= canvas.width:
-                self.vx = -self.vx
-                self.x = clamp(self.x, 0, canvas.width - self.w)
-        # Shoot pattern cycling
-        self.cd -= 1
-        if self.cd<=0:
-            self.pattern_count += 1
-            self.cd = max(52, 80 - self.pattern_count)
-            self.phase = (self.phase+1) % 4
-            self.fire_pattern(self.phase)
-    def fire_pattern(self, p):
-        if len(bullets) >= MAX_BULLETS:
+            off = _new_canvas(1, 1)
+            offctx = off.getContext("2d")
+            offctx.font = font
+            size = int("".join(ch for ch in font.split("px")[0] if ch.isdigit()) or 16)
+            off.width = max(1, int(math.ceil(offctx.measureText(text).width)) + 2)
+            off.height = int(size * 1.4)
+            offctx.font = font  # resizing the canvas resets the context state
+            offctx.fillStyle = color
+            offctx.fillText(text, 1, size)
+            spr = (f"text:{font}:{color}:{text}", off, size)
+        except Exception as e:
+            console.warn("draw_text failed: " + str(e))
             return
-        cx = self.x + self.w/2
-        cy = self.y + self.h
-        if p == 0:
-            # fan
-            for a in range(-40, 41, 10):
-                if len(bullets) >= MAX_BULLETS:
-                    break
-                rad = (a/180.0)*Math.PI
-                vx, vy = 3*Math.sin(rad), 3*Math.cos(rad)
-                bullets.append(Bullet(cx, cy, vx, vy, "enemy", sprite_key="boss_bullet_default"))
-        elif p == 1:
-            # aimed bursts
-            tx, ty = player.x+player.w/2, player.y+player.h/2
-            for k in range(12):
-                if len(bullets) >= MAX_BULLETS:
-                    break
-                ang = Math.atan2(ty-cy, tx-cx) + (k-6)*0.08
-                vx, vy = 3.2*Math.cos(ang), 3.2*Math.sin(ang)
-                bullets.append(Bullet(cx, cy, vx, vy, "enemy", sprite_key=("boss_bullet_thunderball_red" if (k % 2 == 0) else "boss_bullet_thunderball_green")))
-        elif p == 2:
-            # spiral
-            for k in range(24):
-                if len(bullets) >= MAX_BULLETS:
-                    break
-                ang = k*0.26 + Math.random()*0.5
-                vx, vy = 2.6*Math.cos(ang), 2.6*Math.sin(ang)+0.8
-                bullets.append(Bullet(cx, cy, vx, vy, "enemy", sprite_key="boss_bullet_sun_particle", bullet_type="orb", damage=14))
-        else:
-            # 混合弹幕：中轴激光 + 两侧追踪弹
-            for lane in (-42, -18, 18, 42):
-                if len(bullets) >= MAX_BULLETS:
-                    break
-                bullets.append(Bullet(cx + lane, cy, 0, 6.5, "enemy", bullet_type="laser", sprite_key="boss_bullet_hellfire_red", w=8, h=24, damage=20, ttl=34))
-            for side in (-52, 52):
-                if len(bullets) >= MAX_BULLETS:
-                    break
-                bullets.append(Bullet(cx + side, cy + 4, 0, 3.2, "enemy", bullet_type="homing", sprite_key="boss_bullet_thunderball_green", w=11, h=11, damage=18, homing=True, speed=3.4, turn_rate=0.16))
-
-class Bullet:
-    def __init__(self, x, y, vx, vy, owner, sprite_key=None, w=None, h=None, homing=False, speed=None, bullet_type="normal", damage=12, ttl=0, turn_rate=0.4):
-        self.x, self.y, self.vx, self.vy = x, y, vx, vy
-        self.w, self.h = (w or 6), (h or 12)
-        self.owner = owner  # 'player' or 'enemy'
-        self.sprite_key = sprite_key
-        self.homing = homing
-        self.bullet_type = bullet_type
-        self.damage = damage
-        self.ttl = ttl
-        self.turn_rate = turn_rate
+        _text_sprites[key] = spr
+    key, img, ascent = spr
+    draws.image(key, img, x - 1, y - ascent, img.width, img.height)
+
+# 渲染插值系数：距上一次 step 已经过的时间 / 固定步长（0..1），见 update()
+_interp = 1.0
+
+def _lerp_pos(o):
+    a = _interp
+    px = o.px; py = o.py
+    return px + (o.x - px) * a, py + (o.y - py) * a
+
+def draw_player(plr):
+    x, y = _lerp_pos(plr)
+    draw_sprite(plr.sprite_key, x, y, plr.w, plr.h, fallback="#2b7")
+    if plr.shield > 0:
+        draws.ring("rgba(0,200,255,0.8)", x + plr.w/2, y + plr.h/2, plr.w * 0.7, 3)
+
+    if PLAYER_MUZZLE_FX_ENABLED and plr.shoot_cd >= 7:
+        fx_key = "player_single_shooting"
+        if plr.weapon == "twin":
+            fx_key = "player_twin_shooting"
+        elif plr.weapon == "spread":
+            fx_key = "player_spread_shooting"
+        draw_lazy(fx_key, x - 4, y - 30, plr.w + 8, 30, 0.75)
+
+def draw_enemy(e):
+    x, y = _lerp_pos(e)
+    key = "enemy_small" if e.kind=="small" else ("enemy_big" if e.kind=="big" else "enemy_medium")
+    draw_sprite(key, x, y, e.w, e.h, fallback="#a33" if e.kind=="small" else "#833")
+
+    if ENEMY_MUZZLE_FX_ENABLED and e.kind == "big" and e.cd >= 35:
+        draw_lazy("enemy_big_shooting", x + 8, y + e.h - 14, e.w - 16, 20, 0.7)
+
+def draw_boss(bs):
+    x, y = _lerp_pos(bs)
+    key = "boss_crazy" if getattr(bs, "phase", 0) == 2 and SPRITES.get("boss_crazy") else "boss"
+    draw_sprite(key, x, y, bs.w, bs.h, fallback="#5522aa")
+
+    if BOSS_PATTERN_BG_FX_ENABLED:
+        pattern_fx = {
+            0: "boss_pattern_triangle",
+            1: "boss_pattern_thunder",
+            2: "boss_pattern_sun",
+            3: "boss_pattern_hellfire",
+        }.get(getattr(bs, "phase", 0), "boss_pattern_fire")
+        if not draw_lazy(pattern_fx, x - 14, y - 8, bs.w + 28, bs.h + 18, 0.22):
+            draw_lazy("boss_pattern_pinball", x - 14, y - 8, bs.w + 28, bs.h + 18, 0.22)
+    # HP bar
+    draws.rect("rgba(0,0,0,0.5)", 20, 20, view_w-40, 12)
+    ratio = max(0, bs.hp)/world.params.boss_hp
+    draws.rect("#e33", 20, 20, (view_w-40)*ratio, 12)
+
+# 子弹外观：玩家子弹按武器颜色 (outer, inner, core)，激光按归属 (fill, shadow)
+BULLET_STYLES = {
+    "homing": ("rgba(100,210,255,0.35)", "#bff7ff", "#ffffff"),
+    "red":    ("rgba(255,80,70,0.35)", "#ff5a48", "#ffd3c9"),
+    "purple": ("rgba(210,110,255,0.35)", "#d76cff", "#fff0ff"),
+    "blue":   ("rgba(80,190,255,0.35)", "#4fd7ff", "#ddfbff"),
+}
+LASER_STYLES = {
+    "player": ("rgba(120,220,255,0.9)", "rgba(120,220,255,0.85)"),
+    "enemy":  ("rgba(255,80,80,0.9)", "rgba(255,90,0,0.9)"),
+}
+LASER_GLOW_BLUR = 14
+
+# Pre-rendered bullet sprites: each (style, w, h) is drawn once into an
+# offscreen canvas at the current render scale, so a bullet costs one
+# drawImage instead of ellipses or a shadowBlur fill every frame.
+# fit_canvas() clears the cache when the render scale changes.
+_bullet_sprites = {}
+_sprite_scale = _canvas_sx
+
+def _render_bullet_sprite(style, w, h, glow=True):
+    """Returns (key, canvas, ox, oy, sw, sh): draw at (b.x-ox, b.y-oy, sw, sh).
+
+    ``glow=False`` (lower quality levels) drops the laser shadow and the
+    outer halo of player shots.
+    """
+    if style in LASER_STYLES:
+        pad = LASER_GLOW_BLUR + 2 if glow else 1
+        sw = w + 2 * pad
+        sh = h + 2 * pad
+        ox = oy = pad
+    else:
+        # outer ellipse radii are 0.95w x 0.75h around the bullet centre
+        sw = math.ceil(2 * max(w * 0.95, w / 2)) + 2
+        sh = math.ceil(2 * max(h * 0.75, h / 2)) + 2
+        ox = (sw - w) / 2
+        oy = (sh - h) / 2
+    dpr = _sprite_scale
+    off = _new_canvas(math.ceil(sw * dpr), math.ceil(sh * dpr))
+    offctx = off.getContext("2d")
+    offctx.scale(dpr, dpr)
+    if style in LASER_STYLES:
+        fill, shadow = LASER_STYLES[style]
+        offctx.fillStyle = fill
+        if glow:
+            offctx.shadowColor = shadow
+            offctx.shadowBlur = LASER_GLOW_BLUR * dpr  # shadowBlur ignores the transform
+        offctx.fillRect(ox, oy, w, h)
+    else:
+        outer, inner, core = BULLET_STYLES[style]
+        cx = sw / 2
+        cy = sh / 2
+        if glow:
+            offctx.fillStyle = outer
+            offctx.beginPath()
+            offctx.ellipse(cx, cy, w * 0.95, h * 0.75, 0, 0, math.pi * 2)
+            offctx.fill()
+        offctx.fillStyle = inner
+        offctx.beginPath()
+        offctx.ellipse(cx, cy, w * 0.55, h * 0.55, 0, 0, math.pi * 2)
+        offctx.fill()
+        offctx.fillStyle = core
+        offctx.fillRect(cx - 1, oy + 2, 2, max(2, h - 4))
+    return (f"bullet:{style}:{w}x{h}:{int(glow)}", off, ox, oy, sw, sh)
+
+def _bullet_sprite(style, w, h, glow=True):
+    key = (style, w, h, glow)
+    spr = _bullet_sprites.get(key)
+    if spr is None and key not in _bullet_sprites:
         try:
-            vlen = Math.sqrt(vx*vx + vy*vy)
-        except Exception:
-            vlen = 0
-        self.speed = speed or (vlen or 7.0)
-    def draw(self):
-        if self.bullet_type == "laser":
-            ctx.save()
-            if self.owner == "player":
-                ctx.fillStyle = "rgba(120,220,255,0.9)"
-                ctx.shadowColor = "rgba(120,220,255,0.85)"
-            else:
-                ctx.fillStyle = "rgba(255,80,80,0.9)"
-                ctx.shadowColor = "rgba(255,90,0,0.9)"
-            ctx.shadowBlur = 14
-            ctx.fillRect(self.x, self.y, self.w, self.h)
-            ctx.restore()
+            spr = _render_bullet_sprite(style, w, h, glow)
+        except Exception as e:
+            console.warn("bullet sprite failed, drawing procedurally: " + str(e))
+            spr = None
+        _bullet_sprites[key] = spr
+    return spr
+
+def invalidate_sprites(scale=1):
+    global _sprite_scale
+    _sprite_scale = scale
+    _bullet_sprites.clear()
+    _scaled_sprites.clear()
+
+# Sprite images are far bigger than they are drawn (boom.png is 304x304 and
+# drawn at 40x40, boss_enemy.png 250x250 at 160x110), so every drawImage
+# resampled a large source.  draw_sprite() resamples each (key, w, h) once,
+# with high-quality smoothing, into an offscreen canvas at the current render
+# scale; after that a draw is a near 1:1 copy (and a small atlas entry for
+# WebGL).  Only loaded static sprites go through it; the optional FX drawn by
+# draw_lazy() (animated GIFs or frame sheets) are drawn as they are.
+_scaled_sprites = {}
+MAX_SCALED_SPRITES = 256
+
+def _image_size(img):
+    """Natural size of an Image/ImageBitmap/canvas, (0, 0) while it is still loading."""
+    try:
+        w = img.naturalWidth
+        if w:
+            return w, img.naturalHeight
+        if w is not None:
+            return 0, 0   # <img> 还没加载完
+    except Exception:
+        pass
+    try:
+        return img.width or 0, img.height or 0
+    except Exception:
+        return 0, 0
+
+def _scale_sprite(key, img, w, h):
+    """Cache entry (source, scaled canvas or None, draw key) for SPRITES[key] at w x h."""
+    src_w, src_h = _image_size(img)
+    if not src_w or not src_h:
+        return (img, None, key)   # 还没加载完：先画原图，不缓存
+    scale = _sprite_scale
+    tw = max(1, math.ceil(w * scale))
+    th = max(1, math.ceil(h * scale))
+    off = None
+    if tw < src_w or th < src_h:   # 只有缩小才值得预先重采样
+        try:
+            off = _new_canvas(tw, th)
+            offctx = off.getContext("2d")
+            offctx.imageSmoothingEnabled = True
+            offctx.imageSmoothingQuality = "high"
+            offctx.drawImage(img, 0, 0, tw, th)
+        except Exception as e:
+            console.warn(f"scaled sprite {key} failed, drawing the source: {e}")
+            off = None
+    if len(_scaled_sprites) >= MAX_SCALED_SPRITES:
+        _scaled_sprites.clear()
+    entry = _scaled_sprites[(key, w, h)] = (img, off, f"sprite:{key}:{w}x{h}")
+    return entry
+
+def draw_sprite(key, x, y, w, h, alpha=1.0, fallback=None):
+    """draws.image() of SPRITES[key] at w x h, through its pre-scaled copy when there is one."""
+    img = SPRITES.get(key)
+    if img is not None:
+        entry = _scaled_sprites.get((key, w, h))
+        if entry is None or entry[0] is not img:
+            entry = _scale_sprite(key, img, w, h)
+        if entry[1] is not None:
+            draws.image(entry[2], entry[1], x, y, w, h, alpha, fallback)
             return
-
-        if self.owner == "player":
-            # Draw player shots procedurally instead of stretching tiny sprites.
-            # This is cheaper in Pyodide than image lookups for every bullet and
-            # gives the weapons a cleaner, brighter arcade look.
-            if self.bullet_type == "homing" or getattr(self, "homing", False):
-                outer = "rgba(100,210,255,0.35)"
-                inner = "#bff7ff"
-                core = "#ffffff"
-            elif player.weapon == "single":
-                outer = "rgba(255,80,70,0.35)"
-                inner = "#ff5a48"
-                core = "#ffd3c9"
-            elif getattr(player, "sprite_key", "") == "player_purple":
-                outer = "rgba(210,110,255,0.35)"
-                inner = "#d76cff"
-                core = "#fff0ff"
-            else:
-                outer = "rgba(80,190,255,0.35)"
-                inner = "#4fd7ff"
-                core = "#ddfbff"
-            cx = self.x + self.w / 2
-            cy = self.y + self.h / 2
-            try:
-                ctx.fillStyle = outer
-                ctx.beginPath()
-                ctx.ellipse(cx, cy, self.w * 0.95, self.h * 0.75, 0, 0, Math.PI * 2)
-                ctx.fill()
-                ctx.fillStyle = inner
-                ctx.beginPath()
-                ctx.ellipse(cx, cy, self.w * 0.55, self.h * 0.55, 0, 0, Math.PI * 2)
-                ctx.fill()
-                ctx.fillStyle = core
-                ctx.fillRect(cx - 1, self.y + 2, 2, max(2, self.h - 4))
-            except Exception:
-                ctx.fillStyle = inner
-                ctx.fillRect(self.x, self.y, self.w, self.h)
-        else:
-            img = SPRITES.get(self.sprite_key) or SPRITES.get("enemy_bullet")
-            if img:
-                try:
-                    ctx.drawImage(img, self.x, self.y, self.w, self.h)
-                except Exception:
-                    ctx.fillStyle = "#f90"
-                    ctx.fillRect(self.x, self.y, self.w, self.h)
-            else:
-                ctx.fillStyle = "#f90"
-                ctx.fillRect(self.x, self.y, self.w, self.h)
-    def update(self):
-        if getattr(self, "homing", False):
-            target = None
-            if self.owner == "player":
-                try:
-                    if boss:
-                        target = boss
-                except Exception:
-                    target = None
-                if not target:
-                    nearest = None
-                    nearest_d2 = 1e12
-                    for e in enemies:
-                        dx = (e.x + e.w/2) - (self.x + self.w/2)
-                        dy = (e.y + e.h/2) - (self.y + self.h/2)
-                        d2 = dx*dx + dy*dy
-                        if d2 < nearest_d2:
-                            nearest_d2 = d2; nearest = e
-                    target = nearest
-            else:
-                target = player
-            if target:
-                dx = (target.x + target.w/2) - (self.x + self.w/2)
-                dy = (target.y + target.h/2) - (self.y + self.h/2)
-                try:
-                    dist = Math.sqrt(dx*dx + dy*dy) or 1
-                except Exception:
-                    dist = (abs(dx)+abs(dy)) or 1
-                spd = getattr(self, "speed", None)
-                if not spd or spd<=0:
-                    spd = 7.0
-                desired_vx = dx / dist * spd
-                desired_vy = dy / dist * spd
-                turn_rate = getattr(self, "turn_rate", 0.4)
-                self.vx = self.vx*(1-turn_rate) + desired_vx*turn_rate
-                self.vy = self.vy*(1-turn_rate) + desired_vy*turn_rate
-
-        if self.bullet_type == "orb":
-            self.vx *= 0.997
-            self.vy *= 1.004
-
-        self.x += self.vx
-        self.y += self.vy
-        if self.ttl and self.ttl > 0:
-            self.ttl -= 1
-
-class PowerUp:
-    def __init__(self, kind, x, y):
-        self.kind = kind  # weapon | shield | heal
-        self.x, self.y = x, y
-        self.w, self.h = 28, 28
-        self.vy = 2.0
-    def draw(self):
-        key = "power_"+self.kind
-        img = SPRITES.get(key)
-        if img: ctx.drawImage(img, self.x, self.y, self.w, self.h)
+    draws.image(key, img, x, y, w, h, alpha, fallback)
+
+def draw_bullet(b):
+    x, y = _lerp_pos(b)
+    draw_bullet_at(x, y, b.w, b.h, b.owner, b.bullet_type, b.homing, b.sprite_key)
+
+def draw_bullet_at(x, y, w, h, owner, bullet_type, homing, sprite_key):
+    # 字段分开传：NumPy 存储直接按列画（BulletArray.draw_columns），不用每颗子弹造对象
+    if bullet_type == "laser":
+        style = "player" if owner == "player" else "enemy"
+    elif owner == "player":
+        # Player shots use procedurally drawn glow sprites (in the weapon's
+        # colour) instead of stretching the tiny bullet images.
+        plr = world.player
+        if bullet_type == "homing" or homing:
+            style = "homing"
+        elif plr.weapon == "single":
+            style = "red"
+        elif getattr(plr, "sprite_key", "") == "player_purple":
+            style = "purple"
         else:
-            ctx.fillStyle = {"weapon":"#0bf","shield":"#0cf","heal":"#0b5"}[self.kind]
-            ctx.fillRect(self.x, self.y, self.w, self.h)
-    def update(self):
-        self.y += self.vy
-
-class Explosion:
-    def __init__(self, x, y):
-        self.x, self.y = x, y
-        self.t = 24
-    def draw(self):
-        img = SPRITES.get("explosion")
-        if img:
-            ctx.drawImage(img, self.x-20, self.y-20, 40, 40)
-        else:
-            ctx.fillStyle = f"rgba(255,150,0,{self.t/24})"
-            ctx.beginPath()
-            ctx.arc(self.x, self.y, (24-self.t)+10, 0, Math.PI*2)
-            ctx.fill()
-    def update(self):
-        self.t -= 1
-
-def add_explosion(x, y):
-    if len(effects) >= MAX_EFFECTS:
-        safe_remove(effects, effects[0])
-    effects.append(Explosion(x, y))
-
-def rects_collide(a, b):
-    ax = a.x; ay = a.y; aw = a.w; ah = a.h
-    bx = b.x; by = b.y; bw = b.w; bh = b.h
-    return (ax < bx+bw and ax+aw > bx and ay < by+bh and ay+ah > by)
-
-def update_hud():
-    score_el.innerText = f"分数：{int(score)}"
-    lives_el.innerText = f"生命：{player.hp}"
-    level_el.innerText = f"难度：{DIFF_NAME_ZH.get(selected_diff, selected_diff)}｜动态+{_difficulty_tier(int(score))}"
-
-def spawn_enemy():
-    if len(enemies) >= MAX_ENEMIES:
+            style = "blue"
+    else:
+        key = sprite_key
+        if not SPRITES.get(key):
+            key = "enemy_bullet"
+        draw_sprite(key, x, y, w, h, fallback="#f90")
         return
-    r = Math.random()
-    kind = "small" if r < 0.55 else ("medium" if r < 0.85 else "big")
-    enemies.append(Enemy(kind))
 
-def spawn_power(x, y):
-    if len(powers) >= MAX_POWERS:
+    glow = quality.bullet_glow
+    spr = _bullet_sprite(style, w, h, glow)
+    if spr is not None:
+        key, img, ox, oy, sw, sh = spr
+        draws.image(key, img, x - ox, y - oy, sw, sh)
+    elif style in LASER_STYLES:
+        fill, shadow = LASER_STYLES[style]
+        if glow:
+            draws.glow_rect(fill, shadow, LASER_GLOW_BLUR, x, y, w, h)
+        else:
+            draws.rect(fill, x, y, w, h)
+    else:
+        outer, inner, core = BULLET_STYLES[style]
+        cx = x + w / 2
+        cy = y + h / 2
+        if glow:
+            draws.ellipse(outer, cx, cy, w * 0.95, h * 0.75)
+        draws.ellipse(inner, cx, cy, w * 0.55, h * 0.55)
+        draws.rect(core, cx - 1, y + 2, 2, max(2, h - 4))
+
+def draw_power(p):
+    x, y = _lerp_pos(p)
+    key = "power_"+p.kind
+    draw_sprite(key, x, y, p.w, p.h, fallback={"weapon":"#0bf","shield":"#0cf","heal":"#0b5"}[p.kind])
+
+def draw_explosion(fx):
+    if SPRITES.get("explosion"):
+        draw_sprite("explosion", fx.x-20, fx.y-20, 40, 40)
+    else:
+        r = (24-fx.t)+10
+        draws.ellipse("rgb(255,150,0)", fx.x, fx.y, r, r, fx.t/24)
+
+# HUD：数值没变就什么都不做；变了才格式化并重画对应字段。
+# DOM 里的 #hud 只作为读屏用的镜像，最多每 HUD_MIRROR_MS 同步一次。
+HUD_MIRROR_MS = 1000
+_hud_values = None
+_hud_texts = ("", "", "")
+_hud_mirrored = None
+_hud_mirror_at = -HUD_MIRROR_MS
+
+def update_hud(ts=0):
+    global _hud_values, _hud_texts
+    score = int(world.score)
+    hp = world.player.hp
+    tier = world.tier
+    values = (score, hp, selected_diff, tier)
+    if values != _hud_values:
+        old = _hud_values
+        _hud_values = values
+        score_text, lives_text, level_text = _hud_texts
+        if old is None or old[0] != score:
+            score_text = f"分数：{score}"
+        if old is None or old[1] != hp:
+            lives_text = f"生命：{hp}"
+        if old is None or old[2:] != values[2:]:
+            level_text = f"难度：{DIFF_NAME_ZH.get(selected_diff, selected_diff)}｜动态+{tier}"
+        _hud_texts = (score_text, lives_text, level_text)
+        if _hud_layer is not None:
+            _hud_layer.set(0, score_text)
+            _hud_layer.set(1, lives_text)
+            _hud_layer.set(2, level_text)
+    if ts - _hud_mirror_at >= HUD_MIRROR_MS:
+        mirror_hud(ts)
+
+def mirror_hud(ts=0):
+    """Copy the HUD text into the DOM #hud (accessibility mirror)."""
+    global _hud_mirrored, _hud_mirror_at
+    _hud_mirror_at = ts
+    if _hud_texts == _hud_mirrored:
+        return
+    _hud_mirrored = _hud_texts
+    score_text, lives_text, level_text = _hud_texts
+    if IN_WORKER:
+        _post({"type": "hud", "score": score_text, "lives": lives_text, "level": level_text})
         return
-    r = Math.random()
-    kind = "weapon" if r<0.5 else ("shield" if r<0.8 else "heal")
-    powers.append(PowerUp(kind, x, y))
-
-def trigger_clear_wave():
-    player.clear_wave_timer = CLEAR_WAVE_DURATION
-    player.clear_wave_pulse_cd = 0
-
-def _defeat_boss():
-    global boss, score, spawn_boss_at
-    score += 300
-    add_explosion(boss.x+boss.w/2, boss.y+boss.h/2)
-    play_sound("bigboom", 0.6)
-    boss = None
     try:
-        spawn_boss_at = score + 1000
+        score_el.innerText = score_text
+        lives_el.innerText = lives_text
+        level_el.innerText = level_text
     except Exception:
         pass
 
-def run_clear_wave():
-    global shake, score
-    if player.clear_wave_timer <= 0:
-        return
-    player.clear_wave_timer -= 1
-    player.clear_wave_pulse_cd -= 1
-    if player.clear_wave_pulse_cd > 0:
-        return
-
-    player.clear_wave_pulse_cd = CLEAR_WAVE_PULSE_GAP
-    shake = max(shake, 12)
-    play_sound("boom3", 0.18)
-
-    for e in enemies[:]:
-        add_explosion(e.x + e.w/2, e.y + e.h/2)
-        score_gain = 10 if e.kind == "small" else 25
-        score += score_gain
-        safe_remove(enemies, e)
-
-    for eb in [bb for bb in bullets if bb.owner == "enemy"]:
-        add_explosion(eb.x + eb.w/2, eb.y + eb.h/2)
-        safe_remove(bullets, eb)
-
-    if boss:
-        boss.hp -= 90
-        score += 10
-        if boss.hp <= 0:
-            _defeat_boss()
-
-spawn_boss_at = INITIAL_BOSS_SCORE_THRESHOLD
-boss = None
-
-def maybe_spawn_boss():
-    global boss
-    if boss is None and score >= spawn_boss_at:
-        boss = Boss()
+# 每局的随机种子：?seed=N 固定，否则随机；整局输入记进 recorder，结束时导出到 window.__lastReplay
+# ?replay=<url> 载入一份录像，开局后逐帧回放（不接受键盘/触摸输入）
+recorder = replay.Recorder()
+replaying = None
+_replay_log = None
+_fixed_seed = None
+try:
+    _qs = js.URLSearchParams.new(str(window.location.search))
+    if _qs.has("seed"):
+        _fixed_seed = int(_qs.get("seed"))
+    if _qs.has("replay"):
+        from pyodide.http import open_url
+        _replay_log = replay.Player(open_url(_qs.get("replay")).read()).log
+        console.log(f"[replay] loaded {_qs.get('replay')}: {_replay_log['ticks']} ticks, seed {_replay_log['seed']}")
+except Exception as e:
+    console.warn("replay/seed params ignored: " + str(e))
 
 def reset_game():
-    global player, enemies, bullets, powers, effects, boss, score, frame, game_over, shake, spawn_boss_at
-    player = Player()
-    _apply_tier_sprite(player)
-    try:
-        player.x = clamp(player.x, 0, canvas.width - player.w)
-        player.y = clamp(player.y, 0, canvas.height - player.h)
-    except Exception:
-        pass
-    enemies.clear(); bullets.clear(); powers.clear(); effects.clear()
-    boss = None
-    score = 0
-    frame = 0
-    shake = 0
-    spawn_boss_at = INITIAL_BOSS_SCORE_THRESHOLD
+    global game_over, replaying
+    replaying = None
+    if _replay_log is not None:
+        player = replay.Player(_replay_log)
+        why = player.mismatch(world)
+        if why is None:
+            replaying = player
+        else:
+            console.error(f"[replay] cannot replay: {why}; starting a normal run")
+    if replaying is not None:
+        replaying.start(world)
+        seed_fx(_replay_log["seed"])
+    else:
+        run_seed = _fixed_seed if _fixed_seed is not None else random.getrandbits(31)
+        world.reset(selected_diff, seed=run_seed)
+        seed_fx(run_seed)
+        recorder.begin(run_seed, world.selected_diff, world.width, world.height,
+                       world.sticky_active, world.bullet_store)
     game_over = False
 
+def finish_replay():
+    """Game over: export the recorded run, or check a replay against its recording."""
+    global replaying
+    if replaying is not None:
+        log = replaying.log
+        same = replaying.tick == log["ticks"] and world.frame == log.get("frame") and world.score == log.get("score")
+        msg = f"[replay] finished at tick {replaying.tick}: score {world.score:.2f}, recorded {log.get('score', 0):.2f}"
+        if same:
+            console.log(msg + " (match)")
+        else:
+            console.warn(msg + " (MISMATCH)")
+        replaying = None
+        return
+    log = recorder.finish(world)
+    if log is None:
+        return
+    text = recorder.dumps(log)
+    if IN_WORKER:
+        _post({"type": "replay", "data": text})
+    else:
+        window.__lastReplay = text
+    console.log(f"[replay] recorded {log['ticks']} ticks (seed {log['seed']}, {len(text)} bytes) -> window.__lastReplay")
+
 # Touch controls: drag to move, tap to shoot
 touch_active = False
 touch_id = None
+# 最近一次触摸/指针位置，下一帧交给 world.step 移动玩家
+pointer_target = None
+def _set_pointer(px, py):
+    global pointer_target
+    pointer_target = (px, py)
+
 def setup_controls():
     def keydown(e):
         k = e.key
+        if k in PROFILER_KEYS:
+            e.preventDefault()
+            on_profiler_key(k)
+            return
         if k in keys:
             try:
                 e.preventDefault()
@@ -1006,8 +1021,7 @@ def setup_controls():
         rect = canvas.getBoundingClientRect()
         px = t.clientX - rect.left
         py = t.clientY - rect.top
-        player.x = clamp(px - player.w/2, 0, canvas.width-player.w)
-        player.y = clamp(py - player.h/2, 0, canvas.height-player.h)
+        _set_pointer(px, py)
         try:
             e.preventDefault()
         except Exception:
@@ -1027,8 +1041,7 @@ def setup_controls():
                 rect = canvas.getBoundingClientRect()
                 px = t.clientX - rect.left
                 py = t.clientY - rect.top
-                player.x = clamp(px - player.w/2, 0, canvas.width-player.w)
-                player.y = clamp(py - player.h/2, 0, canvas.height-player.h)
+                _set_pointer(px, py)
                 try:
                     e.preventDefault()
                 except Exception:
@@ -1051,8 +1064,7 @@ def setup_controls():
         rect = canvas.getBoundingClientRect()
         px = e.clientX - rect.left
         py = e.clientY - rect.top
-        player.x = clamp(px - player.w/2, 0, canvas.width-player.w)
-        player.y = clamp(py - player.h/2, 0, canvas.height-player.h)
+        _set_pointer(px, py)
         try:
             e.preventDefault()
         except Exception:
@@ -1065,8 +1077,7 @@ def setup_controls():
             rect = canvas.getBoundingClientRect()
             px = e.clientX - rect.left
             py = e.clientY - rect.top
-            player.x = clamp(px - player.w/2, 0, canvas.width-player.w)
-            player.y = clamp(py - player.h/2, 0, canvas.height-player.h)
+            _set_pointer(px, py)
             try:
                 e.preventDefault()
             except Exception:
@@ -1103,252 +1114,373 @@ def setup_controls():
     except Exception:
         pass
 
-setup_controls()
+if not IN_WORKER:
+    setup_controls()
 
-player = Player()
-enemies = []
-bullets = []
-powers = []
-effects = []
-boss = None
-score = 0
-frame = 0
-bg_offset = 0
-shake = 0
-keys = {"ArrowLeft":False,"ArrowRight":False,"ArrowUp":False,"ArrowDown":False,"Space":False}
-
-PLAYER_HIT_RADIUS = 12
+# ?numpy 时 index.html 会先加载 NumPy，子弹改用数组存储（大量子弹时更快）
+try:
+    _bullet_store = "numpy" if window.__numpyBullets else "list"
+except Exception:
+    _bullet_store = "list"
+# ?sticky：玩家追踪弹锁定目标直到它被击毁，而不是每帧改追最近的敌机
+try:
+    _homing_sticky = "sticky" in str(window.location.search)
+except Exception:
+    _homing_sticky = False
+world = World(view_w, view_h, selected_diff, bullet_store=_bullet_store,
+              homing_sticky=_homing_sticky)
 
-def _obj_center(obj):
-    w = getattr(obj, 'w', getattr(obj, 'width', 0))
-    h = getattr(obj, 'h', getattr(obj, 'height', 0))
-    return obj.x + w / 2, obj.y + h / 2
+# ---- 画质档位：quality.py 按实测帧耗时自动升降；?quality=low|medium|high|ultra 固定某一档 ----
+try:
+    _pinned_quality = js.URLSearchParams.new(str(window.location.search)).get("quality")
+except Exception:
+    _pinned_quality = None
+governor = QualityGovernor(
+    level=LEVEL_NAMES.index(_pinned_quality) if _pinned_quality in LEVEL_NAMES else DEFAULT_LEVEL,
+    pinned=_pinned_quality in LEVEL_NAMES)
+quality = governor.current
+
+def apply_quality(reason=None):
+    """Switch rendering to ``governor.current``; ``reason`` is logged with the change."""
+    global quality, quality_scale
+    old = quality
+    quality = governor.current
+    if quality.render_scale != quality_scale:
+        quality_scale = quality.render_scale
+        fit_canvas()
+    if reason:
+        console.log(f"[quality] {old.name} -> {quality.name}: {reason}")
+    try:
+        window.__quality = json.dumps(governor.describe())  # 调试：JSON.parse(__quality)
+    except Exception:
+        pass
 
-def player_center_hit(obj, radius=PLAYER_HIT_RADIUS):
-    px, py = _obj_center(player)
-    ox, oy = _obj_center(obj)
-    dx, dy = ox - px, oy - py
-    return dx*dx + dy*dy <= radius*radius
+apply_quality()
+bg_offset = 0
+BG_SCROLL_SPEED = 1.0  # px per tick
+keys = {"ArrowLeft":False,"ArrowRight":False,"ArrowUp":False,"ArrowDown":False,"Space":False}
 
 def draw_bg():
-    global bg_offset, bg_offscreen, _bg_offscreen_width, _bg_offscreen_height
+    global _bg_want, _bg_want_since
     try:
-        # Use the pre-rendered starfield if ready
-        if bg_offscreen and _bg_offscreen_width == canvas.width and _bg_offscreen_height == canvas.height * 2:
-            speed = 1.0
-            try:
-                # Scroll over the full offscreen height for seamless wrap
-                bg_offset = (bg_offset + speed) % _bg_offscreen_height
-            except Exception:
-                bg_offset = 0
-            try:
-                # draw twice for smooth infinite scroll without visible reset
-                y = bg_offset - _bg_offscreen_height
-                ctx.drawImage(bg_offscreen, 0, y, canvas.width, _bg_offscreen_height)
-                ctx.drawImage(bg_offscreen, 0, y + _bg_offscreen_height, canvas.width, _bg_offscreen_height)
-                return
-            except Exception:
-                pass
-        # Rebuild if size changed or not ready yet
-        if not bg_offscreen or _bg_offscreen_width != canvas.width or _bg_offscreen_height != canvas.height * 2:
-            build_bg_offscreen()
-            # draw once immediately if possible
-            if bg_offscreen:
-                try:
-                    ctx.drawImage(bg_offscreen, 0, -canvas.height, canvas.width, _bg_offscreen_height)
-                    return
-                except Exception:
-                    pass
+        fits = (bg_offscreen is not None and view_w <= _bg_offscreen_width
+                and view_h * 2 <= _bg_offscreen_height and _bg_layers == quality.star_layers)
+        if not fits:
+            want = (view_w, view_h, quality.star_layers)
+            now = time.perf_counter() * 1000
+            if want != _bg_want:
+                _bg_want = want
+                _bg_want_since = now
+            if bg_offscreen is None or now - _bg_want_since >= BG_REBUILD_DEBOUNCE_MS:
+                build_bg_offscreen()
+                _bg_want = None
+        if bg_offscreen is not None:
+            w, h = _bg_offscreen_width, _bg_offscreen_height
+            if view_w > w or view_h * 2 > h:
+                w, h = view_w, view_h * 2  # 重建前先拉伸旧图盖满画面
+            # Scroll over the full offscreen height for seamless wrap; the
+            # offset advances per simulation tick (update()), interpolated here
+            y = (bg_offset - BG_SCROLL_SPEED * (1.0 - _interp)) % h - h
+            # draw twice for smooth infinite scroll without visible reset
+            draws.image("bg", bg_offscreen, 0, y, w, h, fallback="#000000")
+            draws.image("bg", bg_offscreen, 0, y + h, w, h, fallback="#000000")
+            return
     except Exception:
         pass
 
     # Fallback: flat black fill to avoid banding
+    draws.rect("#000000", 0, 0, view_w, view_h)
+
+def render(prof=None):
+    draw_bg()
+    if prof is not None:
+        prof.lap("bg")
+    if world.boss:
+        draw_boss(world.boss)
+    for e in world.enemies:
+        draw_enemy(e)
+    bullets = world.bullets
+    if world.bullet_store == "numpy":
+        for row in bullets.draw_columns(_interp):
+            draw_bullet_at(*row)
+    else:
+        for b in bullets:
+            draw_bullet(b)
+    for p in world.powers:
+        draw_power(p)
+
+    # Draw player last
+    plr = world.player
+    draw_player(plr)
+
+    if plr.clear_wave_timer > 0:
+        frame = world.frame
+        alpha = 0.12 + 0.1 * math.sin(frame * 0.35)
+        radius = 80 + 20 * math.sin(frame * 0.25)
+        x, y = _lerp_pos(plr)
+        draws.ring("rgb(120,220,255)", x + plr.w/2, y + plr.h/2, radius, 4, alpha)
+
+    # 画质档位限制同时画几个爆炸（只画最新的）和每个爆炸画多久；world 里的特效本身不受影响
+    skip = len(world.effects) - quality.effects
+    min_t = 24 - quality.explosion_frames
+    for fx in world.effects:
+        if skip > 0:
+            skip -= 1
+        elif fx.t > min_t:
+            draw_explosion(fx)
+
+    if prof is not None:
+        prof.lap("draw")
+
+# ---- Frame profiler: ?profile 或 F8 打开叠加层，F9 下载最近 HISTORY 帧的 JSON ----
+PROFILER_KEYS = ("F8", "F9")
+PROFILE_COLUMNS = World.PHASES + ("bg", "draw", "hud", "overlay", "flush")
+# 柱状图按组堆叠：world 的各阶段合成 sim（分项平均值见文字面板）
+PROFILE_GROUPS = (
+    ("sim", World.PHASES, "#4caf50"),
+    ("bg", ("bg",), "#78909c"),
+    ("draw", ("draw",), "#2196f3"),
+    ("hud", ("hud",), "#ffeb3b"),
+    ("overlay", ("overlay",), "#ab47bc"),
+    ("flush", ("flush",), "#ff7043"),
+)
+PROFILE_OTHER_COLOR = "#bdbdbd"
+_PROFILE_GROUP_COLS = [(tuple(PROFILE_COLUMNS.index(c) for c in cols), color)
+                       for _g, cols, color in PROFILE_GROUPS]
+PROFILE_BARS = 120         # 显示最近多少帧
+PROFILE_BAR_W = 2
+PROFILE_PX_PER_MS = 3.0    # 33 ms 满格
+PROFILE_TEXT_MS = 250      # 文字面板刷新间隔
+profiler = None
+profile_on = False
+_profile_text = [None, None]  # 两块画布轮流画：换了对象 draws 才会把新内容交给渲染后端
+_profile_text_flip = 0
+_profile_text_at = -1e9
+try:
+    if "profile" in str(window.location.search):
+        profiler = FrameProfiler(PROFILE_COLUMNS)
+        profile_on = True
+except Exception:
+    pass
+
+def on_profiler_key(k):
+    global profiler, profile_on
+    if k == "F8":
+        if profiler is None:
+            profiler = FrameProfiler(PROFILE_COLUMNS)
+        profile_on = not profile_on
+    elif k == "F9" and profiler is not None:
+        download_profile()
+
+def download_profile():
+    data = json.dumps(profiler.export(), separators=(",", ":"))
+    name = "storm-profile.json"
+    if IN_WORKER:
+        _post({"type": "download", "name": name, "data": data})
+        return
     try:
-        ctx.fillStyle = "#000000"
-        ctx.fillRect(0,0,canvas.width,canvas.height)
+        blob = js.Blob.new(to_js([data]), js.Object.fromEntries(to_js({"type": "application/json"})))
+        url = js.URL.createObjectURL(blob)
+        a = document.createElement("a")
+        a.href = url
+        a.download = name
+        a.click()
+        window.setTimeout(create_proxy(lambda *a: js.URL.revokeObjectURL(url)), 1000)
+    except Exception as e:
+        console.warn("profile download failed: " + str(e))
+
+def _profile_text_canvas(prof, ts):
+    global _profile_text_flip, _profile_text_at
+    cur = _profile_text[_profile_text_flip]
+    if cur is not None and ts - _profile_text_at < PROFILE_TEXT_MS:
+        return cur
+    s = prof.summary(60)
+    if not s:
+        return cur
+    rows = prof.rows(1)
+    c = rows[0] * 3 if rows else 0
+    sim = sum(s[name] for name in World.PHASES)
+    lines = [
+        f"frame {s['total']:.2f} ms  p95 {s['total_p95']:.2f}",
+        "  ".join([f"sim {sim:.2f}"] + [f"{g} {s[g]:.2f}" for g, _cols, _c in PROFILE_GROUPS[1:]]
+                  + [f"other {s['other']:.2f}"]),
+        "  ".join(f"{name} {s[name]:.2f}" for name in World.PHASES[:4]),
+        "  ".join(f"{name} {s[name]:.2f}" for name in World.PHASES[4:]),
+        f"enemies {prof.counts[c]}  bullets {prof.counts[c + 1]}  effects {prof.counts[c + 2]}"
+        f"  quality {governor.name}{' (pinned)' if governor.pinned else ''}",
+        "F8 hide  F9 download JSON",
+    ]
+    _profile_text_flip ^= 1
+    off = _profile_text[_profile_text_flip]
+    try:
+        if off is None:
+            off = _new_canvas(PROFILE_BARS * PROFILE_BAR_W + 200, len(lines) * 14 + 6)
+            _profile_text[_profile_text_flip] = off
+        octx = off.getContext("2d")
+        octx.clearRect(0, 0, off.width, off.height)
+        octx.font = "11px monospace"
+        octx.fillStyle = "#fff"
+        for i, line in enumerate(lines):
+            octx.fillText(line, 4, 14 * (i + 1))
+    except Exception as e:
+        console.warn("profiler text failed: " + str(e))
+        return cur
+    _profile_text_at = ts
+    return off
+
+def draw_profiler(prof, ts):
+    """Stacked per-phase bars for the last PROFILE_BARS frames plus a text summary."""
+    graph_h = 33.3 * PROFILE_PX_PER_MS
+    x0 = 8
+    y1 = view_h - 8  # 柱子底边
+    width = PROFILE_BARS * PROFILE_BAR_W
+    txt = _profile_text_canvas(prof, ts)
+    text_h = txt.height if txt is not None else 0
+    draws.rect("#000000", x0 - 4, y1 - graph_h - text_h - 4, width + 208, graph_h + text_h + 8, 0.6)
+    if txt is not None:
+        draws.image("profiler-text", txt, x0, y1 - graph_h - text_h, txt.width, txt.height)
+    draws.rect("#ff5252", x0, y1 - 16.7 * PROFILE_PX_PER_MS, width, 1, 0.8)  # 60 fps 预算线
+    scale = 1e3 * PROFILE_PX_PER_MS
+    times = prof.times
+    totals = prof.totals
+    ncol = len(PROFILE_COLUMNS)
+    rows = prof.rows(PROFILE_BARS)
+    x = x0 + (PROFILE_BARS - len(rows)) * PROFILE_BAR_W
+    for r in rows:
+        base = r * ncol
+        y = y1
+        for cols, color in _PROFILE_GROUP_COLS:
+            v = 0.0
+            for i in cols:
+                v += times[base + i]
+            h = v * scale
+            if h >= 0.5:
+                y -= h
+                draws.rect(color, x, y, PROFILE_BAR_W, h)
+        h = totals[r] * scale - (y1 - y)  # 其余时间（other）
+        if h >= 0.5:
+            draws.rect(PROFILE_OTHER_COLOR, x, y - h, PROFILE_BAR_W, h)
+        x += PROFILE_BAR_W
+
+def _profile_end(prof, dt):
+    prof.lap("flush")
+    prof.end(dt, len(world.enemies), len(world.bullets), len(world.effects))
+
+# Fixed-timestep simulation: world.step() always advances 1/60 s of game time
+# (all timers are tick counts), however often rAF fires.  Rendering happens
+# once per rAF and interpolates between the last two ticks.
+SIM_HZ = 60
+SIM_STEP_MS = 1000.0 / SIM_HZ
+MAX_STEPS_PER_FRAME = 5  # 追帧上限：再卡就让游戏变慢，而不是一帧里跑一大串 step
+_last_ts = None
+_sim_acc = 0.0
+_first_game_frame = True  # 第一局的第一帧还没画（启动计时用）
+
+def boot_mark(name):
+    """Startup timing mark (StormBoot.mark in boot.js); returns ms since navigation or None."""
+    try:
+        return window.StormBoot.mark(name)
     except Exception:
-        pass
+        return None
 
-def update():
-    global frame, score, game_over, shake, boss, spawn_boss_at
+def update(ts=None):
+    global pointer_target, bg_offset, _last_ts, _sim_acc, _interp
+    t_frame = time.perf_counter()
     if state == "menu":
+        _last_ts = None
         window.requestAnimationFrame(_raf_proxy)
         return
 
-    # Background
-    draw_bg()
-
-    # Player move by keys
-    dx = (keys["ArrowRight"]-keys["ArrowLeft"])*player.speed
-    dy = (keys["ArrowDown"]-keys["ArrowUp"])*player.speed
-    player.x = clamp(player.x+dx, 0, canvas.width-player.w)
-    player.y = clamp(player.y+dy, 0, canvas.height-player.h)
-
-    # Shooting：自动连射（无需按键）
-    player.shoot()
-    if player.shoot_cd > 0:
-        player.shoot_cd -= 1
-    if player.shield > 0:
-        player.shield -= 1
-    run_clear_wave()
-
-    maybe_spawn_boss()
-    if boss:
-        boss.update()
-        boss.draw()
-
-    if Math.random() < DIFF[selected_diff]["enemy_rate"]:
-        if boss is None:
-            spawn_enemy()
-        else:
-            if selected_diff == "easy":
-                pass
-            elif selected_diff == "normal":
-                if len(enemies) < MAX_ENEMIES:
-                    enemies.append(Enemy("small"))
-            else:
-                spawn_enemy()
-
-    for e in enemies[:]:
-        e.update()
-        e.draw()
-        if e.y > canvas.height + 40:
-            enemies.remove(e)
-
-    # Bullets
-    for b in bullets[:]:
-        b.update()
-        b.draw()
-        if getattr(b, "ttl", 0) == 0 and getattr(b, "bullet_type", "") == "laser":
-            safe_remove(bullets, b)
-            continue
-        if b.y<-40 or b.y>canvas.height+40 or b.x<-40 or b.x>canvas.width+40:
-            safe_remove(bullets, b)
-
-    # Powers
-    for p in powers[:]:
-        p.update()
-        p.draw()
-        if p.y > canvas.height+40:
-            safe_remove(powers, p)
-    
-    # Collisions
-    for b in [bb for bb in bullets if bb.owner=="player"]:
-        for e in enemies[:]:
-            if rects_collide(b, e):
-                add_explosion(b.x, b.y)
-                play_sound("boom", 0.25)
-                safe_remove(bullets, b); e.hp -= getattr(b, "damage", 20)
-                if e.hp<=0:
-                    score += 10 if e.kind=="small" else 25
-                    if Math.random()<0.25: spawn_power(e.x+e.w/2, e.y+e.h/2)
-                    safe_remove(enemies, e)
+    if ts is None:
+        try:
+            ts = window.performance.now()
+        except Exception:
+            ts = 0
+    if _last_ts is None:
+        dt = SIM_STEP_MS  # first frame after start: one tick
+    else:
+        dt = max(0.0, ts - _last_ts)
+    _last_ts = ts
+    prof = profiler if profile_on else None
+    if prof is not None:
+        prof.begin()
+    timings = prof.sim if prof is not None else None
+    _sim_acc = min(_sim_acc + dt, SIM_STEP_MS * MAX_STEPS_PER_FRAME)
+    steps = int(_sim_acc // SIM_STEP_MS)
+    _sim_acc -= steps * SIM_STEP_MS
+
+    for i in range(steps):
+        if replaying is not None:
+            pointer_target = None
+            if replaying.done:
+                world.game_over = True  # 录像到头了
                 break
-        if boss and rects_collide(b, boss):
-            add_explosion(b.x, b.y)
-            play_sound("boom2", 0.25)
-            try:
-                safe_remove(bullets, b)
-            except Exception:
-                pass
-            try:
-                boss.hp -= getattr(b, "damage", 12)
-            except Exception:
-                boss.hp = 0
-            score += 2
-
-            if boss.hp <= 0:
-                _defeat_boss()
-
-    # Enemy bullets vs player
-    for b in [bb for bb in bullets if bb.owner=="enemy"]:
-        if player_center_hit(b):
-            damaged = player.hit(getattr(b, "damage", 15))
-            safe_remove(bullets, b)
-            if damaged:
-                add_explosion(player.x+player.w/2, player.y+player.h/2)
-                play_sound("boom", 0.25)
-                shake = 8
-            else:
-                pass
-
-    # Enemy body vs player
-    for e in enemies[:]:
-        if player_center_hit(e):
-            damaged = player.hit(25)
-            safe_remove(enemies, e)
-            if damaged:
-                add_explosion(player.x+player.w/2, player.y+player.h/2)
-                play_sound("boom", 0.25)
-                shake = 10
-            else:
-                pass
-
-    # Power pickup
-    for p in powers[:]:
-        if rects_collide(p, player):
-            play_sound("pickup", 0.35)
-            if p.kind == "weapon":
-                if player.weapon == "single":
-                    player.weapon = "twin"
-                    _apply_tier_sprite(player)
-                elif player.weapon == "twin":
-                    player.weapon = "spread"
-                    _apply_tier_sprite(player)
-                else:
-                    trigger_clear_wave()
-                try:
-                    delattr(player, "fallback_single")
-                except Exception:
-                    pass
-            elif p.kind=="shield":
-                player.shield = 300
-            else:
-                player.hp = min(100, player.hp+30)
-            safe_remove(powers, p)
-
-    # Draw player last
-    player.draw()
-
-    if player.clear_wave_timer > 0:
-        alpha = 0.12 + 0.1 * Math.sin(frame * 0.35)
-        radius = 80 + 20 * Math.sin(frame * 0.25)
-        ctx.save()
-        ctx.strokeStyle = f"rgba(120,220,255,{alpha})"
-        ctx.lineWidth = 4
-        ctx.beginPath()
-        ctx.arc(player.x + player.w/2, player.y + player.h/2, radius, 0, Math.PI*2)
-        ctx.stroke()
-        ctx.restore()
-
-    # Effects
-    for fx in effects[:]:
-        fx.update(); fx.draw()
-        if fx.t<=0:
-            safe_remove(effects, fx)
-
-    # Shake (装饰)
-    if shake>0:
-        shake -= 1
-        ctx.save()
-        ctx.translate(randf(-2,2), randf(-2,2))
-        ctx.restore()
-
-    frame += 1
-    score += 0.03  # time bonus
-    update_hud()
-
-    if player.hp <= 0:
-        end_game()
+            inputs = replaying.next_inputs(world)
+        else:
+            inputs = dict(keys)
+            inputs["pointer"] = pointer_target
+            pointer_target = None
+            recorder.record(inputs)
+        if i == steps - 1:
+            world.save_positions()
+        world.step(inputs, timings)
+        bg_offset += BG_SCROLL_SPEED
+        if world.game_over:
+            break
+    for key, vol in world.sounds:
+        play_sound(key, vol)
+    world.sounds.clear()
+    if IN_WORKER:
+        flush_host_sounds()
+
+    _interp = 1.0 if world.game_over else _sim_acc / SIM_STEP_MS
+    if prof is not None:
+        prof.mark()  # step() 的时间已经按阶段记进 prof.sim
+    render(prof)
+    update_hud(ts)
+    if prof is not None:
+        prof.lap("hud")
+        draw_profiler(prof, ts)
+        prof.lap("overlay")
+
+    if world.game_over:
+        end_game()  # GAME OVER 覆盖层和这一帧一起提交
+        flush_draws()
+        if prof is not None:
+            _profile_end(prof, dt)
         return
 
+    flush_draws()
+    if prof is not None:
+        _profile_end(prof, dt)
+    if governor.sample((time.perf_counter() - t_frame) * 1e3, dt):
+        apply_quality(governor.transitions[-1][3])
+    if _first_game_frame:
+        _mark_first_game_frame()
     window.requestAnimationFrame(_raf_proxy)
 
+def _mark_first_game_frame():
+    global _first_game_frame
+    _first_game_frame = False
+    t0 = boot_mark("start")
+    t1 = boot_mark("first-game-frame")
+    if t0 is not None and t1 is not None:
+        console.log(f"[boot] start -> first game frame: {t1 - t0} ms")
+
 def end_game():
     global state, game_over
     state = "gameover"; game_over = True
-    document.body.classList.remove("playing")
+    finish_replay()
+
+    # 绘制 GAME OVER 覆盖层
+    draws.rect("rgba(0,0,0,0.45)", 0, 0, view_w, view_h)
+    draw_text("GAME OVER", "42px Arial", "red", view_w/2 - 120, view_h/2)
+    mirror_hud(_hud_mirror_at)  # 最终分数立即同步给读屏
+    if IN_WORKER:
+        _post({"type": "gameover"})  # 主线程停 BGM、显示菜单
+        return
 
+    document.body.classList.remove("playing")
     try:
         if hasattr(window, "__bgm_audio") and window.__bgm_audio:
             try:
@@ -1362,12 +1494,6 @@ def end_game():
     except Exception:
         pass
 
-    # 绘制 GAME OVER 覆盖层
-    ctx.fillStyle = "rgba(0,0,0,0.45)"
-    ctx.fillRect(0, 0, canvas.width, canvas.height)
-    ctx.fillStyle = "red"
-    ctx.font = "42px Arial"
-    ctx.fillText("GAME OVER", canvas.width/2 - 120, canvas.height/2)
     # show menu after short delay
     def show_menu(*args):
         menu.style.display = "flex"
@@ -1376,6 +1502,15 @@ def end_game():
 # Hook start button
 def on_start(evt):
     global state
+    boot_mark("start")
+    if IN_WORKER:
+        # 菜单、按钮音效和 BGM 已由主线程处理
+        reset_game()
+        state = "playing"
+        window.requestAnimationFrame(_raf_proxy)
+        return
+    if audio is not None:
+        audio.resume()  # 点击开始是用户手势，这里解锁 AudioContext
     play_sound("button", 0.4)
     menu.style.display = "none"
     try:
@@ -1393,7 +1528,10 @@ def on_start(evt):
                     pass
         except Exception:
             pass
-        if "bgm" in SOUNDS and SOUNDS.get("bgm"):
+        bgm = audio.music(SOUNDS["bgm"], 0.35) if audio is not None else None
+        if bgm is not None:
+            window.__bgm_audio = bgm  # end_game 暂停用
+        elif "bgm" in SOUNDS and SOUNDS.get("bgm"):
             a = Audio.new(SOUNDS.get("bgm"))
             try:
                 a.loop = True
@@ -1431,42 +1569,64 @@ def on_start(evt):
     state = "playing"
     window.requestAnimationFrame(_raf_proxy)
 
-start_btn.addEventListener("click", create_proxy(on_start))
-# —— 同步用户可能在 Pyodide 初始化期间的点击/选择 —— 
-try:
-    if hasattr(window, "__desiredDifficulty") and window.__desiredDifficulty:
-        # 让 Python 端的选中状态与菜单一致
-        selected_diff = str(window.__desiredDifficulty)
-        # 更新菜单按钮的 active 外观
-        for i in range(diff_buttons.length):
-            b = diff_buttons.item(i)
-            if b.getAttribute("data-diff") == selected_diff:
-                try:
-                    b.classList.add("active")
-                except Exception:
-                    pass
-            else:
-                try:
-                    b.classList.remove("active")
-                except Exception:
-                    pass
-except Exception:
-    pass
-
-try:
-    if hasattr(window, "__startClicked") and window.__startClicked:
+# Worker 模式：主线程转发的输入/尺寸/开局消息
+def on_host_message(msg):
+    global selected_diff, _host_size, _host_hud
+    kind = msg.type
+    if kind == "key":
+        if msg.key in keys:
+            keys[msg.key] = bool(msg.down)
+        elif msg.key in PROFILER_KEYS and msg.down:
+            on_profiler_key(msg.key)
+    elif kind == "pointer":
+        _set_pointer(msg.x, msg.y)
+    elif kind == "resize":
+        _host_size = (msg.width, msg.height, msg.dpr or 1)
+        _host_hud = (msg.hudWidth or 0, msg.hudHeight or 0)
+        schedule_fit()
+    elif kind == "start":
+        if msg.diff:
+            selected_diff = str(msg.diff)
         on_start(None)
-        window.__startClicked = False
-except Exception:
-    pass
+
+if not IN_WORKER:
+    start_btn.addEventListener("click", create_proxy(on_start))
+    # —— 同步用户可能在 Pyodide 初始化期间的点击/选择 —— 
+    try:
+        if hasattr(window, "__desiredDifficulty") and window.__desiredDifficulty:
+            # 让 Python 端的选中状态与菜单一致
+            selected_diff = str(window.__desiredDifficulty)
+            # 更新菜单按钮的 active 外观
+            for i in range(diff_buttons.length):
+                b = diff_buttons.item(i)
+                if b.getAttribute("data-diff") == selected_diff:
+                    try:
+                        b.classList.add("active")
+                    except Exception:
+                        pass
+                else:
+                    try:
+                        b.classList.remove("active")
+                    except Exception:
+                        pass
+    except Exception:
+        pass
+
+    try:
+        if hasattr(window, "__startClicked") and window.__startClicked:
+            on_start(None)
+            window.__startClicked = False
+    except Exception:
+        pass
 
 # Initial render (menu visible)
 def first_frame():
     draw_bg()
-    ctx.fillStyle = "rgba(0,0,0,0.45)"
-    ctx.fillRect(0, 0, canvas.width, canvas.height)
-    ctx.fillStyle = "white"
-    ctx.font = "24px Arial"
+    draws.rect("rgba(0,0,0,0.45)", 0, 0, view_w, view_h)
+    flush_draws()
+    boot_mark("first-frame")
 
-_raf_proxy = create_proxy(lambda *_: update())
+_raf_proxy = create_proxy(lambda ts=None, *_: update(ts))
 first_frame()
+if IN_WORKER:
+    js.self.__onHostMessage = create_proxy(on_host_message)
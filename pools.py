@@ -0,0 +1,152 @@
+"""Free-list object pools for the short-lived entities in world.py.
+
+Bullets, explosions, power-ups and enemies are created and dropped every few
+frames; in Pyodide the resulting allocations and GC passes show up as frame
+hitches.  A Pool hands out dead instances again instead of allocating, and
+keeps counters so the caps in world.py can be sized from real runs.
+"""
+
+
+class Pool:
+    """Acquire/release pool for one ``__slots__`` entity class.
+
+    ``acquire()`` returns a blank instance (uninitialised slots) that the
+    caller must fully set up, normally via the class's ``spawn()``.
+    ``release()`` must be called exactly once per acquired object, after it
+    has left every live list.
+    """
+    def __init__(self, cls, prefill=0):
+        self.cls = cls
+        self._free = []
+        self.live = 0
+        self.high_water = 0
+        self.created = 0
+        self.prefill(prefill)
+
+    def prefill(self, n):
+        new = self.cls.__new__
+        cls = self.cls
+        while len(self._free) + self.live < n:
+            self._free.append(new(cls))
+            self.created += 1
+
+    def acquire(self):
+        free = self._free
+        if free:
+            obj = free.pop()
+        else:
+            obj = self.cls.__new__(self.cls)
+            self.created += 1
+        live = self.live + 1
+        self.live = live
+        if live > self.high_water:
+            self.high_water = live
+        return obj
+
+    def release(self, obj):
+        self.live -= 1
+        self._free.append(obj)
+
+    def release_all(self, objs):
+        for obj in objs:
+            self.release(obj)
+
+    def stats(self):
+        return {"live": self.live, "free": len(self._free),
+                "high_water": self.high_water, "created": self.created}
+
+
+class EntityList(list):
+    """Live entity list with deferred, order-preserving removal.
+
+    ``kill(obj)`` only flags ``obj.dead``; loops keep iterating the list
+    itself (no ``lst[:]`` copies) and skip dead entries, and ``compact()``
+    drops them and returns them to ``pool`` once per frame.  ``len()``
+    counts live entities only, so the MAX_* caps behave as before.
+    """
+    __slots__ = ("pool", "_dead")
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+        self._dead = 0
+
+    def __len__(self):
+        return list.__len__(self) - self._dead
+
+    def kill(self, obj):
+        if obj.dead:
+            return False
+        obj.dead = True
+        self._dead += 1
+        return True
+
+    def compact(self):
+        if not self._dead:
+            return
+        release = self.pool.release
+        for obj in list.__iter__(self):
+            if obj.dead:
+                release(obj)
+        self[:] = [obj for obj in list.__iter__(self) if not obj.dead]
+        self._dead = 0
+
+    def clear(self):
+        self.pool.release_all(list.__iter__(self))
+        list.clear(self)
+        self._dead = 0
+
+
+class EffectRing:
+    """Fixed-capacity FIFO of Explosion-like effects.
+
+    All slots are allocated up front; ``add()`` overwrites the oldest effect
+    when full and ``expire()`` drops finished ones from the head.  Every
+    effect lives the same number of ticks, so they always finish oldest
+    first.  Iterates oldest to newest, like the list it replaces.
+    """
+    def __init__(self, cls, capacity):
+        self._buf = [cls.__new__(cls) for _ in range(capacity)]
+        self.capacity = capacity
+        self._head = 0
+        self._count = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        buf = self._buf
+        cap = self.capacity
+        head = self._head
+        for i in range(self._count):
+            yield buf[(head + i) % cap]
+
+    def add(self):
+        """Slot for a new effect (the caller initialises it)."""
+        cap = self.capacity
+        if self._count >= cap:
+            obj = self._buf[self._head]
+            self._head = (self._head + 1) % cap
+            return obj
+        obj = self._buf[(self._head + self._count) % cap]
+        self._count += 1
+        if self._count > self.high_water:
+            self.high_water = self._count
+        return obj
+
+    def expire(self, done):
+        """Drop effects from the head while ``done(effect)`` is true."""
+        buf = self._buf
+        cap = self.capacity
+        while self._count and done(buf[self._head]):
+            self._head = (self._head + 1) % cap
+            self._count -= 1
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def stats(self):
+        return {"live": self._count, "free": self.capacity - self._count,
+                "high_water": self.high_water, "created": self.capacity}
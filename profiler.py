@@ -0,0 +1,134 @@
+"""Per-phase frame profiler.
+
+main.py brackets the parts of a frame (the World.step() phases, background,
+sprites, HUD, overlay, flush) with ``lap()`` calls and ``end()`` stores the
+frame as one row of a preallocated ring buffer, so a long session costs no
+allocation beyond the floats themselves.  Nothing is timed while the
+profiler is off: main.py only creates one when ``?profile`` is given or the
+overlay is toggled on.
+
+Times come from ``time.perf_counter`` (in Pyodide that is
+``performance.now()`` underneath, without a JS proxy call per sample).
+
+Nothing here imports ``js``; the overlay drawing and the download live in
+main.py.
+"""
+import time
+from array import array
+
+HISTORY = 600          # frames kept (10 s at 60 fps)
+COUNTS = ("enemies", "bullets", "effects")
+
+
+class FrameProfiler:
+    """Ring buffer of per-frame phase times (seconds) and entity counts.
+
+    ``columns`` names the timed phases.  ``sim`` is a dict to pass to
+    ``World.step(inputs, timings)``; its entries must be a subset of
+    ``columns``.  Time inside a frame not covered by any column ends up in
+    the implicit ``other`` column (total minus the sum).
+    """
+
+    def __init__(self, columns, capacity=HISTORY):
+        self.columns = tuple(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.capacity = capacity
+        ncol = len(self.columns)
+        self.times = array("d", bytes(8 * capacity * ncol))
+        self.totals = array("d", bytes(8 * capacity))    # begin() -> end()
+        self.intervals = array("d", bytes(8 * capacity))  # rAF timestamp delta, ms
+        self.counts = array("l", bytes(array("l").itemsize * capacity * len(COUNTS)))
+        self.head = 0      # next row to write
+        self.size = 0      # rows filled
+        self.frames = 0    # rows ever written
+        self.sim = {name: 0.0 for name in self.columns}
+        self._cur = [0.0] * ncol
+        self._t0 = self._t = 0.0
+        self._clock = time.perf_counter
+
+    # ---- recording ----
+    def begin(self):
+        self._t0 = self._t = self._clock()
+
+    def mark(self):
+        """Restart the lap clock without charging the elapsed time anywhere."""
+        self._t = self._clock()
+
+    def lap(self, name):
+        """Charge the time since the last begin/mark/lap to ``name``."""
+        now = self._clock()
+        self._cur[self.index[name]] += now - self._t
+        self._t = now
+
+    def end(self, interval_ms, enemies, bullets, effects):
+        now = self._clock()
+        cur = self._cur
+        ncol = len(cur)
+        row = self.head
+        base = row * ncol
+        times = self.times
+        sim = self.sim
+        index = self.index
+        for name, v in sim.items():
+            if v:
+                cur[index[name]] += v
+                sim[name] = 0.0
+        for i in range(ncol):
+            times[base + i] = cur[i]
+            cur[i] = 0.0
+        self.totals[row] = now - self._t0
+        self.intervals[row] = interval_ms
+        c = row * len(COUNTS)
+        counts = self.counts
+        counts[c] = enemies; counts[c + 1] = bullets; counts[c + 2] = effects
+        self.head = (row + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        self.frames += 1
+
+    # ---- reading ----
+    def rows(self, n=None):
+        """Row indices of the last ``n`` frames (all kept frames by default), oldest first."""
+        size = self.size if n is None else min(n, self.size)
+        cap = self.capacity
+        start = (self.head - size) % cap
+        return [(start + k) % cap for k in range(size)]
+
+    def phase(self, row, name):
+        return self.times[row * len(self.columns) + self.index[name]]
+
+    def other(self, row):
+        ncol = len(self.columns)
+        base = row * ncol
+        return max(0.0, self.totals[row] - sum(self.times[base:base + ncol]))
+
+    def summary(self, n=None):
+        """Mean ms per column (plus ``other``/``total``) and p95 frame ms over the last ``n`` frames."""
+        rows = self.rows(n)
+        if not rows:
+            return {}
+        k = len(rows)
+        out = {name: sum(self.phase(r, name) for r in rows) * 1e3 / k for name in self.columns}
+        out["other"] = sum(self.other(r) for r in rows) * 1e3 / k
+        totals = sorted(self.totals[r] for r in rows)
+        out["total"] = sum(totals) * 1e3 / k
+        out["total_p95"] = totals[min(k - 1, int(k * 0.95))] * 1e3
+        return out
+
+    def export(self):
+        """The kept history as a JSON-able dict (times in ms, oldest frame first)."""
+        ncol = len(self.columns)
+        frames = []
+        first = self.frames - self.size
+        for k, r in enumerate(self.rows()):
+            base = r * ncol
+            c = r * len(COUNTS)
+            frames.append({
+                "frame": first + k,
+                "interval": round(self.intervals[r], 3),
+                "total": round(self.totals[r] * 1e3, 4),
+                "phases": [round(v * 1e3, 4) for v in self.times[base:base + ncol]],
+                "other": round(self.other(r) * 1e3, 4),
+                "counts": list(self.counts[c:c + len(COUNTS)]),
+            })
+        return {"columns": list(self.columns), "counts": list(COUNTS), "units": "ms", "frames": frames}
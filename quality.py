@@ -0,0 +1,187 @@
+"""Adaptive quality governor.
+
+The guardrail caps in world.py and the ``*_FX_ENABLED`` flags in main.py
+are tuned for one device class.  ``QualityGovernor`` watches how long frames
+take and moves between the ``LEVELS`` below: down when the rolling average
+says frames are being dropped (or are close to it), up again only after a
+long stretch of headroom.  Separate down/up thresholds, hold times and a
+cooldown after every change keep it from oscillating, and an upgrade that
+has to be undone soon after makes the next upgrade wait twice as long.
+
+Only rendering changes between levels.  The simulation caps
+(``MAX_ENEMIES``, ``MAX_BULLETS`` ...) stay fixed, so a run plays the same
+on every device and replays (replay.py) stay frame-exact.
+
+Nothing here imports ``js``; main.py feeds ``sample()`` once per frame and
+applies ``current`` when it returns True.
+"""
+from array import array
+from collections import deque
+
+
+class QualityLevel:
+    """Rendering settings for one level.
+
+    ``effects``            most explosions drawn at once (newest first)
+    ``explosion_frames``   how many of an explosion's 24 ticks are drawn
+    ``star_layers``        starfield layers, nearest first (1..3)
+    ``bullet_glow``        laser shadow glow and the outer halo of player shots
+    ``render_scale``       canvas pixels per CSS pixel; None = devicePixelRatio
+    """
+    __slots__ = ("name", "effects", "explosion_frames", "star_layers", "bullet_glow", "render_scale")
+
+    def __init__(self, name, effects, explosion_frames, star_layers, bullet_glow, render_scale):
+        self.name = name
+        self.effects = effects
+        self.explosion_frames = explosion_frames
+        self.star_layers = star_layers
+        self.bullet_glow = bullet_glow
+        self.render_scale = render_scale
+
+    def __repr__(self):
+        return f"QualityLevel({self.name!r})"
+
+
+LEVELS = (
+    QualityLevel("low",    effects=12, explosion_frames=12, star_layers=1, bullet_glow=False, render_scale=0.5),
+    QualityLevel("medium", effects=25, explosion_frames=24, star_layers=2, bullet_glow=False, render_scale=0.75),
+    QualityLevel("high",   effects=50, explosion_frames=24, star_layers=3, bullet_glow=True,  render_scale=1.0),
+    QualityLevel("ultra",  effects=50, explosion_frames=24, star_layers=3, bullet_glow=True,  render_scale=None),
+)
+LEVEL_NAMES = tuple(q.name for q in LEVELS)
+DEFAULT_LEVEL = LEVEL_NAMES.index("high")
+
+BUDGET_MS = 1000.0 / 60
+WINDOW = 60             # 滚动平均的帧数
+DOWN_INTERVAL = 1.25    # 平均帧间隔超过预算的这个倍数：在掉帧
+DOWN_WORK = 0.85        # 平均每帧工作时间超过预算的这个倍数：快要掉帧
+UP_INTERVAL = 1.1       # 升档要求：帧间隔基本跟上刷新率
+UP_WORK = 0.4           #           且工作时间不到预算的这个倍数
+DOWN_HOLD = 30          # 过载要连续这么多帧才降档
+UP_HOLD = 300           # 余量要连续这么多帧才升档
+MAX_UP_HOLD = 300 * 16
+COOLDOWN = 60           # 换档后这么多帧内不再换档（窗口也会清空重新计）
+BOUNCE_FRAMES = 600     # 升档后这么多帧内又降回来：算一次振荡，下次升档等待加倍
+MAX_SAMPLE_MS = 250     # 更长的间隔（切到后台、断点）不计入
+
+
+class QualityGovernor:
+    """Steps through ``levels`` from the rolling mean of frame time.
+
+    ``sample(work_ms, interval_ms)`` takes the time spent in the frame
+    callback and the time since the previous frame; it returns True when
+    the level changed.  ``transitions`` keeps the last changes as
+    ``(frame, from_name, to_name, reason)``.  A ``pinned`` governor never
+    changes level.
+    """
+
+    def __init__(self, levels=LEVELS, level=DEFAULT_LEVEL, budget_ms=BUDGET_MS, window=WINDOW, pinned=False):
+        self.levels = levels
+        self.level = level
+        self.budget_ms = budget_ms
+        self.pinned = pinned
+        self.window = window
+        self._work = array("d", bytes(8 * window))
+        self._interval = array("d", bytes(8 * window))
+        self._i = 0
+        self._n = 0
+        self._work_sum = 0.0
+        self._interval_sum = 0.0
+        self._over = 0
+        self._under = 0
+        self._cooldown = 0
+        self._up_hold = UP_HOLD
+        self._last_up = None
+        self.frame = 0
+        self.transitions = deque(maxlen=32)
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    @property
+    def name(self):
+        return self.levels[self.level].name
+
+    def averages(self):
+        """(mean work ms, mean interval ms) over the current window, or None before it fills."""
+        if self._n < self.window:
+            return None
+        return self._work_sum / self._n, self._interval_sum / self._n
+
+    def sample(self, work_ms, interval_ms):
+        if self.pinned or interval_ms > MAX_SAMPLE_MS:
+            return False
+        self.frame += 1
+        i = self._i
+        if self._n == self.window:
+            self._work_sum -= self._work[i]
+            self._interval_sum -= self._interval[i]
+        else:
+            self._n += 1
+        self._work[i] = work_ms
+        self._interval[i] = interval_ms
+        self._work_sum += work_ms
+        self._interval_sum += interval_ms
+        self._i = (i + 1) % self.window
+        if self._cooldown:
+            self._cooldown -= 1
+            return False
+        avg = self.averages()
+        if avg is None:
+            return False
+        work, interval = avg
+        budget = self.budget_ms
+
+        if interval > budget * DOWN_INTERVAL or work > budget * DOWN_WORK:
+            self._over += 1
+            self._under = 0
+            if self._over >= DOWN_HOLD and self.level > 0:
+                if interval > budget * DOWN_INTERVAL:
+                    reason = f"mean frame interval {interval:.1f} ms > {budget * DOWN_INTERVAL:.1f} ms"
+                else:
+                    reason = f"mean frame work {work:.1f} ms > {budget * DOWN_WORK:.1f} ms"
+                if self._last_up is not None and self.frame - self._last_up < BOUNCE_FRAMES:
+                    self._up_hold = min(self._up_hold * 2, MAX_UP_HOLD)
+                    reason += f" (undoing an upgrade; next upgrade waits {self._up_hold} frames)"
+                self._change(self.level - 1, reason)
+                return True
+            return False
+        self._over = 0
+
+        if interval < budget * UP_INTERVAL and work < budget * UP_WORK:
+            self._under += 1
+            if self._under >= self._up_hold and self.level < len(self.levels) - 1:
+                reason = (f"mean frame work {work:.1f} ms < {budget * UP_WORK:.1f} ms "
+                          f"for {self._under} frames")
+                self._last_up = self.frame
+                self._change(self.level + 1, reason)
+                return True
+        else:
+            self._under = 0
+        return False
+
+    def set_level(self, level, reason="manual"):
+        if level != self.level:
+            self._change(level, reason)
+
+    def _change(self, level, reason):
+        self.transitions.append((self.frame, self.levels[self.level].name, self.levels[level].name, reason))
+        self.level = level
+        self._n = self._i = 0
+        self._work_sum = self._interval_sum = 0.0
+        self._over = self._under = 0
+        self._cooldown = COOLDOWN
+
+    def describe(self):
+        """JSON-able state for debugging: level, pin, window averages and transitions."""
+        avg = self.averages()
+        return {
+            "level": self.name,
+            "pinned": self.pinned,
+            "work_ms": round(avg[0], 2) if avg else None,
+            "interval_ms": round(avg[1], 2) if avg else None,
+            "transitions": [
+                {"frame": f, "from": a, "to": b, "reason": r} for f, a, b, r in self.transitions
+            ],
+        }
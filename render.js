@@ -0,0 +1,415 @@
+// 批量绘制：Python（drawbuf.py）每帧把绘制命令写进一个 float32 数组，
+// 这里一次调用全部回放，避免每个 ctx 调用都穿越 Pyodide 边界。
+// 记录格式与 drawbuf.py 保持一致：op, id, x, y, w, h, alpha, aux, aux2
+//
+// 渲染后端（StormRender.create(canvas, kind)）：
+//   "2d"    Canvas 2D，逐条回放
+//   "webgl" WebGL2 实例化绘制，小图打进纹理图集，连续同纹理的命令合并成一次 draw call
+// 两者接口相同：{ name, canvas, define(kind, id, value), flush(proxy, n, sx, sy) }
+// 命令里的坐标是逻辑像素（= world 坐标）；sx/sy 是画布实际像素与逻辑像素之比（渲染分辨率），省略为 1
+(function (root) {
+  "use strict";
+  const STRIDE = 9;
+  const OP_IMAGE = 0, OP_RECT = 1, OP_ELLIPSE = 2, OP_RING = 3, OP_GLOW_RECT = 4;
+  const TAU = Math.PI * 2;
+  // 游戏画面每帧整屏不透明地重画：不要 alpha 通道（合成时少一次混合），
+  // desynchronized 允许浏览器绕开合成器直接上屏（低延迟，不支持时忽略）
+  const CONTEXT_OPTIONS = { alpha: false, desynchronized: true };
+
+  // proxy：Python 端 array('f') 的 PyProxy；getBuffer 直接映射 wasm 内存，无拷贝
+  function withBuffer(proxy, fn) {
+    const buf = proxy.getBuffer("f32");
+    try { fn(buf.data); }
+    finally { buf.release(); }
+  }
+
+  // ---------------------------------------------------------------- Canvas 2D
+  function replay(ctx, f, n, images, styles) {
+    let alpha = 1;
+    ctx.globalAlpha = 1;
+    for (let k = 0, i = 0; k < n; k++, i += STRIDE) {
+      const op = f[i], id = f[i + 1];
+      const x = f[i + 2], y = f[i + 3], w = f[i + 4], h = f[i + 5];
+      if (f[i + 6] !== alpha) { alpha = f[i + 6]; ctx.globalAlpha = alpha; }
+      switch (op) {
+        case OP_IMAGE:
+          try { ctx.drawImage(images[id], x, y, w, h); }
+          catch (e) {
+            // 图片未就绪/损坏时用兜底颜色
+            const fb = f[i + 7];
+            if (fb) { ctx.fillStyle = styles[fb]; ctx.fillRect(x, y, w, h); }
+          }
+          break;
+        case OP_RECT:
+          ctx.fillStyle = styles[id];
+          ctx.fillRect(x, y, w, h);
+          break;
+        case OP_ELLIPSE:
+          ctx.fillStyle = styles[id];
+          ctx.beginPath();
+          ctx.ellipse(x, y, w, h, 0, 0, TAU);
+          ctx.fill();
+          break;
+        case OP_RING:
+          ctx.strokeStyle = styles[id];
+          ctx.lineWidth = h;
+          ctx.beginPath();
+          ctx.arc(x, y, w, 0, TAU);
+          ctx.stroke();
+          break;
+        case OP_GLOW_RECT:
+          ctx.fillStyle = styles[id];
+          ctx.shadowColor = styles[f[i + 7]];
+          ctx.shadowBlur = f[i + 8];
+          ctx.fillRect(x, y, w, h);
+          ctx.shadowBlur = 0;
+          break;
+      }
+    }
+    if (alpha !== 1) ctx.globalAlpha = 1;
+  }
+
+  function create2D(canvas) {
+    const ctx = canvas.getContext("2d", CONTEXT_OPTIONS);
+    if (!ctx) return null;
+    // id -> Image/Canvas 与 id -> CSS 颜色，由 Python 端在新 id 出现时登记
+    const images = [null];
+    const styles = [null];
+    return {
+      name: "2d",
+      canvas: canvas,
+      ctx: ctx,
+      define(kind, id, value) {
+        if (kind === "image") images[id] = value;
+        else styles[id] = value;
+      },
+      flush(proxy, n, sx, sy) {
+        ctx.setTransform(sx || 1, 0, 0, sy || 1, 0, 0);
+        withBuffer(proxy, f => replay(ctx, f, n, images, styles));
+      },
+    };
+  }
+
+  // ---------------------------------------------------------------- WebGL2
+  const ATLAS_SIZE = 2048;
+  const ATLAS_MAX_SPRITE = 512;   // 更大的图（星空背景等）单独一张纹理
+  const MAX_INSTANCES = 4096;
+  // 每个实例：dst(x,y,w,h) uv(u0,v0,u1,v1) color(预乘 rgba) shape(kind, param)
+  const INST_FLOATS = 14;
+  const SHAPE_QUAD = 0, SHAPE_ELLIPSE = 1, SHAPE_RING = 2, SHAPE_GLOW = 3;
+
+  const VERT = `#version 300 es
+layout(location=0) in vec2 a_corner;
+layout(location=1) in vec4 a_dst;
+layout(location=2) in vec4 a_uv;
+layout(location=3) in vec4 a_color;
+layout(location=4) in vec2 a_shape;
+uniform vec2 u_scale;
+out vec2 v_uv;
+out vec2 v_local;
+out vec4 v_color;
+flat out vec2 v_shape;
+flat out vec2 v_half;
+void main() {
+  vec2 p = a_dst.xy + a_corner * a_dst.zw;
+  gl_Position = vec4(p * u_scale + vec2(-1.0, 1.0), 0.0, 1.0);
+  v_uv = mix(a_uv.xy, a_uv.zw, a_corner);
+  v_local = a_corner * 2.0 - 1.0;
+  v_color = a_color;
+  v_shape = a_shape;
+  v_half = a_dst.zw * 0.5;
+}`;
+
+  const FRAG = `#version 300 es
+precision highp float;
+uniform sampler2D u_tex;
+in vec2 v_uv;
+in vec2 v_local;
+in vec4 v_color;
+flat in vec2 v_shape;
+flat in vec2 v_half;
+out vec4 o_color;
+void main() {
+  float a = 1.0;
+  if (v_shape.x == 1.0) {
+    float d = length(v_local);
+    a = clamp((1.0 - d) / fwidth(d), 0.0, 1.0);
+  } else if (v_shape.x == 2.0) {
+    float d = length(v_local);
+    float aa = fwidth(d);
+    a = clamp((1.0 - d) / aa, 0.0, 1.0) * clamp((d - v_shape.y) / aa, 0.0, 1.0);
+  } else if (v_shape.x == 3.0) {
+    vec2 q = max(abs(v_local) * v_half - (v_half - v_shape.y), 0.0) / v_shape.y;
+    a = clamp(1.0 - length(q), 0.0, 1.0);
+    a *= a;
+  }
+  o_color = texture(u_tex, v_uv) * v_color * a;
+}`;
+
+  function compile(gl, type, src) {
+    const sh = gl.createShader(type);
+    gl.shaderSource(sh, src);
+    gl.compileShader(sh);
+    if (!gl.getShaderParameter(sh, gl.COMPILE_STATUS)) {
+      throw new Error("shader: " + gl.getShaderInfoLog(sh));
+    }
+    return sh;
+  }
+
+  // Worker 里没有 document，用 OffscreenCanvas
+  function makeCanvas(w, h) {
+    if (typeof document === "undefined") return new OffscreenCanvas(w, h);
+    const c = document.createElement("canvas");
+    c.width = w;
+    c.height = h;
+    return c;
+  }
+
+  // CSS 颜色交给浏览器解析：画到 1x1 画布再读回像素
+  let colorProbe = null;
+  function parseColor(css) {
+    if (!colorProbe) {
+      const c = makeCanvas(1, 1);
+      colorProbe = c.getContext("2d", { willReadFrequently: true });
+    }
+    colorProbe.clearRect(0, 0, 1, 1);
+    colorProbe.fillStyle = "#000";
+    colorProbe.fillStyle = css;
+    colorProbe.fillRect(0, 0, 1, 1);
+    const d = colorProbe.getImageData(0, 0, 1, 1).data;
+    return [d[0] / 255, d[1] / 255, d[2] / 255, d[3] / 255];
+  }
+
+  function imageSize(img) {
+    if (!img) return null;
+    if (typeof HTMLImageElement !== "undefined" && img instanceof HTMLImageElement) {
+      if (!img.complete) return null;
+      if (!img.naturalWidth) return { broken: true };
+      return { w: img.naturalWidth, h: img.naturalHeight };
+    }
+    if (!img.width || !img.height) return null;
+    return { w: img.width, h: img.height };
+  }
+
+  function createWebGL(canvas) {
+    const gl = canvas.getContext("webgl2", Object.assign({ antialias: false, premultipliedAlpha: true }, CONTEXT_OPTIONS));
+    if (!gl) return null;
+
+    const prog = gl.createProgram();
+    gl.attachShader(prog, compile(gl, gl.VERTEX_SHADER, VERT));
+    gl.attachShader(prog, compile(gl, gl.FRAGMENT_SHADER, FRAG));
+    gl.linkProgram(prog);
+    if (!gl.getProgramParameter(prog, gl.LINK_STATUS)) {
+      throw new Error("program: " + gl.getProgramInfoLog(prog));
+    }
+    gl.useProgram(prog);
+    const uScale = gl.getUniformLocation(prog, "u_scale");
+    gl.uniform1i(gl.getUniformLocation(prog, "u_tex"), 0);
+
+    const vao = gl.createVertexArray();
+    gl.bindVertexArray(vao);
+    const quad = gl.createBuffer();
+    gl.bindBuffer(gl.ARRAY_BUFFER, quad);
+    gl.bufferData(gl.ARRAY_BUFFER, new Float32Array([0, 0, 1, 0, 0, 1, 1, 1]), gl.STATIC_DRAW);
+    gl.enableVertexAttribArray(0);
+    gl.vertexAttribPointer(0, 2, gl.FLOAT, false, 0, 0);
+
+    const inst = new Float32Array(MAX_INSTANCES * INST_FLOATS);
+    const instBuf = gl.createBuffer();
+    gl.bindBuffer(gl.ARRAY_BUFFER, instBuf);
+    gl.bufferData(gl.ARRAY_BUFFER, inst.byteLength, gl.DYNAMIC_DRAW);
+    const bytes = INST_FLOATS * 4;
+    [[1, 4, 0], [2, 4, 16], [3, 4, 32], [4, 2, 48]].forEach(([loc, size, off]) => {
+      gl.enableVertexAttribArray(loc);
+      gl.vertexAttribPointer(loc, size, gl.FLOAT, false, bytes, off);
+      gl.vertexAttribDivisor(loc, 1);
+    });
+
+    gl.enable(gl.BLEND);
+    gl.blendFunc(gl.ONE, gl.ONE_MINUS_SRC_ALPHA);
+    gl.pixelStorei(gl.UNPACK_PREMULTIPLY_ALPHA_WEBGL, true);
+
+    function newTexture(w, h) {
+      const tex = gl.createTexture();
+      gl.bindTexture(gl.TEXTURE_2D, tex);
+      gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_MIN_FILTER, gl.LINEAR);
+      gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_MAG_FILTER, gl.LINEAR);
+      gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_WRAP_S, gl.CLAMP_TO_EDGE);
+      gl.texParameteri(gl.TEXTURE_2D, gl.TEXTURE_WRAP_T, gl.CLAMP_TO_EDGE);
+      if (w) gl.texImage2D(gl.TEXTURE_2D, 0, gl.RGBA, w, h, 0, gl.RGBA, gl.UNSIGNED_BYTE, null);
+      return tex;
+    }
+
+    // 纹理图集：简单的行（shelf）装箱，左上角 2x2 白块给纯色图形用
+    const atlas = newTexture(ATLAS_SIZE, ATLAS_SIZE);
+    gl.texSubImage2D(gl.TEXTURE_2D, 0, 0, 0, 2, 2, gl.RGBA, gl.UNSIGNED_BYTE, new Uint8Array(16).fill(255));
+    const WHITE = [1 / ATLAS_SIZE, 1 / ATLAS_SIZE, 1 / ATLAS_SIZE, 1 / ATLAS_SIZE];
+    let shelfX = 4, shelfY = 0, shelfH = 4;
+
+    function resetAtlas() {
+      shelfX = 4; shelfY = 0; shelfH = 4;
+      for (const e of images) if (e && e.tex === atlas) e.ready = false;
+    }
+
+    function pack(w, h) {
+      if (shelfX + w + 1 > ATLAS_SIZE) { shelfY += shelfH; shelfX = 0; shelfH = 0; }
+      if (shelfY + h + 1 > ATLAS_SIZE) return null;
+      const pos = [shelfX, shelfY];
+      shelfX += w + 1;
+      shelfH = Math.max(shelfH, h + 1);
+      return pos;
+    }
+
+    // id -> { img, tex, uv, ready, broken }；styles: id -> 非预乘 rgba
+    const images = [null];
+    const styles = [null];
+
+    // 返回 true 表示图集被清空重排过，调用方需要重新检查
+    function upload(e) {
+      const size = imageSize(e.img);
+      if (!size) return false;
+      if (size.broken) { e.broken = true; e.ready = true; return false; }
+      const { w, h } = size;
+      if (e.tex && e.tex !== atlas) { gl.deleteTexture(e.tex); e.tex = null; }
+      if (w <= ATLAS_MAX_SPRITE && h <= ATLAS_MAX_SPRITE) {
+        let pos = pack(w, h);
+        let reset = false;
+        if (!pos) { resetAtlas(); reset = true; pos = pack(w, h); }
+        gl.bindTexture(gl.TEXTURE_2D, atlas);
+        gl.texSubImage2D(gl.TEXTURE_2D, 0, pos[0], pos[1], gl.RGBA, gl.UNSIGNED_BYTE, e.img);
+        e.tex = atlas;
+        e.uv = [pos[0] / ATLAS_SIZE, pos[1] / ATLAS_SIZE, (pos[0] + w) / ATLAS_SIZE, (pos[1] + h) / ATLAS_SIZE];
+        e.ready = true;
+        return reset;
+      }
+      e.tex = newTexture(0, 0);
+      gl.texImage2D(gl.TEXTURE_2D, 0, gl.RGBA, gl.RGBA, gl.UNSIGNED_BYTE, e.img);
+      e.uv = [0, 0, 1, 1];
+      e.ready = true;
+      return false;
+    }
+
+    function prepare(f, n) {
+      // 先把本帧用到的图片都传上 GPU，绘制过程中图集不再变化
+      for (let pass = 0; pass < 2; pass++) {
+        let reset = false;
+        for (let k = 0, i = 0; k < n; k++, i += STRIDE) {
+          if (f[i] !== OP_IMAGE) continue;
+          const e = images[f[i + 1]];
+          if (e && !e.ready && upload(e)) reset = true;
+        }
+        if (!reset) return;
+      }
+    }
+
+    let count = 0;
+    let batchTex = atlas;
+    function drawBatch() {
+      if (!count) return;
+      gl.bindTexture(gl.TEXTURE_2D, batchTex);
+      gl.bindBuffer(gl.ARRAY_BUFFER, instBuf);
+      gl.bufferSubData(gl.ARRAY_BUFFER, 0, inst, 0, count * INST_FLOATS);
+      gl.drawArraysInstanced(gl.TRIANGLE_STRIP, 0, 4, count);
+      count = 0;
+    }
+    function push(tex, x, y, w, h, uv, r, g, b, a, shape, param) {
+      if (tex !== batchTex || count >= MAX_INSTANCES) { drawBatch(); batchTex = tex; }
+      const o = count * INST_FLOATS;
+      inst[o] = x; inst[o + 1] = y; inst[o + 2] = w; inst[o + 3] = h;
+      inst[o + 4] = uv[0]; inst[o + 5] = uv[1]; inst[o + 6] = uv[2]; inst[o + 7] = uv[3];
+      inst[o + 8] = r * a; inst[o + 9] = g * a; inst[o + 10] = b * a; inst[o + 11] = a;
+      inst[o + 12] = shape; inst[o + 13] = param;
+      count++;
+    }
+    function pushSolid(sid, alpha, x, y, w, h, shape, param) {
+      const c = styles[sid];
+      if (!c) return;
+      push(atlas, x, y, w, h, WHITE, c[0], c[1], c[2], c[3] * alpha, shape, param);
+    }
+
+    return {
+      name: "webgl",
+      canvas: canvas,
+      ctx: null,
+      define(kind, id, value) {
+        if (kind === "image") {
+          const old = images[id];
+          if (old && old.tex && old.tex !== atlas) gl.deleteTexture(old.tex);
+          images[id] = value ? { img: value, tex: null, uv: null, ready: false, broken: false } : null;
+        } else {
+          styles[id] = parseColor(value);
+        }
+      },
+      flush(proxy, n, sx, sy) {
+        withBuffer(proxy, f => {
+          prepare(f, n);
+          const cw = canvas.width, ch = canvas.height;
+          gl.viewport(0, 0, cw, ch);
+          gl.uniform2f(uScale, 2 * (sx || 1) / cw, -2 * (sy || 1) / ch);
+          gl.clearColor(0, 0, 0, 1);
+          gl.clear(gl.COLOR_BUFFER_BIT);
+          count = 0;
+          batchTex = atlas;
+          for (let k = 0, i = 0; k < n; k++, i += STRIDE) {
+            const op = f[i], id = f[i + 1];
+            const x = f[i + 2], y = f[i + 3], w = f[i + 4], h = f[i + 5];
+            const alpha = f[i + 6];
+            switch (op) {
+              case OP_IMAGE: {
+                const e = images[id];
+                if (e && e.ready && !e.broken) push(e.tex, x, y, w, h, e.uv, 1, 1, 1, alpha, SHAPE_QUAD, 0);
+                else if (e && e.broken && f[i + 7]) pushSolid(f[i + 7], alpha, x, y, w, h, SHAPE_QUAD, 0);
+                break;
+              }
+              case OP_RECT:
+                pushSolid(id, alpha, x, y, w, h, SHAPE_QUAD, 0);
+                break;
+              case OP_ELLIPSE:
+                pushSolid(id, alpha, x - w, y - h, 2 * w, 2 * h, SHAPE_ELLIPSE, 0);
+                break;
+              case OP_RING: {
+                const outer = w + h / 2;
+                pushSolid(id, alpha, x - outer, y - outer, 2 * outer, 2 * outer, SHAPE_RING, Math.max(0, w - h / 2) / outer);
+                break;
+              }
+              case OP_GLOW_RECT: {
+                const blur = Math.max(1, f[i + 8]);
+                pushSolid(f[i + 7], alpha, x - blur, y - blur, w + 2 * blur, h + 2 * blur, SHAPE_GLOW, blur);
+                pushSolid(id, alpha, x, y, w, h, SHAPE_QUAD, 0);
+                break;
+              }
+            }
+          }
+          drawBatch();
+        });
+      },
+    };
+  }
+
+  // kind: "webgl" 优先尝试 WebGL2，不可用时自动退回 2D
+  function create(canvas, kind) {
+    if (kind === "webgl") {
+      // 先在探测画布上确认 WebGL2 可用，避免把游戏画布锁死在一个用不了的上下文上
+      let probe = null;
+      try { probe = makeCanvas(1, 1).getContext("webgl2"); } catch (e) { probe = null; }
+      if (probe) {
+        try {
+          const r = createWebGL(canvas);
+          if (r) return r;
+        } catch (e) {
+          console.warn("WebGL renderer failed, falling back to 2D:", e);
+          // 画布已被 WebGL 占用，换一个新画布给 2D 用（Worker 里的 OffscreenCanvas 换不了）
+          if (typeof canvas.cloneNode !== "function") return null;
+          const fresh = canvas.cloneNode(false);
+          if (canvas.parentNode) canvas.parentNode.replaceChild(fresh, canvas);
+          canvas = fresh;
+        }
+      } else {
+        console.warn("WebGL2 unavailable, using the 2D renderer");
+      }
+    }
+    return create2D(canvas);
+  }
+
+  root.StormRender = { STRIDE, CONTEXT_OPTIONS, create, replay };
+})(typeof self !== "undefined" ? self : window);
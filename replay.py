@@ -0,0 +1,143 @@
+"""Input recording and frame-exact playback for World runs.
+
+A run is reproducible from its seed, difficulty, playfield size and the
+inputs fed to each ``World.step()``.  ``Recorder`` captures those into a
+small JSON-able log and ``Player`` feeds them back tick by tick, in main.py
+(``?replay=``) or headlessly in ``tools/replay.py``.
+
+Log layout (``VERSION`` 1)::
+
+    {"v": 1, "seed": 123, "diff": "normal", "w": 800, "h": 600,
+     "sticky": false, "store": "list", "ticks": 5400,
+     "keys": [[bits, run], ...],        # run-length encoded key bitmask
+     "pointer": [[tick, x, y], ...],    # only ticks that carried a pointer
+     "resize": [[tick, w, h], ...],     # applied before that tick's step
+     "score": 1234.5, "frame": 5400}    # end state, for verification
+
+Pointer coordinates are stored as the floats the world saw, so JSON
+round-trips them exactly.  ``sticky`` is the homing mode that was in effect
+and ``store`` the bullet store it ran on (``World.bullet_store``, for
+reference: both stores replay the same).  Sticky homing only exists in the
+list store, so ``Player.mismatch()`` reports a sticky log replayed on the
+NumPy store.
+"""
+import json
+
+VERSION = 1
+
+# bit i of the key mask = KEYS[i] held
+KEYS = ("ArrowLeft", "ArrowRight", "ArrowUp", "ArrowDown", "Space")
+
+
+def _bits(inputs):
+    bits = 0
+    for i, k in enumerate(KEYS):
+        if inputs.get(k):
+            bits |= 1 << i
+    return bits
+
+
+class Recorder:
+    """Collects one run's inputs; call ``record()`` right before each step()."""
+
+    def __init__(self):
+        self.log = None
+
+    def begin(self, seed, diff, width, height, sticky=False, store="list"):
+        self.log = {"v": VERSION, "seed": seed, "diff": diff, "w": width, "h": height,
+                    "sticky": bool(sticky), "store": store,
+                    "ticks": 0, "keys": [], "pointer": [], "resize": []}
+
+    def record(self, inputs):
+        log = self.log
+        if log is None:
+            return
+        bits = _bits(inputs)
+        runs = log["keys"]
+        if runs and runs[-1][0] == bits:
+            runs[-1][1] += 1
+        else:
+            runs.append([bits, 1])
+        pointer = inputs.get("pointer")
+        if pointer is not None:
+            log["pointer"].append([log["ticks"], pointer[0], pointer[1]])
+        log["ticks"] += 1
+
+    def resize(self, width, height):
+        log = self.log
+        if log is None:
+            return
+        if log["ticks"] == 0:
+            log["w"], log["h"] = width, height
+        else:
+            log["resize"].append([log["ticks"], width, height])
+
+    def finish(self, world):
+        """Stamp the end state and return the log (recording stops)."""
+        log = self.log
+        self.log = None
+        if log is not None:
+            log["score"] = world.score
+            log["frame"] = world.frame
+        return log
+
+    def dumps(self, log=None):
+        return json.dumps(log if log is not None else self.log, separators=(",", ":"))
+
+
+class Player:
+    """Replays a log: ``next_inputs(world)`` returns the inputs for the next step()."""
+
+    def __init__(self, log):
+        if isinstance(log, str):
+            log = json.loads(log)
+        if log.get("v") != VERSION:
+            raise ValueError("unsupported replay version: %r" % (log.get("v"),))
+        self.log = log
+        self.tick = 0
+        self._run = 0
+        self._left = log["keys"][0][1] if log["keys"] else 0
+        self._pointer = 0
+        self._resize = 0
+
+    @property
+    def done(self):
+        return self.tick >= self.log["ticks"]
+
+    def mismatch(self, world):
+        """Why ``world`` cannot replay this log faithfully, or None if it can."""
+        if self.log.get("sticky") and world.bullet_store != "list":
+            return "recorded with sticky homing, which only the list bullet store supports"
+        return None
+
+    def start(self, world):
+        """Reset ``world`` to the recorded starting state."""
+        log = self.log
+        world.homing_sticky = log.get("sticky", False)
+        world.resize(log["w"], log["h"])
+        world.reset(log["diff"], seed=log["seed"])
+
+    def next_inputs(self, world):
+        log = self.log
+        tick = self.tick
+        resizes = log["resize"]
+        while self._resize < len(resizes) and resizes[self._resize][0] <= tick:
+            _, w, h = resizes[self._resize]
+            world.resize(w, h)
+            self._resize += 1
+        runs = log["keys"]
+        while self._left == 0 and self._run + 1 < len(runs):
+            self._run += 1
+            self._left = runs[self._run][1]
+        bits = runs[self._run][0] if runs else 0
+        self._left -= 1
+        inputs = {k: bool(bits >> i & 1) for i, k in enumerate(KEYS)}
+        pointers = log["pointer"]
+        pointer = None
+        if self._pointer < len(pointers) and pointers[self._pointer][0] == tick:
+            pointer = (pointers[self._pointer][1], pointers[self._pointer][2])
+            self._pointer += 1
+        inputs["pointer"] = pointer
+        self.tick = tick + 1
+        return inputs
+
@@ -0,0 +1,239 @@
+"""Uniform-grid broadphase for the collision passes in world.py.
+
+Objects only need ``x``, ``y``, ``w``, ``h``.  The grid covers the playfield;
+anything outside it (enemies spawning above the top edge, bullets in the
+cull margin) is clamped into the border cells, so queries stay correct and
+only get a few extra candidates there.
+
+NearestGrid answers "closest centre to this point" for homing bullets.
+"""
+
+import math
+
+GRID_CELL = 64  # px; about the size of the largest enemy
+NEAREST_CELL = 128    # NearestGrid: coarser cells mean fewer empty rings to walk
+NEAREST_SCAN_MAX = 32  # NearestGrid: below this many objects, a plain scan wins
+
+
+class UniformGrid:
+    """Spatial hash over the playfield, rebuilt once per frame.
+
+    ``build(objs)`` replaces the contents; ``query(x, y, w, h)`` returns the
+    indices into ``items`` of everything whose cells touch that box, in
+    insertion order, so callers that care about "first hit wins" keep the
+    same order as a plain list scan.
+    """
+    def __init__(self, width, height, cell=GRID_CELL):
+        self.cell = cell
+        self._inv = 1.0 / cell
+        self.items = []
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        self.cols = max(1, int(width // self.cell) + 1)
+        self.rows = max(1, int(height // self.cell) + 1)
+        self._cells = [[] for _ in range(self.cols * self.rows)]
+        self._used = []
+        self.items = []
+
+    def clear(self):
+        cells = self._cells
+        for ci in self._used:
+            cells[ci].clear()
+        self._used.clear()
+        self.items.clear()
+
+    def build(self, objs):
+        # Clamp each box to the border cells and append its index to every
+        # cell it touches; this runs for every enemy/bullet every frame.
+        self.clear()
+        inv = self._inv
+        cols = self.cols
+        last_c = cols - 1
+        last_r = self.rows - 1
+        cells = self._cells
+        used = self._used
+        items = self.items
+        idx = 0
+        for obj in objs:
+            x = obj.x; y = obj.y
+            c0 = int(x * inv); c1 = int((x + obj.w) * inv)
+            r0 = int(y * inv); r1 = int((y + obj.h) * inv)
+            if c0 < 0: c0 = 0
+            elif c0 > last_c: c0 = last_c
+            if c1 < 0: c1 = 0
+            elif c1 > last_c: c1 = last_c
+            if r0 < 0: r0 = 0
+            elif r0 > last_r: r0 = last_r
+            if r1 < 0: r1 = 0
+            elif r1 > last_r: r1 = last_r
+            items.append(obj)
+            if c0 == c1 and r0 == r1:
+                ci = r0 * cols + c0
+                cell = cells[ci]
+                if not cell:
+                    used.append(ci)
+                cell.append(idx)
+            else:
+                for r in range(r0, r1 + 1):
+                    base = r * cols
+                    for ci in range(base + c0, base + c1 + 1):
+                        cell = cells[ci]
+                        if not cell:
+                            used.append(ci)
+                        cell.append(idx)
+            idx += 1
+
+    def query(self, x, y, w, h):
+        """Indices (ascending) of candidate items overlapping the box.
+
+        The returned list may be shared with the grid; do not mutate it.
+        """
+        inv = self._inv
+        last_c = self.cols - 1
+        last_r = self.rows - 1
+        c0 = int(x * inv); c1 = int((x + w) * inv)
+        r0 = int(y * inv); r1 = int((y + h) * inv)
+        if c0 < 0: c0 = 0
+        elif c0 > last_c: c0 = last_c
+        if c1 < 0: c1 = 0
+        elif c1 > last_c: c1 = last_c
+        if r0 < 0: r0 = 0
+        elif r0 > last_r: r0 = last_r
+        if r1 < 0: r1 = 0
+        elif r1 > last_r: r1 = last_r
+
+        cells = self._cells
+        cols = self.cols
+        if c0 == c1 and r0 == r1:
+            return cells[r0 * cols + c0]
+        found = set()
+        for r in range(r0, r1 + 1):
+            base = r * cols
+            for ci in range(base + c0, base + c1 + 1):
+                found.update(cells[ci])
+        return sorted(found)
+
+
+class NearestGrid:
+    """Nearest-centre queries over a set of objects, rebuilt once per frame.
+
+    Homing bullets used to scan every enemy for the closest one, each tick,
+    so the cost grew with homing bullets x enemies.  ``build(objs)`` buckets
+    the object centres by cell; ``nearest(x, y)`` searches rings of cells
+    outwards from (x, y) and stops once no unvisited cell can hold anything
+    closer.  Centres outside the playfield (enemies still entering from the
+    top) are kept in a side list that every query scans.
+
+    Ties go to the object inserted first, matching a linear scan with ``<``.
+    """
+    def __init__(self, width, height, cell=NEAREST_CELL):
+        self.cell = cell
+        self._inv = 1.0 / cell
+        self.items = []
+        self.xs = []
+        self.ys = []
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        self.cols = max(1, int(width // self.cell) + 1)
+        self.rows = max(1, int(height // self.cell) + 1)
+        self._cells = [[] for _ in range(self.cols * self.rows)]
+        self._used = []
+        self._outside = []
+        self.items = []; self.xs = []; self.ys = []
+
+    def clear(self):
+        cells = self._cells
+        for ci in self._used:
+            cells[ci].clear()
+        self._used.clear()
+        self._outside.clear()
+        self.items.clear(); self.xs.clear(); self.ys.clear()
+
+    def build(self, objs):
+        self.clear()
+        items = self.items; xs = self.xs; ys = self.ys
+        for obj in objs:
+            items.append(obj)
+            xs.append(obj.x + obj.w/2)
+            ys.append(obj.y + obj.h/2)
+        if len(items) <= NEAREST_SCAN_MAX:
+            return  # nearest() just scans xs/ys
+        inv = self._inv
+        cols = self.cols
+        rows = self.rows
+        cells = self._cells
+        used = self._used
+        outside = self._outside
+        idx = 0
+        for cx, cy in zip(xs, ys):
+            c = int(cx * inv) if cx >= 0 else -1
+            r = int(cy * inv) if cy >= 0 else -1
+            if 0 <= c < cols and 0 <= r < rows:
+                ci = r * cols + c
+                cell = cells[ci]
+                if not cell:
+                    used.append(ci)
+                cell.append(idx)
+            else:
+                outside.append(idx)
+            idx += 1
+
+    def nearest(self, x, y):
+        """The object whose centre is closest to (x, y), or None if empty."""
+        xs = self.xs; ys = self.ys
+        if not xs:
+            return None
+        best = -1
+        best_d2 = math.inf
+        if len(xs) <= NEAREST_SCAN_MAX:
+            # 目标很少时，直接扫一遍预先算好的中心点比逐圈找格子更快
+            i = 0
+            for ex, ey in zip(xs, ys):
+                dx = ex - x; dy = ey - y
+                d2 = dx*dx + dy*dy
+                if d2 < best_d2:
+                    best = i; best_d2 = d2
+                i += 1
+            return self.items[best]
+        for i in self._outside:
+            dx = xs[i] - x; dy = ys[i] - y
+            d2 = dx*dx + dy*dy
+            if d2 < best_d2:
+                best = i; best_d2 = d2
+
+        cell = self.cell
+        cols = self.cols; rows = self.rows
+        last_c = cols - 1; last_r = rows - 1
+        c = int(x * self._inv) if x >= 0 else 0
+        r = int(y * self._inv) if y >= 0 else 0
+        if c > last_c: c = last_c
+        if r > last_r: r = last_r
+        cells = self._cells
+        k = 0
+        while True:
+            c0 = c - k; c1 = c + k; r0 = r - k; r1 = r + k
+            for rr in range(r0 if r0 > 0 else 0, (r1 if r1 < last_r else last_r) + 1):
+                if rr == r0 or rr == r1:
+                    ccs = range(c0 if c0 > 0 else 0, (c1 if c1 < last_c else last_c) + 1)
+                else:
+                    ccs = [cc for cc in (c0, c1) if 0 <= cc <= last_c]
+                base = rr * cols
+                for cc in ccs:
+                    for i in cells[base + cc]:
+                        dx = xs[i] - x; dy = ys[i] - y
+                        d2 = dx*dx + dy*dy
+                        if d2 < best_d2 or (d2 == best_d2 and i < best):
+                            best = i; best_d2 = d2
+            # Anything not visited yet lies beyond the nearest open side of
+            # the searched square; sides on the grid border have nothing past them.
+            lb = math.inf
+            if c0 > 0: lb = min(lb, x - c0 * cell)
+            if c1 < last_c: lb = min(lb, (c1 + 1) * cell - x)
+            if r0 > 0: lb = min(lb, y - r0 * cell)
+            if r1 < last_r: lb = min(lb, (r1 + 1) * cell - y)
+            if lb == math.inf or best_d2 < lb * lb:
+                break
+            k += 1
+        return self.items[best] if best >= 0 else None
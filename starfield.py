@@ -0,0 +1,115 @@
+"""Starfield rasterizer.
+
+The scrolling background used to be drawn star by star on an offscreen
+canvas (``beginPath``/``arc``/``fill`` and a ``globalAlpha`` per star), a few
+hundred JS calls on every resize.  ``StarfieldBuffer`` draws the same stars
+into an RGBA byte buffer in Python instead; main.py uploads it with a single
+``putImageData``.  The buffer is kept and reused for any later size that
+fits in it.
+
+Stars wrap vertically, so the image tiles seamlessly as it scrolls.  Plain
+Python is enough here: a 1080p field is a few hundred stars of a few dozen
+pixels each, so NumPy would not pay for loading it.
+"""
+import math
+
+# (stars per pixel of area, minimum count, radius range, alpha range), far to near
+LAYERS = (
+    (1 / 11000, 35, (0.6, 1.2), (0.35, 0.7)),   # distant faint stars
+    (1 / 22000, 18, (1.0, 1.8), (0.6, 0.9)),    # mid stars
+    (1 / 36000, 7,  (1.6, 2.4), (0.8, 1.0)),    # near bright stars
+)
+
+
+def stars(width, height, randf, layers=len(LAYERS)):
+    """(x, y, r, alpha) for the nearest ``layers`` star layers of a ``width`` x ``height`` field.
+
+    ``height`` is the full image height; densities follow the visible area
+    (half of it), like the old canvas version.
+    """
+    area = width * height // 2
+    out = []
+    for density, minimum, (rmin, rmax), (amin, amax) in LAYERS[len(LAYERS) - layers:]:
+        for _ in range(max(minimum, int(area * density))):
+            x = int(randf(0, width))
+            y = int(randf(0, height))
+            out.append((x, y, randf(rmin, rmax), randf(amin, amax)))
+    return out
+
+
+def _coverage(r):
+    """Per-pixel coverage of a disc of radius ``r`` centred on a pixel corner.
+
+    Returns (half, rows) where rows[j][i] is the coverage of pixel
+    (cx - half + i, cy - half + j).
+    """
+    half = int(math.ceil(r + 0.5))
+    rows = []
+    for j in range(-half, half):
+        dy = j + 0.5
+        row = []
+        for i in range(-half, half):
+            dx = i + 0.5
+            row.append(min(1.0, max(0.0, r + 0.5 - math.sqrt(dx * dx + dy * dy))))
+        rows.append(row)
+    return half, rows
+
+
+class StarfieldBuffer:
+    """RGBA pixels of a starfield, reused across sizes that fit the allocation.
+
+    Stars are white with alpha = brightness on a transparent background;
+    main.py fills black behind them after the upload.  Only the pixels
+    stamped last time are cleared on reuse, never the whole buffer.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.width = 0
+        self.height = 0
+        self._stamps = []   # (byte offset, length) written by the last render
+
+    def render(self, width, height, star_list):
+        """Rasterize ``star_list`` into a ``width`` x ``height`` image; returns a memoryview of its bytes."""
+        n = width * height * 4
+        if n > len(self.data):
+            self.data = bytearray(n)
+        else:
+            data = self.data
+            for o, length in self._stamps:
+                data[o:o + length] = bytes(length)
+        self._stamps = []
+        self.width = width
+        self.height = height
+        kernels = {}
+        for x, y, r, a in star_list:
+            kr = round(r, 1)
+            k = kernels.get(kr)
+            if k is None:
+                k = kernels[kr] = _coverage(kr)
+            self._stamp(x, y, a, *k)
+        return memoryview(self.data)[:n]
+
+    def _stamp(self, x, y, a, half, rows):
+        w, h = self.width, self.height
+        data = self.data
+        x0 = x - half
+        i0 = max(0, -x0)
+        i1 = min(2 * half, w - x0)
+        if i0 >= i1:
+            return
+        scale = 255 * a
+        for j, row in enumerate(rows):
+            seg = bytearray()
+            for cov in row[i0:i1]:
+                v = int(scale * cov + 0.5)
+                seg += b"\xff\xff\xff" + bytes((v,)) if v else b"\x00\x00\x00\x00"
+            o = (((y - half + j) % h) * w + x0 + i0) * 4
+            end = o + len(seg)
+            if any(data[o + 3:end:4]):
+                # 和已经画过的星星重叠：逐像素取亮的
+                for k in range(3, len(seg), 4):
+                    if data[o + k] > seg[k]:
+                        seg[k - 3:k + 1] = data[o + k - 3:o + k + 1]
+            data[o:end] = seg
+            self._stamps.append((o, len(seg)))
@@ -0,0 +1,331 @@
+"""Deterministic worst-case frame benchmarks for the headless World.
+
+Each scenario seeds a World, scripts it into one of the states players report
+stutters in (boss spiral at the bullet cap, clear-wave bursts, a full enemy
+screen) and then times every step() by phase.  A second, identical run with
+tracemalloc on measures allocations, so the timing numbers are not skewed by
+tracing overhead.
+
+    python tools/bench.py                       # all scenarios, table to stdout
+    python tools/bench.py --json out.json       # also write machine-readable results
+    python tools/bench.py --compare base.json   # show p50/p95/p99 ratios against a previous run
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import world as W  # noqa: E402
+
+WIDTH, HEIGHT = 1280, 720
+WARMUP_FRAMES = 120
+MEASURE_FRAMES = 600
+
+
+def _pin_player(world):
+    # Keep the run alive: the scenarios measure load, not survival.
+    world.player.hp = 10 ** 9
+    world.player.shield = 0
+
+
+def _sweep_inputs(i):
+    # Strafe left/right so bullets fan across the whole screen.
+    left = (i // 90) % 2 == 0
+    return {"ArrowLeft": left, "ArrowRight": not left}
+
+
+def _fill_enemies(world):
+    rng = world.rng
+    while len(world.enemies) < W.MAX_ENEMIES:
+        world.spawn_enemy()
+    for e in world.enemies:
+        if e.y < 0:
+            e.y = rng.random() * world.height * 0.6
+
+
+def _fill_enemy_bullets(world):
+    rng = world.rng
+    while len(world.bullets) < W.MAX_BULLETS:
+        x = rng.random() * world.width
+        y = rng.random() * world.height * 0.8
+        world.bullets.append(world.new_bullet(x, y, rng.uniform(-1, 1), rng.uniform(0.5, 2.5), "enemy",
+                                           sprite_key="boss_bullet_default", bullet_type="orb", damage=0))
+
+
+def _spawn_boss(world):
+    world.score = max(world.score, world.spawn_boss_at)
+    world.maybe_spawn_boss()
+    world.boss.y = 40
+    world.boss.hp = 10 ** 9
+
+
+# ---- scenarios: name -> (description, diff, setup(world), before_frame(world, i)) ----
+
+def _steady_setup(world):
+    _pin_player(world)
+
+def _steady_frame(world, i):
+    _pin_player(world)
+
+
+def _boss_spiral_setup(world):
+    _pin_player(world)
+    _spawn_boss(world)
+
+def _boss_spiral_frame(world, i):
+    _pin_player(world)
+    boss = world.boss
+    if boss is None:
+        _spawn_boss(world)
+        boss = world.boss
+    # Next update() rolls phase 1 -> 2: Boss.fire_pattern(2), the 24-orb spiral.
+    boss.phase = 1
+    boss.cd = 1
+
+
+def _bullet_cap_setup(world):
+    _pin_player(world)
+    world.player.weapon = "spread"
+    _spawn_boss(world)
+
+def _bullet_cap_frame(world, i):
+    _pin_player(world)
+    _fill_enemy_bullets(world)
+    if world.boss is None:
+        _spawn_boss(world)
+
+
+def _clear_wave_setup(world):
+    _pin_player(world)
+
+def _clear_wave_frame(world, i):
+    _pin_player(world)
+    _fill_enemies(world)
+    if i % W.CLEAR_WAVE_PULSE_GAP == 0:
+        # Pulse this frame: 42 enemies plus every enemy bullet explode at once.
+        _fill_enemy_bullets(world)
+        world.player.clear_wave_timer = W.CLEAR_WAVE_DURATION
+        world.player.clear_wave_pulse_cd = 0
+
+
+def _max_enemies_setup(world):
+    _pin_player(world)
+    world.player.weapon = "spread"
+
+def _max_enemies_frame(world, i):
+    _pin_player(world)
+    _fill_enemies(world)
+    for e in world.enemies:
+        e.hp = max(e.hp, 60)
+
+
+SCENARIOS = {
+    "steady": ("normal play on 'normal', no scripting beyond an immortal player",
+               "normal", _steady_setup, _steady_frame),
+    "boss_spiral": ("Boss.fire_pattern(2) every frame, bullets saturating MAX_BULLETS",
+                    "hard", _boss_spiral_setup, _boss_spiral_frame),
+    "bullet_cap": ("MAX_BULLETS enemy orbs on screen every frame, spread weapon vs boss",
+                   "hard", _bullet_cap_setup, _bullet_cap_frame),
+    "clear_wave": ("run_clear_wave() pulse over MAX_ENEMIES enemies and a full bullet cap",
+                   "normal", _clear_wave_setup, _clear_wave_frame),
+    "max_enemies": ("MAX_ENEMIES tanky enemies on screen against the spread weapon",
+                    "hard", _max_enemies_setup, _max_enemies_frame),
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def _summary(values, scale=1.0):
+    return {
+        "p50": round(percentile(values, 50) * scale, 4),
+        "p95": round(percentile(values, 95) * scale, 4),
+        "p99": round(percentile(values, 99) * scale, 4),
+        "max": round(max(values) * scale, 4) if values else 0.0,
+        "mean": round(sum(values) / len(values) * scale, 4) if values else 0.0,
+    }
+
+
+def _prepare(name, seed, warmup, bullets="list"):
+    _desc, diff, setup, before = SCENARIOS[name]
+    world = W.World(WIDTH, HEIGHT, diff, seed=seed, bullet_store=bullets)
+    setup(world)
+    for i in range(warmup):
+        before(world, i)
+        world.step(_sweep_inputs(i))
+        world.sounds.clear()
+    return world, before
+
+
+def run_timing(name, seed, frames, warmup, bullets="list"):
+    world, before = _prepare(name, seed, warmup, bullets)
+    step_s = []
+    phase_s = {p: [] for p in W.World.PHASES}
+    counts = {"enemies": [], "bullets": [], "effects": [], "powers": []}
+    gc_before = sum(s["collections"] for s in gc.get_stats())
+    clock = time.perf_counter
+    for i in range(warmup, warmup + frames):
+        before(world, i)
+        timings = {}
+        t0 = clock()
+        world.step(_sweep_inputs(i), timings)
+        step_s.append(clock() - t0)
+        world.sounds.clear()
+        for p in W.World.PHASES:
+            phase_s[p].append(timings.get(p, 0.0))
+        counts["enemies"].append(len(world.enemies))
+        counts["bullets"].append(len(world.bullets))
+        counts["effects"].append(len(world.effects))
+        counts["powers"].append(len(world.powers))
+    gc_after = sum(s["collections"] for s in gc.get_stats())
+    return {
+        "step_ms": _summary(step_s, 1000.0),
+        "phases_ms": {p: _summary(v, 1000.0) for p, v in phase_s.items()},
+        "entities_max": {k: max(v) for k, v in counts.items()},
+        "entities_mean": {k: round(sum(v) / len(v), 1) for k, v in counts.items()},
+        "gc_collections": gc_after - gc_before,
+        "bullets": world.bullet_store,
+        "pools": world.pool_stats(),
+        "score": int(world.score),
+    }
+
+
+def run_allocations(name, seed, frames, warmup, bullets="list"):
+    world, before = _prepare(name, seed, warmup, bullets)
+    peak_kib = []
+    blocks = []
+    tracemalloc.start()
+    try:
+        for i in range(warmup, warmup + frames):
+            before(world, i)
+            inputs = _sweep_inputs(i)
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            b0 = sys.getallocatedblocks()
+            world.step(inputs)
+            b1 = sys.getallocatedblocks()
+            _, peak = tracemalloc.get_traced_memory()
+            world.sounds.clear()
+            peak_kib.append((peak - start) / 1024.0)
+            blocks.append(b1 - b0)
+    finally:
+        tracemalloc.stop()
+    return {
+        # transient heap growth inside one step() (allocation pressure)
+        "peak_kib": _summary(peak_kib),
+        # net allocated blocks left behind by one step() (retained objects)
+        "net_blocks": _summary(blocks),
+    }
+
+
+def _git_rev():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(names, seed, frames, warmup, allocations=True, bullets="list"):
+    result = {
+        "meta": {
+            "commit": _git_rev(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "seed": seed,
+            "frames": frames,
+            "warmup": warmup,
+            "size": [WIDTH, HEIGHT],
+            # 实际用上的存储（缺 numpy 时会退回 list），不是 --bullets 要的那个
+            "bullets": None,
+        },
+        "scenarios": {},
+    }
+    for name in names:
+        entry = {"description": SCENARIOS[name][0]}
+        entry.update(run_timing(name, seed, frames, warmup, bullets))
+        result["meta"]["bullets"] = entry.pop("bullets")
+        if allocations:
+            entry["alloc"] = run_allocations(name, seed, frames, warmup, bullets)
+        result["scenarios"][name] = entry
+    return result
+
+
+def print_table(result, baseline=None):
+    phases = W.World.PHASES
+    store = result["meta"]["bullets"]
+    base_store = (baseline or {}).get("meta", {}).get("bullets")
+    if baseline and base_store != store:
+        print(f"warning: baseline used the {base_store} bullet store, this run {store}")
+    for name, entry in result["scenarios"].items():
+        step = entry["step_ms"]
+        line = f"{name:<12} step p50 {step['p50']:.3f}  p95 {step['p95']:.3f}  p99 {step['p99']:.3f} ms"
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            ratios = []
+            for q in ("p50", "p95", "p99"):
+                old = base["step_ms"][q]
+                ratios.append(f"{q} x{step[q] / old:.2f}" if old else f"{q} n/a")
+            line += "   vs base: " + ", ".join(ratios)
+        print(line)
+        print("    phases p95 ms: " + "  ".join(f"{p} {entry['phases_ms'][p]['p95']:.3f}" for p in phases))
+        ents = entry["entities_max"]
+        print(f"    max entities: enemies {ents['enemies']} bullets {ents['bullets']} "
+              f"effects {ents['effects']} powers {ents['powers']}   gc runs {entry['gc_collections']}")
+        print("    pool high-water: " + "  ".join(f"{k} {v['high_water']}" for k, v in entry["pools"].items()))
+        if "alloc" in entry:
+            alloc = entry["alloc"]
+            print(f"    alloc per step: peak p95 {alloc['peak_kib']['p95']:.1f} KiB, "
+                  f"net blocks p95 {alloc['net_blocks']['p95']:.0f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                    help="run only this scenario (repeatable)")
+    ap.add_argument("--frames", type=int, default=MEASURE_FRAMES)
+    ap.add_argument("--warmup", type=int, default=WARMUP_FRAMES)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--bullets", choices=("list", "numpy"), default="list",
+                    help="bullet store passed to World (numpy falls back to list if missing)")
+    ap.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    ap.add_argument("--compare", metavar="PATH", help="previous --json output to compare against")
+    args = ap.parse_args(argv)
+
+    names = args.scenario or list(SCENARIOS)
+    result = run(names, args.seed, args.frames, args.warmup, allocations=not args.no_alloc,
+                 bullets=args.bullets)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.json == "-":
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print_table(result, baseline)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, sort_keys=True)
+                f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
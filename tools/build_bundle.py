@@ -0,0 +1,110 @@
+"""Package the game's Python modules into pybundle.zip (precompiled .pyc).
+
+boot.js fetches the zip in one request, unpacks it with
+``pyodide.unpackArchive`` and imports main from it, so the browser neither
+fetches the sources one by one nor parses/compiles them.  When the zip is
+missing or was built by a different Python than Pyodide's, boot.js falls
+back to fetching the .py files.
+
+The bytecode only loads on the same CPython minor version that Pyodide
+ships (Pyodide 314.x is Python 3.14), so run this with that interpreter;
+the Dockerfile does it in a build stage.
+
+    python3.14 tools/build_bundle.py           # write pybundle.zip
+    python3.14 tools/build_bundle.py --check   # exit 1 if pybundle.zip is stale
+"""
+import argparse
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import py_compile
+import sys
+import tempfile
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT = os.path.join(ROOT, "pybundle.zip")
+META = "bundle.json"
+
+# boot.js 的 PY_SOURCES 顺序：utils、纯 Python 模块、main
+MODULES = (
+    "utils.py", "spatial.py", "bulletstore.py", "pools.py", "world.py",
+    "drawbuf.py", "hud.py", "assets.py", "replay.py", "profiler.py", "quality.py", "starfield.py", "main.py",
+)
+
+# 固定时间戳，同样的源码打出同样的 zip
+_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _compile(name, tmpdir):
+    src = os.path.join(ROOT, name)
+    cfile = os.path.join(tmpdir, name + "c")
+    # UNCHECKED_HASH：不带源码时间戳（可复现），运行时也不去找 .py 校验
+    py_compile.compile(src, cfile=cfile, dfile=name, doraise=True,
+                       invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+    with open(cfile, "rb") as f:
+        return f.read()
+
+
+def build():
+    meta = {
+        "python": "%d.%d" % sys.version_info[:2],
+        "magic": importlib.util.MAGIC_NUMBER.hex(),
+        "modules": {},
+    }
+    buf = io.BytesIO()
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in MODULES:
+            with open(os.path.join(ROOT, name), "rb") as f:
+                meta["modules"][name] = _sha(f.read())
+            info = zipfile.ZipInfo(name + "c", _EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, _compile(name, tmpdir))
+        info = zipfile.ZipInfo(META, _EPOCH)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        zf.writestr(info, json.dumps(meta, indent=1, sort_keys=True) + "\n")
+    return buf.getvalue(), meta
+
+
+def _current_meta():
+    try:
+        with zipfile.ZipFile(OUT) as zf:
+            return json.loads(zf.read(META))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--check", action="store_true", help="fail if pybundle.zip does not match the sources")
+    args = ap.parse_args(argv)
+
+    if args.check:
+        # 只比较源码哈希：检查用的解释器不必和打包时相同
+        current = _current_meta()
+        want = {}
+        for name in MODULES:
+            with open(os.path.join(ROOT, name), "rb") as f:
+                want[name] = _sha(f.read())
+        if current is None or current.get("modules") != want:
+            print("pybundle.zip is stale; run python tools/build_bundle.py", file=sys.stderr)
+            return 1
+        return 0
+
+    data, meta = build()
+    with open(OUT, "wb") as f:
+        f.write(data)
+    print(f"pybundle.zip: {len(meta['modules'])} modules, {len(data) / 1024:.1f} KiB, "
+          f"Python {meta['python']} (magic {meta['magic']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
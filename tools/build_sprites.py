@@ -0,0 +1,240 @@
+"""Build size-appropriate, recompressed copies of the game's sprites.
+
+img/ holds the original art: multi-megabyte GIFs and PNGs several times
+larger than the 36-188 px they are drawn at (``assets.DRAW_SIZES``).  This
+shrinks every sprite in ``assets.SPRITES`` / ``SPRITE_FALLBACKS`` to its
+largest drawn size times the highest render scale, recompresses it as WebP
+(lossy or lossless, whichever is smaller) and turns animated GIFs into a
+sheet of frames.  Outputs get content-hashed names, so they can be cached
+forever.
+
+It also shrinks the 512 px ``img/planeicon.png`` to the page icons in
+``ICONS``.  index.html links those by name, so they are PNGs with fixed
+paths in img/ and are committed with the source art.
+
+The result goes to img/build/ with a mapping sprites.json (original path ->
+built file, size, frame layout).  tools/gen_manifest.py folds the mapping
+into assets.json: the loader downloads the built files and files them under
+the original paths, so main.py's ``_to_img`` keeps asking for the paths in
+assets.py.  Without img/build/ everything loads the originals as before.
+
+Needs Pillow (build time only; the Dockerfile runs it in a build stage):
+
+    pip install Pillow
+    python tools/build_sprites.py      # write img/build/
+    python tools/gen_manifest.py       # point assets.json at it
+"""
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import assets  # noqa: E402
+
+OUT_DIR = os.path.join(ROOT, "img", "build")
+MAP_NAME = "sprites.json"
+MAP_VERSION = 1
+
+MAX_SCALE = 2.0        # main.MAX_RENDER_SCALE：最清晰时每 CSS 像素的画布像素数
+WEBP_QUALITY = 90
+MAX_SHEET = 16383      # WebP 单边上限
+DEFAULT_FRAME_MS = 100
+
+# index.html 的图标：(原图, 产物, 边长)；直接按文件名引用，不进 assets.json
+ICONS = (
+    ("img/planeicon.png", "img/icon-64.png", 64),     # <link rel="icon">
+    ("img/planeicon.png", "img/icon-180.png", 180),   # <link rel="apple-touch-icon">
+)
+
+
+def _rel(path):
+    return "./" + os.path.relpath(path, ROOT).replace(os.sep, "/")
+
+
+def _path(src):
+    return os.path.join(ROOT, os.path.normpath(src))
+
+
+def sources():
+    """Original src -> largest (w, h) it is drawn at, or None when some use has no known size."""
+    out = {}
+
+    def add(key, src):
+        size = assets.DRAW_SIZES.get(key)
+        if src not in out:
+            out[src] = size
+        elif out[src] is None or size is None:
+            out[src] = None
+        else:
+            out[src] = (max(out[src][0], size[0]), max(out[src][1], size[1]))
+
+    for key, src in assets.SPRITES.items():
+        add(key, src)
+    for key, alts in assets.SPRITE_FALLBACKS.items():
+        for src in alts:
+            add(key, src)
+    return out
+
+
+def target_size(src_w, src_h, draw):
+    """Output frame size: the drawn size at MAX_SCALE, never larger than the source."""
+    if draw is None:
+        return src_w, src_h
+    return (min(src_w, max(1, math.ceil(draw[0] * MAX_SCALE))),
+            min(src_h, max(1, math.ceil(draw[1] * MAX_SCALE))))
+
+
+def _frames(im):
+    """RGBA frames and their durations (ms); one frame for still images."""
+    from PIL import ImageSequence
+    frames = []
+    durations = []
+    for frame in ImageSequence.Iterator(im):
+        frames.append(frame.convert("RGBA"))
+        durations.append(int(frame.info.get("duration") or DEFAULT_FRAME_MS))
+    return frames, durations
+
+
+def _webp(img):
+    """Smaller of the lossy and lossless WebP encodings of ``img``."""
+    best = None
+    for opts in ({"quality": WEBP_QUALITY, "method": 6}, {"lossless": True, "quality": 80, "method": 4}):
+        buf = io.BytesIO()
+        img.save(buf, "WEBP", **opts)
+        data = buf.getvalue()
+        if best is None or len(data) < len(best):
+            best = data
+    return best
+
+
+def build_one(src, draw):
+    """(entry, data) for one sprite, or None if the built file would not be smaller."""
+    from PIL import Image
+    with Image.open(_path(src)) as im:
+        src_w, src_h = im.size
+        frames, durations = _frames(im)
+    fw, fh = target_size(src_w, src_h, draw)
+    frames = [f if f.size == (fw, fh) else f.resize((fw, fh), Image.LANCZOS) for f in frames]
+    n = len(frames)
+    entry = {"w": fw, "h": fh}
+    if n > 1:
+        cols = max(1, min(n, MAX_SHEET // fw))
+        rows = -(-n // cols)
+        if rows * fh > MAX_SHEET:
+            raise ValueError(f"{src}: {n} frames of {fw}x{fh} do not fit in a {MAX_SHEET}px sheet")
+        sheet = Image.new("RGBA", (cols * fw, rows * fh))
+        for i, f in enumerate(frames):
+            sheet.paste(f, ((i % cols) * fw, (i // cols) * fh))
+        entry.update(frames=n, cols=cols, durations=durations)
+        out = sheet
+    else:
+        out = frames[0]
+    data = _webp(out)
+    orig_bytes = os.path.getsize(_path(src))
+    # 原图已经够小、又不用缩：保留原图
+    if n == 1 and (fw, fh) == (src_w, src_h) and len(data) >= orig_bytes:
+        return None
+    stem = os.path.splitext(os.path.basename(src))[0]
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}.webp"
+    entry["src"] = _rel(os.path.join(OUT_DIR, name))
+    entry["bytes"] = len(data)
+    entry["orig_bytes"] = orig_bytes
+    entry["decoded"] = fw * fh * 4 * n
+    entry["orig_decoded"] = src_w * src_h * 4 * (n if n > 1 else 1)
+    return entry, data
+
+
+def build_icon(src, size):
+    """PNG bytes of ``src`` scaled to ``size`` x ``size``."""
+    from PIL import Image
+    with Image.open(_path(src)) as im:
+        img = im.convert("RGBA").resize((size, size), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def build_icons():
+    """[(src, out, bytes)] for ``ICONS``."""
+    return [(src, out, build_icon(src, size)) for src, out, size in ICONS]
+
+
+def write_icons(icons):
+    for _src, out, data in icons:
+        with open(_path(out), "wb") as f:
+            f.write(data)
+
+
+def build():
+    mapping = {}
+    outputs = {}
+    missing = []
+    for src, draw in sources().items():
+        if not os.path.exists(_path(src)):
+            missing.append(src)
+            continue
+        built = build_one(src, draw)
+        if built is None:
+            continue
+        entry, data = built
+        mapping[src] = entry
+        outputs[os.path.basename(entry["src"])] = data
+    return mapping, outputs, missing
+
+
+def write(mapping, outputs):
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for name, data in outputs.items():
+        path = os.path.join(OUT_DIR, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+    # 旧版本的产物（哈希变了）删掉
+    for name in os.listdir(OUT_DIR):
+        if name.endswith(".webp") and name not in outputs:
+            os.remove(os.path.join(OUT_DIR, name))
+    with open(os.path.join(OUT_DIR, MAP_NAME), "w", encoding="utf-8") as f:
+        json.dump({"version": MAP_VERSION, "max_scale": MAX_SCALE, "sprites": mapping}, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dry-run", action="store_true", help="report sizes without writing img/build/")
+    args = ap.parse_args(argv)
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("build_sprites.py needs Pillow: pip install Pillow", file=sys.stderr)
+        return 2
+
+    mapping, outputs, missing = build()
+    for src in missing:
+        print(f"warning: {src} does not exist", file=sys.stderr)
+    for src, e in sorted(mapping.items()):
+        frames = f", {e['frames']} frames" if "frames" in e else ""
+        print(f"{src}: {e['orig_bytes'] / 1024:.1f} KiB -> {e['bytes'] / 1024:.1f} KiB "
+              f"({e['w']}x{e['h']}{frames})")
+    total = sum(e["orig_bytes"] for e in mapping.values())
+    built = sum(e["bytes"] for e in mapping.values())
+    decoded = sum(e["orig_decoded"] for e in mapping.values())
+    decoded_built = sum(e["decoded"] for e in mapping.values())
+    print(f"{len(mapping)} sprites: download {total / 1048576:.2f} -> {built / 1048576:.2f} MiB, "
+          f"decoded {decoded / 1048576:.1f} -> {decoded_built / 1048576:.1f} MiB")
+    icons = build_icons()
+    for src, out, data in icons:
+        print(f"{out}: {os.path.getsize(_path(src)) / 1024:.1f} KiB {src} -> {len(data) / 1024:.1f} KiB")
+    if not args.dry_run:
+        write(mapping, outputs)
+        write_icons(icons)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
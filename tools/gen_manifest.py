@@ -0,0 +1,107 @@
+"""Generate assets.json, the loader's view of assets.py.
+
+index.html (via assets.js) reads assets.json to decide what to download
+before the menu, before a run and never; main.py imports assets.py
+directly.  When tools/build_sprites.py has written img/build/sprites.json,
+sprites point at the built files (``src``) and keep their assets.py path as
+``orig``.  Re-run this after editing assets.py or rebuilding the sprites:
+
+    python tools/gen_manifest.py           # rewrite assets.json
+    python tools/gen_manifest.py --check   # exit 1 if assets.json is stale
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import assets  # noqa: E402
+
+OUT = os.path.join(ROOT, "assets.json")
+SPRITE_MAP = os.path.join(ROOT, "img", "build", "sprites.json")
+# sprites.json 里带到清单的字段：每帧尺寸和帧序列图的排布
+SPRITE_FIELDS = ("w", "h", "frames", "cols", "durations")
+
+
+def _size(src):
+    try:
+        return os.path.getsize(os.path.join(ROOT, src))
+    except OSError:
+        return None
+
+
+def _sprite_map():
+    """Built sprites by original src, or {} when there is no build (or it is incomplete)."""
+    try:
+        with open(SPRITE_MAP, encoding="utf-8") as f:
+            sprites = json.load(f)["sprites"]
+    except (OSError, ValueError, KeyError):
+        return {}
+    for src, entry in sprites.items():
+        if _size(entry["src"]) is None:
+            print(f"warning: {entry['src']} (built from {src}) is missing; using the originals",
+                  file=sys.stderr)
+            return {}
+    return sprites
+
+
+def build():
+    items = []
+    totals = {tier: {"count": 0, "bytes": 0} for tier in assets.TIERS}
+    missing = []
+    built = _sprite_map()
+    for kind, key, src, tier in assets.entries():
+        entry = built.get(src) if kind == "image" else None
+        if entry is not None:
+            orig, src = src, entry["src"]
+        size = _size(src)
+        if size is None:
+            missing.append(src)
+        item = {"kind": kind, "src": src, "tier": tier, "bytes": size or 0}
+        if key is not None:
+            item["key"] = key
+        if entry is not None:
+            item["orig"] = orig
+            item.update((k, entry[k]) for k in SPRITE_FIELDS if k in entry)
+        items.append(item)
+        totals[tier]["count"] += 1
+        totals[tier]["bytes"] += size or 0
+    return {"tiers": totals, "assets": items}, missing
+
+
+def render(manifest):
+    # one asset per line keeps diffs of assets.json readable
+    rows = ",\n".join("  " + json.dumps(item, ensure_ascii=False) for item in manifest["assets"])
+    return ('{\n "tiers": ' + json.dumps(manifest["tiers"]) + ',\n "assets": [\n' + rows + "\n ]\n}\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--check", action="store_true", help="fail if assets.json is out of date")
+    args = ap.parse_args(argv)
+
+    manifest, missing = build()
+    for src in missing:
+        print(f"warning: {src} does not exist", file=sys.stderr)
+    text = render(manifest)
+    if args.check:
+        try:
+            with open(OUT, encoding="utf-8") as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current != text:
+            print("assets.json is stale; run python tools/gen_manifest.py", file=sys.stderr)
+            return 1
+        return 0
+    with open(OUT, "w", encoding="utf-8") as f:
+        f.write(text)
+    for tier, t in manifest["tiers"].items():
+        print(f"{tier:9s} {t['count']:3d} files {t['bytes'] / 1024:9.1f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
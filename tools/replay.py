@@ -0,0 +1,101 @@
+"""Replay a recorded run headlessly and check it ends where the recording did.
+
+In the browser every finished run leaves its replay log in
+``window.__lastReplay`` (``copy(__lastReplay)`` in the devtools console);
+``index.html?replay=run.json`` plays one back on screen.  Here the same log
+drives a plain-CPython World, so a bug report or a slow run can be
+re-executed and profiled exactly:
+
+    python tools/replay.py run.json              # verify, print step timings
+    python tools/replay.py run.json --bullets numpy   # default: the store the log was recorded with
+    python tools/replay.py --record run.json --seed 7 --ticks 3600   # scripted strafing run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import replay  # noqa: E402
+import world as W  # noqa: E402
+
+WIDTH, HEIGHT = 800, 600
+
+
+def record_scripted(seed, diff, ticks):
+    """A log of a run that strafes left/right until it dies or ``ticks`` pass."""
+    world = W.World(WIDTH, HEIGHT, diff, seed=seed)
+    rec = replay.Recorder()
+    rec.begin(seed, diff, WIDTH, HEIGHT, world.sticky_active, world.bullet_store)
+    for i in range(ticks):
+        left = (i // 90) % 2 == 0
+        inputs = {"ArrowLeft": left, "ArrowRight": not left, "pointer": None}
+        rec.record(inputs)
+        world.step(inputs)
+        world.sounds.clear()
+        if world.game_over:
+            break
+    return rec.finish(world)
+
+
+def play(log, bullets="list"):
+    player = replay.Player(log)
+    log = player.log
+    world = W.World(log["w"], log["h"], log["diff"], seed=log["seed"], bullet_store=bullets)
+    why = player.mismatch(world)
+    if why is not None:
+        raise ValueError(why)
+    player.start(world)
+    timings = {}
+    steps = []
+    clock = time.perf_counter
+    while not player.done and not world.game_over:
+        inputs = player.next_inputs(world)
+        t0 = clock()
+        world.step(inputs, timings)
+        steps.append(clock() - t0)
+        world.sounds.clear()
+    return world, player, timings, steps
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("log", help="replay JSON (or the output path with --record)")
+    ap.add_argument("--bullets", choices=("list", "numpy"),
+                    help="bullet store (default: the one the log was recorded with)")
+    ap.add_argument("--record", action="store_true", help="write a scripted run to LOG instead of replaying")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--diff", choices=sorted(W.DIFF_TABLE), default="normal")
+    ap.add_argument("--ticks", type=int, default=3600)
+    args = ap.parse_args(argv)
+
+    if args.record:
+        log = record_scripted(args.seed, args.diff, args.ticks)
+        with open(args.log, "w", encoding="utf-8") as f:
+            f.write(replay.Recorder().dumps(log))
+        print(f"recorded {log['ticks']} ticks, score {log['score']:.2f}")
+        return 0
+
+    with open(args.log, encoding="utf-8") as f:
+        log = json.load(f)
+    try:
+        world, player, timings, steps = play(log, args.bullets or log.get("store", "list"))
+    except ValueError as e:
+        print(f"cannot replay {args.log}: {e}", file=sys.stderr)
+        return 2
+    ok = player.tick == log["ticks"] and world.frame == log.get("frame") and world.score == log.get("score")
+    steps.sort()
+    p95 = steps[int(len(steps) * 0.95)] if steps else 0.0
+    print(f"{player.tick} ticks, frame {world.frame}, score {world.score:.2f} "
+          f"(recorded {log.get('score', 0):.2f}): {'match' if ok else 'MISMATCH'}")
+    print(f"step ms: mean {sum(steps) / max(1, len(steps)) * 1e3:.3f}  p95 {p95 * 1e3:.3f}  "
+          f"max {(steps[-1] if steps else 0) * 1e3:.3f}")
+    print("phase total ms: " + "  ".join(f"{k} {v * 1e3:.1f}" for k, v in timings.items()))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,12 +21,25 @@ def clamp(value, min_value, max_value):
     return value
 
 import random
-from js import Image
+try:
+    from js import Image
+except ImportError:
+    # 纯 CPython 环境（无浏览器，例如 world.py 的无头模拟/基准测试）
+    Image = None
+
+# 画面装饰（星空、震屏）用的随机数：和 World.rng 分开，重画星空不会打乱对局的随机序列；
+# main.py 每局用对局种子 seed() 一次，回放时画面也一样
+_rng = random.Random()
+
+def seed(n):
+    _rng.seed(n)
 
 def randf(a, b):
-    return random.random()*(b-a)+a
+    return _rng.random()*(b-a)+a
 
 def load_sprite(path):
+    if Image is None:
+        return None
     try:
         try:
             img = Image.new()
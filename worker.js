@@ -0,0 +1,46 @@
+// Worker 模式（index.html?worker）：Pyodide、world.step() 和绘制都在这里跑，
+// 画布是主线程 transferControlToOffscreen() 转交的 OffscreenCanvas。
+// 主线程（workerhost.js）只转发输入/尺寸/开局消息，并根据这里发回的消息更新 HUD、播放声音。
+importScripts("render.js", "boot.js");
+
+// 个别浏览器的 Worker 没有 requestAnimationFrame
+if (typeof self.requestAnimationFrame !== "function") {
+  self.requestAnimationFrame = cb => setTimeout(() => cb(performance.now()), 1000 / 60);
+}
+
+let pending = [];  // main.py 就绪前收到的消息
+
+self.onmessage = async (ev) => {
+  const msg = ev.data;
+  if (msg.type !== "init") {
+    if (self.__onHostMessage) self.__onHostMessage(msg);
+    else pending.push(msg);
+    return;
+  }
+  try {
+    // main.py 在 Worker 里从这些全局变量取画布、尺寸和预加载的图片（ImageBitmap）
+    self.__offscreenCanvas = msg.canvas;
+    self.__hostWidth = msg.width;
+    self.__hostHeight = msg.height;
+    self.__hostDpr = msg.dpr;
+    self.__hudCanvas = msg.hudCanvas || null;
+    self.__hudWidth = msg.hudWidth;
+    self.__hudHeight = msg.hudHeight;
+    self.devicePixelRatio = msg.dpr;
+    self.PRELOADED_IMAGES = new Map(Object.entries(msg.images));  // main.py 用 .get(path) 取图
+    self.__hostTimeOrigin = msg.timeOrigin;  // StormBoot.mark 按主线程的时间轴记时
+
+    StormBoot.prefetch();  // 和 Pyodide 下载并行
+    importScripts(msg.pyodideUrl);
+    const pyodide = await loadPyodide({ indexURL: msg.pyodideUrl.replace(/[^/]*$/, "") });
+    self.postMessage({ type: "progress", stage: "pyodide" });
+    await StormBoot.installPython(pyodide);
+    await StormBoot.runMain(pyodide);
+    for (const m of pending) self.__onHostMessage(m);
+    pending = [];
+    self.postMessage({ type: "ready" });
+  } catch (err) {
+    console.error("worker: failed to load/run Python code:", err);
+    self.postMessage({ type: "error", message: String(err) });
+  }
+};
@@ -0,0 +1,268 @@
+// Worker 模式的主线程一侧：把 #game-canvas 转交给 worker.js，之后只做
+// 输入/尺寸转发、菜单与 BGM、HUD 文本和音效播放（按 Worker 发回的消息）。
+// start() 返回 false 时表示没能启用 Worker，调用方走原来的单线程路径。
+(function (root) {
+  "use strict";
+  // 音效表由 Worker 里的 main.py 发来（"audio" 消息），之前先用默认路径
+  let sounds = { bgm: "./sound/game.mp3", button: "./sound/button.wav" };
+  let engine = null;  // audio.js 的 Web Audio 引擎，不支持时为 null
+  const ARROWS = ["ArrowLeft", "ArrowRight", "ArrowUp", "ArrowDown"];
+  const PROFILER_KEYS = ["F8", "F9"];
+
+  function supported() {
+    const canvas = document.getElementById("game-canvas");
+    return typeof Worker !== "undefined" && typeof OffscreenCanvas !== "undefined" &&
+      typeof createImageBitmap === "function" &&
+      !!canvas && typeof canvas.transferControlToOffscreen === "function";
+  }
+
+  function playSound(key, vol) {
+    try { if (engine && engine.play(key, vol)) return; } catch (e) {}
+    if (sounds[key]) playAudio(sounds[key], vol);
+  }
+
+  function playAudio(path, vol) {
+    try {
+      const base = root.PRELOADED_AUDIO && root.PRELOADED_AUDIO[path];
+      let a;
+      if (base) { a = base.cloneNode(true); a.currentTime = 0; }
+      else a = new Audio(path);
+      a.volume = vol;
+      const p = a.play();
+      if (p && p.catch) p.catch(() => {});
+    } catch (e) {}
+  }
+
+  function viewportSize() {
+    const container = document.getElementById("game-container");
+    const hud = document.getElementById("hud-canvas");
+    const h = hud ? hud.getBoundingClientRect() : { width: 0, height: 0 };
+    if (container) {
+      const r = container.getBoundingClientRect();
+      return { width: r.width, height: r.height, hudWidth: h.width, hudHeight: h.height };
+    }
+    return { width: root.innerWidth || 0, height: root.innerHeight || 0, hudWidth: h.width, hudHeight: h.height };
+  }
+
+  async function bitmaps() {
+    // HTMLImageElement 不能传给 Worker，先转成 ImageBitmap（可转移，零拷贝）
+    const images = {};
+    const transfer = [];
+    await Promise.all(Object.entries(root.PRELOADED_IMAGES || {}).map(async ([path, img]) => {
+      if (!img) return;
+      try {
+        const bmp = await createImageBitmap(img);
+        images[path] = bmp;
+        transfer.push(bmp);
+      } catch (e) { console.warn("createImageBitmap failed:", path, e); }
+    }));
+    return { images, transfer };
+  }
+
+  // opts.onProgress(stage)：Worker 里 Pyodide 加载完成时以 "pyodide" 调用
+  async function start(pyodideUrl, opts) {
+    opts = opts || {};
+    if (!supported()) return false;
+    let canvas = document.getElementById("game-canvas");
+    const menu = document.getElementById("menu");
+    const hud = {
+      score: document.getElementById("score"),
+      lives: document.getElementById("lives"),
+      level: document.getElementById("level"),
+    };
+
+    const { images, transfer } = await bitmaps();
+    const size = viewportSize();
+    canvas.style.width = size.width + "px";
+    canvas.style.height = size.height + "px";
+    let offscreen;
+    try { offscreen = canvas.transferControlToOffscreen(); }
+    catch (e) { console.warn("transferControlToOffscreen failed:", e); return false; }
+    // HUD 画布也交给 Worker 画（hud.py）
+    const hudCanvas = document.getElementById("hud-canvas");
+    let hudOffscreen = null;
+    try { if (hudCanvas) hudOffscreen = hudCanvas.transferControlToOffscreen(); }
+    catch (e) { console.warn("hud transferControlToOffscreen failed:", e); }
+
+    const worker = new Worker("worker.js" + location.search);
+    const post = (m) => worker.postMessage(m);
+
+    return await new Promise((resolve) => {
+      let ready = false;
+      const cleanups = [];
+      const on = (target, type, fn, opts) => {
+        target.addEventListener(type, fn, opts);
+        cleanups.push(() => target.removeEventListener(type, fn, opts));
+      };
+
+      function fallback(reason) {
+        // Worker 没起来：画布已经转交出去不能再用，换一个新画布给单线程路径
+        console.warn("worker mode failed, falling back to single thread:", reason);
+        worker.terminate();
+        cleanups.forEach(fn => fn());
+        const fresh = canvas.cloneNode(false);
+        canvas.parentNode.replaceChild(fresh, canvas);
+        if (hudOffscreen) hudCanvas.parentNode.replaceChild(hudCanvas.cloneNode(false), hudCanvas);
+        resolve(false);
+      }
+
+      worker.onerror = (e) => { if (!ready) fallback(e.message || e); };
+      worker.onmessage = (ev) => {
+        const m = ev.data;
+        switch (m.type) {
+          case "ready":
+            ready = true;
+            resolve(true);
+            break;
+          case "progress":
+            if (opts.onProgress) opts.onProgress(m.stage);
+            break;
+          case "error":
+            if (!ready) fallback(m.message);
+            break;
+          case "hud":
+            if (hud.score) hud.score.innerText = m.score;
+            if (hud.lives) hud.lives.innerText = m.lives;
+            if (hud.level) hud.level.innerText = m.level;
+            break;
+          case "audio":
+            sounds = m.sounds;
+            try {
+              engine = root.StormAudio ? root.StormAudio.create() : null;
+              if (engine) engine.define(m.sounds, m.voices);
+            } catch (e) { console.warn("audio engine unavailable, using <audio>:", e); engine = null; }
+            break;
+          case "sounds":
+            for (const [key, vol] of m.list) playSound(key, vol);
+            break;
+          case "replay":
+            root.__lastReplay = m.data;  // 和单线程模式一样，控制台 copy(__lastReplay) 导出录像
+            break;
+          case "download": {
+            const url = URL.createObjectURL(new Blob([m.data], { type: "application/json" }));
+            const a = document.createElement("a");
+            a.href = url;
+            a.download = m.name;
+            a.click();
+            setTimeout(() => URL.revokeObjectURL(url), 1000);
+            break;
+          }
+          case "gameover":
+            document.body.classList.remove("playing");
+            if (root.__bgm_audio) {
+              try { root.__bgm_audio.pause(); root.__bgm_audio.currentTime = 0; } catch (e) {}
+            }
+            setTimeout(() => { if (menu) menu.style.display = "flex"; }, 900);
+            break;
+        }
+      };
+
+      function startGame() {
+        if (engine) engine.resume();
+        playSound("button", 0.4);
+        if (menu) menu.style.display = "none";
+        try { canvas.focus(); } catch (e) {}
+        try {
+          if (root.__bgm_audio) root.__bgm_audio.pause();
+          let a = engine ? engine.music(sounds.bgm, 0.35) : null;
+          if (!a) {
+            a = new Audio(sounds.bgm);
+            a.loop = true;
+            a.volume = 0.35;
+            const p = a.play();
+            if (p && p.catch) p.catch(() => {});
+          }
+          root.__bgm_audio = a;
+        } catch (e) { console.warn("start bgm failed:", e); }
+        document.body.classList.add("playing");
+        post({ type: "start", diff: root.__desiredDifficulty || "normal" });
+      }
+
+      // 菜单：难度选择由 index.html 里的脚本记录在 __desiredDifficulty
+      const startBtn = document.getElementById("start-btn");
+      if (startBtn) on(startBtn, "click", startGame);
+      if (root.__startClicked) { root.__startClicked = false; startGame(); }
+
+      // 键盘
+      const onKey = (down) => (e) => {
+        // F8/F9：性能分析叠加层开关、下载记录（main.py 的 PROFILER_KEYS），只转发按下
+        const profKey = PROFILER_KEYS.indexOf(e.key) >= 0;
+        if (ARROWS.indexOf(e.key) < 0 && !(profKey && down)) return;
+        e.preventDefault();
+        post({ type: "key", key: e.key, down: down });
+      };
+      on(root, "keydown", onKey(true));
+      on(root, "keyup", onKey(false));
+
+      // 触摸/指针：按下后拖动，把画布内坐标发给 Worker
+      let active = false;
+      let touchId = null;
+      const sendPoint = (x, y) => {
+        const r = canvas.getBoundingClientRect();
+        post({ type: "pointer", x: x - r.left, y: y - r.top });
+      };
+      on(canvas, "touchstart", (e) => {
+        const t = e.changedTouches[0];
+        if (!t) return;
+        active = true; touchId = t.identifier;
+        sendPoint(t.clientX, t.clientY);
+        e.preventDefault();
+      }, { passive: false });
+      on(canvas, "touchmove", (e) => {
+        if (!active) return;
+        for (const t of e.changedTouches) {
+          if (t.identifier === touchId) { sendPoint(t.clientX, t.clientY); e.preventDefault(); break; }
+        }
+      }, { passive: false });
+      const endTouch = () => { active = false; touchId = null; };
+      on(canvas, "touchend", endTouch, { passive: false });
+      on(canvas, "touchcancel", endTouch, { passive: false });
+      on(canvas, "pointerdown", (e) => { active = true; sendPoint(e.clientX, e.clientY); e.preventDefault(); });
+      on(canvas, "pointermove", (e) => { if (active) { sendPoint(e.clientX, e.clientY); e.preventDefault(); } });
+      on(canvas, "pointerup", endTouch);
+      on(canvas, "pointercancel", endTouch);
+
+      // 尺寸：画布的 CSS 尺寸在这边设，像素尺寸由 Worker 设。
+      // 一帧内的多次 resize 事件合并成一次布局、一条消息
+      let resizePending = false;
+      const sendSize = () => {
+        resizePending = false;
+        const s = viewportSize();
+        canvas.style.width = s.width + "px";
+        canvas.style.height = s.height + "px";
+        post({ type: "resize", width: s.width, height: s.height, hudWidth: s.hudWidth, hudHeight: s.hudHeight,
+               dpr: root.devicePixelRatio || 1 });
+      };
+      const scheduleSize = () => {
+        if (resizePending) return;
+        resizePending = true;
+        root.requestAnimationFrame(sendSize);
+      };
+      on(root, "resize", scheduleSize);
+      // devicePixelRatio 变了但窗口尺寸没变（拖到另一块屏幕）时不会有 resize 事件
+      const watchDpr = () => {
+        try {
+          on(root.matchMedia("(resolution: " + (root.devicePixelRatio || 1) + "dppx)"), "change",
+             () => { watchDpr(); scheduleSize(); }, { once: true });
+        } catch (e) { /* 不支持就只靠 resize */ }
+      };
+      watchDpr();
+
+      worker.postMessage({
+        type: "init",
+        canvas: offscreen,
+        width: size.width,
+        height: size.height,
+        hudCanvas: hudOffscreen,
+        hudWidth: size.hudWidth,
+        hudHeight: size.hudHeight,
+        dpr: root.devicePixelRatio || 1,
+        images: images,
+        pyodideUrl: pyodideUrl,
+        timeOrigin: performance.timeOrigin,
+      }, [offscreen].concat(hudOffscreen ? [hudOffscreen] : [], transfer));
+    });
+  }
+
+  root.StormWorkerHost = { supported, start };
+})(window);
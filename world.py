@@ -0,0 +1,974 @@
+"""Headless game simulation.
+
+Everything the game loop needs except the renderer lives here, so the world
+can be stepped on plain CPython (profiling, load tests, replays) as well as
+inside Pyodide.  main.py owns one World, feeds it input every frame and draws
+whatever it currently holds.
+"""
+import itertools
+import math
+import random
+import time
+from bisect import bisect_right
+
+from utils import clamp
+from spatial import UniformGrid, NearestGrid
+import bulletstore
+from pools import Pool, EntityList, EffectRing
+from bulletstore import np
+
+INITIAL_BOSS_SCORE_THRESHOLD = 500
+
+# Difficulty settings
+_BASE_DIFF = {
+    "easy":   {"enemy_rate": 0.015, "enemy_speed": (1.0,2.0), "bullet_rate": 0.004, "boss_hp": 1200},
+    "normal": {"enemy_rate": 0.022, "enemy_speed": (1.8,2.8), "bullet_rate": 0.008, "boss_hp": 1800},
+    "hard":   {"enemy_rate": 0.03,  "enemy_speed": (2.6,3.6), "bullet_rate": 0.012, "boss_hp": 2400},
+}
+
+# --- Dynamic difficulty scaling (based on current score) ---
+# regardless of the initially selected difficulty.
+_DIFFICULTY_THRESHOLDS = [2000, 6000, 12000, 20000, 30000, 45000, 60000, 80000, 105000]
+
+def _scale_param(key, value, tier):
+    # gentle but noticeable scaling; capped to keep the game fair
+    if key == "enemy_rate":
+        return min(value * (1 + 0.12 * tier), 0.09)
+    if key == "enemy_speed":
+        a, b = value
+        mul = 1 + 0.08 * tier
+        return (a * mul, b * mul)
+    if key == "bullet_rate":
+        return min(value * (1 + 0.10 * tier), 0.06)
+    if key == "boss_hp":
+        # Make later bosses tougher
+        return int(value * (1 + 0.18 * tier))
+    return value
+
+class DiffParams:
+    """Scaled difficulty parameters for one (difficulty, tier) pair."""
+    __slots__ = ("diff", "tier", "enemy_rate", "enemy_speed", "bullet_rate", "boss_hp")
+
+    def __init__(self, diff, tier):
+        self.diff = diff
+        self.tier = tier
+        base = _BASE_DIFF[diff]
+        for key in ("enemy_rate", "enemy_speed", "bullet_rate", "boss_hp"):
+            setattr(self, key, _scale_param(key, base[key], tier))
+
+# DIFF_TABLE[diff][tier]: every combination computed once at import
+DIFF_TABLE = {diff: tuple(DiffParams(diff, tier) for tier in range(len(_DIFFICULTY_THRESHOLDS) + 1))
+              for diff in _BASE_DIFF}
+
+WEAPON_TIERS = ("single", "twin", "spread")
+CLEAR_WAVE_DURATION = 60 * 5
+CLEAR_WAVE_PULSE_GAP = 12
+
+# Performance guardrails: keep the Pyodide canvas loop responsive on low-end devices.
+MAX_ENEMIES = 42
+MAX_BULLETS = 220
+MAX_EFFECTS = 50
+MAX_POWERS = 18
+
+PLAYER_HIT_RADIUS = 12
+
+TIER_TO_SPRITE = {
+    "single": "player_blue",
+    "twin":   "player_red",
+    "spread": "player_purple",
+}
+def _apply_tier_sprite(plr):
+    try:
+        plr.sprite_key = TIER_TO_SPRITE.get(plr.weapon, plr.sprite_key)
+    except Exception:
+        pass
+
+def rects_collide(a, b):
+    ax = a.x; ay = a.y; aw = a.w; ah = a.h
+    bx = b.x; by = b.y; bw = b.w; bh = b.h
+    return (ax < bx+bw and ax+aw > bx and ay < by+bh and ay+ah > by)
+
+def _obj_center(obj):
+    w = getattr(obj, 'w', getattr(obj, 'width', 0))
+    h = getattr(obj, 'h', getattr(obj, 'height', 0))
+    return obj.x + w / 2, obj.y + h / 2
+
+class Player:
+    def __init__(self, world):
+        self.x = world.width/2 - 24
+        self.y = world.height - 120
+        self.px, self.py = self.x, self.y  # position before the last step (render interpolation)
+        self.w = 48
+        self.h = 48
+        self.speed = 4
+        self.hp = 100
+        self.sprite_key = "player_blue"
+        self.weapon = "single"  # single | twin | spread
+        self.shoot_cd = 0
+        self.shield = 0  # frames
+        self.homing_combo = False
+        self.clear_wave_timer = 0
+        self.clear_wave_pulse_cd = 0
+        self.alt_fire_cycle = 0
+    def shoot(self, world):
+        if self.shoot_cd > 0:
+            return
+        self.shoot_cd = 10
+        world.sound("shoot", 0.25)
+        self.alt_fire_cycle = (self.alt_fire_cycle + 1) % 8
+
+        bullets = world.bullets
+        if len(bullets) >= MAX_BULLETS:
+            return
+
+        if self.homing_combo:
+            bullets.append(world.new_bullet(self.x + self.w/2 - 3, self.y - 10, 0, -8, "player", bullet_type="normal", damage=14))
+            if len(bullets) < MAX_BULLETS:
+                bullets.append(world.new_bullet(self.x + self.w/2 - 3, self.y - 12, 0, -6, "player", bullet_type="homing", homing=True, damage=16))
+            return
+
+        # 每隔几轮发射一次高能激光弹，增加玩法层次但不打破基础节奏
+        if self.weapon != "single" and self.alt_fire_cycle == 0:
+            bullets.append(world.new_bullet(self.x + self.w/2 - 4, self.y - 20, 0, -12, "player", bullet_type="laser", w=8, h=30, damage=30, ttl=24))
+            return
+
+        if self.weapon == "single":
+            bullets.append(world.new_bullet(self.x + self.w/2 - 3, self.y - 10, 0, -8, "player", bullet_type="normal", damage=16))
+        elif self.weapon == "twin":
+            for dx, dy in [(-2, -8), (0, -9), (2, -8)]:
+                bullets.append(world.new_bullet(self.x + self.w/2 - 3, self.y - 10, dx, dy, "player", bullet_type="normal", damage=14))
+        elif self.weapon == "spread":
+            for dx, dy in [(-3, -7.5), (-1.5, -8.5), (0, -9.2), (1.5, -8.5), (3, -7.5)]:
+                bullets.append(world.new_bullet(self.x + self.w/2 - 3, self.y - 10, dx, dy, "player", bullet_type="normal", damage=12))
+    def hit(self, dmg):
+        if self.shield > 0:
+            self.shield = max(0, self.shield - int(dmg * 20))
+            return False
+        self.hp -= dmg
+        if self.homing_combo:
+            self.homing_combo = False
+            self.weapon = "spread"
+            _apply_tier_sprite(self)
+            return True
+        try:
+            idx = WEAPON_TIERS.index(self.weapon)
+        except Exception:
+            idx = 0
+        if idx > 0:
+            self.weapon = WEAPON_TIERS[idx - 1]
+            _apply_tier_sprite(self)
+        return True
+
+# Pooled enemies are reused, so homing bullets that keep a target compare
+# serials as well as the dead flag.
+_enemy_serial = itertools.count(1)
+
+class Enemy:
+    __slots__ = ("kind", "x", "y", "px", "py", "w", "h", "vx", "vy", "hp", "cd", "dead", "serial")
+    def __init__(self, world, kind="small"):
+        self.spawn(world, kind)
+    def spawn(self, world, kind="small"):
+        self.dead = False
+        self.serial = next(_enemy_serial)
+        self.kind = kind
+        self.w = 36 if kind=="small" else (64 if kind=="big" else 48)
+        self.h = 36 if kind=="small" else (64 if kind=="big" else 48)
+        self.x = world.randf(0, world.width-self.w)
+        self.y = -self.h - world.randf(0, 100)
+        self.px, self.py = self.x, self.y
+        spd_min, spd_max = world.params.enemy_speed
+        self.vx = world.randf(-0.6, 0.6)
+        self.vy = world.randf(spd_min, spd_max)
+        self.hp = 15 if kind=="small" else (40 if kind=="big" else 28)
+        self.cd = 40  # shoot cooldown
+        return self
+    def update(self, world):
+        self.x += self.vx
+        self.y += self.vy
+        self.x = clamp(self.x, 0, world.width-self.w)
+        # Shoot
+        self.cd -= 1
+        if self.cd<=0:
+            self.cd = int(90 - 30*world.randf(0,1))
+            if world.rng.random() < world.params.bullet_rate:
+                # fire at player
+                player = world.player
+                bullets = world.bullets
+                tx = player.x + player.w/2
+                ty = player.y + player.h/2
+                cx = self.x + self.w/2
+                cy = self.y + self.h
+                vx = tx - cx
+                vy = ty - cy
+                mag = (vx*vx+vy*vy) ** 0.5 + 1e-5
+                vx, vy = vx/mag*3.0, vy/mag*3.0
+                if len(bullets) >= MAX_BULLETS:
+                    return
+                if self.kind == "small":
+                    bullets.append(world.new_bullet(cx-3, cy, vx, vy, "enemy", bullet_type="normal", damage=14))
+                elif self.kind == "medium":
+                    for off in (-0.35, 0, 0.35):
+                        if len(bullets) >= MAX_BULLETS:
+                            break
+                        ang = math.atan2(vy, vx) + off
+                        bullets.append(world.new_bullet(cx-3, cy, 3.0*math.cos(ang), 3.0*math.sin(ang), "enemy", bullet_type="normal", sprite_key="boss_bullet_triangle", damage=12))
+                else:
+                    bullets.append(world.new_bullet(cx-4, cy, vx*0.85, vy*0.85+0.3, "enemy", bullet_type="orb", sprite_key="boss_bullet_hellfire_yellow", w=10, h=10, damage=18))
+                    if len(bullets) < MAX_BULLETS and world.rng.random() < 0.35:
+                        bullets.append(world.new_bullet(cx-4, cy, vx*0.6, vy*0.6, "enemy", bullet_type="homing", sprite_key="boss_bullet_thunderball_red", w=10, h=10, damage=16, homing=True, speed=3.2, turn_rate=0.2))
+
+class Boss:
+    def __init__(self, world):
+        self.w = 160
+        self.h = 110
+        self.x = world.width/2 - self.w/2
+        self.y = -self.h
+        self.px, self.py = self.x, self.y
+        self.vy = 1.2
+        self.vx = 2.0
+        self.hp = world.params.boss_hp
+        self.phase = 0
+        self.cd = 120
+        self.pattern_count = 0
+    def update(self, world):
+        # Enter from top, then patrol horizontally at y=40
+        if self.y < 40:
+            self.y += self.vy
+        else:
+            # Horizontal patrol & edge bounce
+            self.x += self.vx
+            if self.x <= 0 or self.x + self.w >= world.width:
+                self.vx = -self.vx
+                self.x = clamp(self.x, 0, world.width - self.w)
+        # Shoot pattern cycling
+        self.cd -= 1
+        if self.cd<=0:
+            self.pattern_count += 1
+            self.cd = max(52, 80 - self.pattern_count)
+            self.phase = (self.phase+1) % 4
+            self.fire_pattern(world, self.phase)
+    def fire_pattern(self, world, p):
+        bullets = world.bullets
+        if len(bullets) >= MAX_BULLETS:
+            return
+        cx = self.x + self.w/2
+        cy = self.y + self.h
+        if p == 0:
+            # fan
+            for a in range(-40, 41, 10):
+                if len(bullets) >= MAX_BULLETS:
+                    break
+                rad = (a/180.0)*math.pi
+                vx, vy = 3*math.sin(rad), 3*math.cos(rad)
+                bullets.append(world.new_bullet(cx, cy, vx, vy, "enemy", sprite_key="boss_bullet_default"))
+        elif p == 1:
+            # aimed bursts
+            player = world.player
+            tx, ty = player.x+player.w/2, player.y+player.h/2
+            for k in range(12):
+                if len(bullets) >= MAX_BULLETS:
+                    break
+                ang = math.atan2(ty-cy, tx-cx) + (k-6)*0.08
+                vx, vy = 3.2*math.cos(ang), 3.2*math.sin(ang)
+                bullets.append(world.new_bullet(cx, cy, vx, vy, "enemy", sprite_key=("boss_bullet_thunderball_red" if (k % 2 == 0) else "boss_bullet_thunderball_green")))
+        elif p == 2:
+            # spiral
+            for k in range(24):
+                if len(bullets) >= MAX_BULLETS:
+                    break
+                ang = k*0.26 + world.rng.random()*0.5
+                vx, vy = 2.6*math.cos(ang), 2.6*math.sin(ang)+0.8
+                bullets.append(world.new_bullet(cx, cy, vx, vy, "enemy", sprite_key="boss_bullet_sun_particle", bullet_type="orb", damage=14))
+        else:
+            # 混合弹幕：中轴激光 + 两侧追踪弹
+            for lane in (-42, -18, 18, 42):
+                if len(bullets) >= MAX_BULLETS:
+                    break
+                bullets.append(world.new_bullet(cx + lane, cy, 0, 6.5, "enemy", bullet_type="laser", sprite_key="boss_bullet_hellfire_red", w=8, h=24, damage=20, ttl=34))
+            for side in (-52, 52):
+                if len(bullets) >= MAX_BULLETS:
+                    break
+                bullets.append(world.new_bullet(cx + side, cy + 4, 0, 3.2, "enemy", bullet_type="homing", sprite_key="boss_bullet_thunderball_green", w=11, h=11, damage=18, homing=True, speed=3.4, turn_rate=0.16))
+
+def _homing_target(world, owner, cx, cy):
+    """What a homing bullet centred at (cx, cy) is chasing this tick."""
+    if owner != "player":
+        return world.player
+    if world.boss:
+        return world.boss
+    return world.nearest_enemy(cx, cy)
+
+def _steer(target, cx, cy, vx, vy, spd, turn_rate):
+    """Blend (vx, vy) towards ``target``'s centre at speed ``spd``."""
+    dx = (target.x + target.w/2) - cx
+    dy = (target.y + target.h/2) - cy
+    dist = math.sqrt(dx*dx + dy*dy) or 1
+    if not spd or spd<=0:
+        spd = 7.0
+    desired_vx = dx / dist * spd
+    desired_vy = dy / dist * spd
+    return (vx*(1-turn_rate) + desired_vx*turn_rate,
+            vy*(1-turn_rate) + desired_vy*turn_rate)
+
+class Bullet:
+    __slots__ = ("x", "y", "vx", "vy", "w", "h", "owner", "sprite_key", "homing",
+                 "bullet_type", "damage", "ttl", "turn_rate", "speed", "dead", "px", "py",
+                 "target", "target_serial")
+    def __init__(self, *args, **kwargs):
+        self.spawn(*args, **kwargs)
+    def spawn(self, x, y, vx, vy, owner, sprite_key=None, w=None, h=None, homing=False, speed=None, bullet_type="normal", damage=12, ttl=0, turn_rate=0.4):
+        self.dead = False
+        self.x, self.y, self.vx, self.vy = x, y, vx, vy
+        self.px, self.py = x, y
+        self.w, self.h = (w or 6), (h or 12)
+        self.owner = owner  # 'player' or 'enemy'
+        self.sprite_key = sprite_key
+        self.homing = homing
+        self.bullet_type = bullet_type
+        self.damage = damage
+        self.ttl = ttl
+        self.turn_rate = turn_rate
+        vlen = math.sqrt(vx*vx + vy*vy)
+        self.speed = speed or (vlen or 7.0)
+        self.target = None
+        self.target_serial = 0
+        return self
+    def update(self, world):
+        if self.homing:
+            cx = self.x + self.w/2
+            cy = self.y + self.h/2
+            target = self.target
+            if world.homing_sticky and self.owner == "player" and world.boss is None:
+                # 粘住上一个目标，直到它死掉（或被对象池复用）再重新找
+                if target is None or target.dead or target.serial != self.target_serial:
+                    target = world.nearest_enemy(cx, cy)
+                    self.target = target
+                    self.target_serial = target.serial if target else 0
+            else:
+                target = _homing_target(world, self.owner, cx, cy)
+            if target:
+                self.vx, self.vy = _steer(target, cx, cy, self.vx, self.vy, self.speed, self.turn_rate)
+
+        if self.bullet_type == "orb":
+            self.vx *= 0.997
+            self.vy *= 1.004
+
+        self.x += self.vx
+        self.y += self.vy
+        if self.ttl and self.ttl > 0:
+            self.ttl -= 1
+
+class PowerUp:
+    __slots__ = ("kind", "x", "y", "px", "py", "w", "h", "vy", "dead")
+    def __init__(self, kind, x, y):
+        self.spawn(kind, x, y)
+    def spawn(self, kind, x, y):
+        self.dead = False
+        self.kind = kind  # weapon | shield | heal
+        self.x, self.y = x, y
+        self.px, self.py = x, y
+        self.w, self.h = 28, 28
+        self.vy = 2.0
+        return self
+    def update(self):
+        self.y += self.vy
+
+class Explosion:
+    __slots__ = ("x", "y", "t")
+    def __init__(self, x, y):
+        self.spawn(x, y)
+    def spawn(self, x, y):
+        self.x, self.y = x, y
+        self.t = 24
+        return self
+    def update(self):
+        self.t -= 1
+
+def _effect_done(fx):
+    return fx.t <= 0
+
+class World:
+    """One game session, stepped one tick at a time with no renderer attached.
+
+    ``width``/``height`` are the playfield size in canvas pixels.  All game
+    randomness comes from ``rng`` (a ``random.Random``); pass ``seed`` instead
+    to get a reproducible run.  Sounds requested during a step are queued in
+    ``sounds`` as ``(key, volume)`` pairs for the host to play and clear.
+
+    ``bullet_store="numpy"`` keeps bullets in a bulletstore.BulletArray
+    (vectorized update/cull/collisions); it falls back to the plain list of
+    Bullet objects when NumPy is not available.
+
+    ``homing_sticky=True`` makes player homing bullets keep their enemy
+    target until it dies instead of re-picking the nearest one every tick
+    (list store only).
+    """
+    def __init__(self, width, height, diff="normal", seed=None, rng=None, bullet_store="list",
+                 homing_sticky=False):
+        self.width = width
+        self.height = height
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.selected_diff = diff
+        self._score = 0
+        self._tier_lo = self._tier_hi = 0
+        self._soa = bullet_store == "numpy" and bulletstore.available()
+        # Entity pools, prefilled to the guardrail caps.  The array store
+        # copies bullets in on append, so it only needs one scratch Bullet.
+        self._enemy_pool = Pool(Enemy, MAX_ENEMIES)
+        self._bullet_pool = Pool(Bullet, 0 if self._soa else MAX_BULLETS)
+        self._power_pool = Pool(PowerUp, MAX_POWERS)
+        self._scratch_bullet = Bullet.__new__(Bullet)
+        # Live lists: removal marks entities dead, compaction happens once
+        # at the end of step().  Effects share one lifetime, so a ring of
+        # preallocated explosions replaces both list and pool.
+        self.enemies = EntityList(self._enemy_pool)
+        self.bullets = bulletstore.BulletArray(MAX_BULLETS) if self._soa else EntityList(self._bullet_pool)
+        self.powers = EntityList(self._power_pool)
+        self.effects = EffectRing(Explosion, MAX_EFFECTS)
+        self.pools = {"enemies": self._enemy_pool, "bullets": self._bullet_pool,
+                      "powers": self._power_pool, "effects": self.effects}
+        self.sounds = []
+        # broadphase indexes, rebuilt every frame in the collision/pickup phases
+        self._enemy_grid = UniformGrid(width, height)
+        self._bullet_grid = UniformGrid(width, height)
+        self._power_grid = UniformGrid(width, height)
+        # nearest-enemy index for homing bullets, built on first use each frame
+        self._target_index = NearestGrid(width, height)
+        self._target_frame = -1
+        self.homing_sticky = homing_sticky
+        self._phases = [(name, getattr(self, "_phase_" + name)) for name in self.PHASES]
+        self.reset()
+
+    @property
+    def bullet_store(self):
+        """The bullet store actually in use: "numpy" or "list" (numpy falls back when missing)."""
+        return "numpy" if self._soa else "list"
+
+    @property
+    def sticky_active(self):
+        """``homing_sticky`` as it takes effect: the NumPy store has no sticky targets."""
+        return self.homing_sticky and not self._soa
+
+    def new_bullet(self, *args, **kwargs):
+        """A Bullet initialised like ``Bullet(...)``, reusing a pooled instance."""
+        if self._soa:
+            return self._scratch_bullet.spawn(*args, **kwargs)
+        return self._bullet_pool.acquire().spawn(*args, **kwargs)
+
+    def nearest_enemy(self, cx, cy):
+        """Live enemy whose centre is closest to (cx, cy), or None.
+
+        Enemies do not move or die during the bullet phase, so one index
+        per frame serves every homing bullet.
+        """
+        if self._target_frame != self.frame:
+            self._target_frame = self.frame
+            self._target_index.build(e for e in self.enemies if not e.dead)
+        return self._target_index.nearest(cx, cy)
+
+    def pool_stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def randf(self, a, b):
+        return self.rng.random()*(b-a)+a
+
+    def sound(self, key, vol=0.7):
+        self.sounds.append((key, vol))
+
+    # ``params`` (a DIFF_TABLE row) and ``tier`` only change when the score
+    # leaves [_tier_lo, _tier_hi), so hot paths read plain attributes.
+    @property
+    def score(self):
+        return self._score
+
+    @score.setter
+    def score(self, value):
+        self._score = value
+        if value >= self._tier_hi or value < self._tier_lo:
+            self._retier()
+
+    def _retier(self):
+        th = _DIFFICULTY_THRESHOLDS
+        tier = bisect_right(th, self._score)
+        self.tier = tier
+        self.params = DIFF_TABLE[self.selected_diff][tier]
+        self._tier_lo = th[tier - 1] if tier > 0 else -math.inf
+        self._tier_hi = th[tier] if tier < len(th) else math.inf
+
+    def reset(self, diff=None, seed=None):
+        """Start a new run; ``seed`` reseeds ``rng`` so the run can be replayed."""
+        if diff is not None:
+            self.selected_diff = diff
+        if seed is not None:
+            self.rng.seed(seed)
+        self._score = 0
+        self._retier()
+        self.player = Player(self)
+        _apply_tier_sprite(self.player)
+        self.player.x = clamp(self.player.x, 0, self.width - self.player.w)
+        self.player.y = clamp(self.player.y, 0, self.height - self.player.h)
+        self.enemies.clear(); self.bullets.clear(); self.powers.clear(); self.effects.clear()
+        self.sounds.clear()
+        self.boss = None
+        self.frame = 0
+        self._target_frame = -1
+        self.shake = 0
+        self.spawn_boss_at = INITIAL_BOSS_SCORE_THRESHOLD
+        self.game_over = False
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+        for grid in (self._enemy_grid, self._bullet_grid, self._power_grid, self._target_index):
+            grid.resize(width, height)
+        self._target_frame = -1
+        player = self.player
+        player.x = clamp(player.x, 0, width - player.w)
+        player.y = clamp(player.y, 0, height - player.h)
+        # 子弹和道具不用拉回来：出界的子弹下一帧就被 bullets 阶段剔除，道具一直下落，落出底边时剔除
+
+    # ---- spawning / helpers ----
+    def add_explosion(self, x, y):
+        # a full ring overwrites its oldest explosion
+        self.effects.add().spawn(x, y)
+
+    def spawn_enemy(self):
+        if len(self.enemies) >= MAX_ENEMIES:
+            return
+        r = self.rng.random()
+        kind = "small" if r < 0.55 else ("medium" if r < 0.85 else "big")
+        self.enemies.append(self._enemy_pool.acquire().spawn(self, kind))
+
+    def spawn_power(self, x, y):
+        if len(self.powers) >= MAX_POWERS:
+            return
+        r = self.rng.random()
+        kind = "weapon" if r<0.5 else ("shield" if r<0.8 else "heal")
+        self.powers.append(self._power_pool.acquire().spawn(kind, x, y))
+
+    def player_center_hit(self, obj, radius=PLAYER_HIT_RADIUS):
+        px, py = _obj_center(self.player)
+        ox, oy = _obj_center(obj)
+        dx, dy = ox - px, oy - py
+        return dx*dx + dy*dy <= radius*radius
+
+    def move_player_to(self, px, py):
+        """Centre the player on a pointer position (touch / mouse drag)."""
+        player = self.player
+        player.x = clamp(px - player.w/2, 0, self.width-player.w)
+        player.y = clamp(py - player.h/2, 0, self.height-player.h)
+
+    def trigger_clear_wave(self):
+        self.player.clear_wave_timer = CLEAR_WAVE_DURATION
+        self.player.clear_wave_pulse_cd = 0
+
+    def _defeat_boss(self):
+        boss = self.boss
+        self.score += 300
+        self.add_explosion(boss.x+boss.w/2, boss.y+boss.h/2)
+        self.sound("bigboom", 0.6)
+        self.boss = None
+        self.spawn_boss_at = self.score + 1000
+
+    def run_clear_wave(self):
+        player = self.player
+        if player.clear_wave_timer <= 0:
+            return
+        player.clear_wave_timer -= 1
+        player.clear_wave_pulse_cd -= 1
+        if player.clear_wave_pulse_cd > 0:
+            return
+
+        player.clear_wave_pulse_cd = CLEAR_WAVE_PULSE_GAP
+        self.shake = max(self.shake, 12)
+        self.sound("boom3", 0.18)
+
+        enemies = self.enemies
+        for e in enemies:
+            if e.dead:
+                continue
+            self.add_explosion(e.x + e.w/2, e.y + e.h/2)
+            score_gain = 10 if e.kind == "small" else 25
+            self.score += score_gain
+            enemies.kill(e)
+
+        if self._soa:
+            self._clear_enemy_bullets_soa()
+        else:
+            bullets = self.bullets
+            for eb in bullets:
+                if eb.owner == "enemy" and not eb.dead:
+                    self.add_explosion(eb.x + eb.w/2, eb.y + eb.h/2)
+                    bullets.kill(eb)
+
+        boss = self.boss
+        if boss:
+            boss.hp -= 90
+            self.score += 10
+            if boss.hp <= 0:
+                self._defeat_boss()
+
+    def maybe_spawn_boss(self):
+        if self.boss is None and self.score >= self.spawn_boss_at:
+            self.boss = Boss(self)
+
+    # ---- numpy bullet store (bullet_store="numpy") ----
+    def _steer_row(self, owner, cx, cy, vx, vy, speed, turn_rate):
+        target = _homing_target(self, owner, cx, cy)
+        if target:
+            return _steer(target, cx, cy, vx, vy, speed, turn_rate)
+        return None
+
+    def _clear_enemy_bullets_soa(self):
+        store = self.bullets
+        n = store.n
+        mask = store.owner[:n] == bulletstore.OWNER_ENEMY
+        idx = np.flatnonzero(mask)
+        if not len(idx):
+            return
+        xs = (store.x[idx] + store.w[idx]/2).tolist()
+        ys = (store.y[idx] + store.h[idx]/2).tolist()
+        for x, y in zip(xs, ys):
+            self.add_explosion(x, y)
+        store.compact(~mask)
+
+    def _collide_bullets_soa(self):
+        """Both bullet collision passes against the array store.
+
+        Overlaps are computed for all player bullets x enemies at once; only
+        bullets that actually touch something fall back to Python, in spawn
+        order, so the outcome matches the object path.
+        """
+        store = self.bullets
+        n = store.n
+        if not n:
+            return
+        player = self.player
+        enemies = self.enemies
+        x = store.x[:n]; y = store.y[:n]; w = store.w[:n]; h = store.h[:n]
+        owner = store.owner[:n]; damage = store.damage[:n]
+        dead = np.zeros(n, dtype=bool)
+
+        pidx = np.flatnonzero(owner == bulletstore.OWNER_PLAYER)
+        boss = self.boss
+        targets = [e for e in enemies if not e.dead]
+        if len(pidx) and (targets or boss):
+            px = x[pidx]; py = y[pidx]; pw = w[pidx]; ph = h[pidx]
+            px1 = px + pw; py1 = py + ph
+            if targets:
+                m = len(targets)
+                ex = np.fromiter((e.x for e in targets), np.float64, m)
+                ey = np.fromiter((e.y for e in targets), np.float64, m)
+                ex1 = ex + np.fromiter((e.w for e in targets), np.float64, m)
+                ey1 = ey + np.fromiter((e.h for e in targets), np.float64, m)
+                overlap = ((px[:, None] < ex1) & (px1[:, None] > ex)
+                           & (py[:, None] < ey1) & (py1[:, None] > ey))
+                hit_enemy = overlap.any(axis=1)
+            else:
+                overlap = None
+                hit_enemy = np.zeros(len(pidx), dtype=bool)
+            if boss:
+                hit_boss = ((px < boss.x + boss.w) & (px1 > boss.x)
+                            & (py < boss.y + boss.h) & (py1 > boss.y))
+            else:
+                hit_boss = np.zeros(len(pidx), dtype=bool)
+
+            for k in np.flatnonzero(hit_enemy | hit_boss).tolist():
+                i = int(pidx[k])
+                bx = float(x[i]); by = float(y[i]); dmg = int(damage[i])
+                if hit_enemy[k]:
+                    for j in np.flatnonzero(overlap[k]).tolist():
+                        e = targets[j]
+                        if e.hp <= 0:
+                            continue  # already destroyed earlier in this pass
+                        self.add_explosion(bx, by)
+                        self.sound("boom", 0.25)
+                        dead[i] = True; e.hp -= dmg
+                        if e.hp<=0:
+                            self.score += 10 if e.kind=="small" else 25
+                            if self.rng.random()<0.25: self.spawn_power(e.x+e.w/2, e.y+e.h/2)
+                            enemies.kill(e)
+                        break
+                boss = self.boss
+                if boss and hit_boss[k]:
+                    self.add_explosion(bx, by)
+                    self.sound("boom2", 0.25)
+                    dead[i] = True
+                    boss.hp -= dmg
+                    self.score += 2
+
+                    if boss.hp <= 0:
+                        self._defeat_boss()
+
+        # Enemy bullets vs player: centre inside the player's hit circle
+        eidx = np.flatnonzero(owner == bulletstore.OWNER_ENEMY)
+        if len(eidx):
+            pcx, pcy = _obj_center(player)
+            dx = (x[eidx] + w[eidx] / 2) - pcx
+            dy = (y[eidx] + h[eidx] / 2) - pcy
+            r = PLAYER_HIT_RADIUS
+            for i in eidx[dx*dx + dy*dy <= r*r].tolist():
+                damaged = player.hit(int(damage[i]))
+                dead[i] = True
+                if damaged:
+                    self.add_explosion(player.x+player.w/2, player.y+player.h/2)
+                    self.sound("boom", 0.25)
+                    self.shake = 8
+
+        if dead.any():
+            store.compact(~dead)
+
+    # ---- frame ----
+    # Order in which step() runs the _phase_* methods; tools/bench.py and
+    # step(timings=...) report cost under these names.
+    PHASES = ("player", "spawn", "enemies", "bullets", "powers", "collisions", "pickups", "effects", "compact")
+
+    def save_positions(self):
+        """Copy every position into ``px``/``py``.
+
+        A renderer running faster than the fixed step calls this before the
+        last step() of a frame and draws ``p + (x - p) * alpha``.  Entities
+        spawned during that step start with ``px, py == x, y``.
+        """
+        player = self.player
+        player.px = player.x; player.py = player.y
+        boss = self.boss
+        if boss:
+            boss.px = boss.x; boss.py = boss.y
+        for e in self.enemies:
+            e.px = e.x; e.py = e.y
+        for p in self.powers:
+            p.px = p.x; p.py = p.y
+        if self._soa:
+            self.bullets.save_positions()
+        else:
+            for b in self.bullets:
+                b.px = b.x; b.py = b.y
+
+    def step(self, inputs=None, timings=None):
+        """Advance the simulation by one tick.
+
+        ``inputs`` maps the arrow key names (``"ArrowLeft"`` ...) to booleans
+        and may carry ``"pointer": (x, y)`` to centre the player on a
+        touch/mouse position before moving.  If ``timings`` is a dict, the
+        seconds spent in each phase are added to it under the phase name.
+        """
+        if self.game_over:
+            return
+        if timings is None:
+            for _name, phase in self._phases:
+                phase(inputs)
+        else:
+            clock = time.perf_counter
+            for name, phase in self._phases:
+                t0 = clock()
+                phase(inputs)
+                timings[name] = timings.get(name, 0.0) + (clock() - t0)
+
+        self.frame += 1
+        self.score += 0.03  # time bonus
+
+        if self.player.hp <= 0:
+            self.game_over = True
+
+    def _phase_player(self, inputs):
+        player = self.player
+        # Player move: pointer first, then keys
+        if inputs:
+            pointer = inputs.get("pointer")
+            if pointer is not None:
+                self.move_player_to(pointer[0], pointer[1])
+            dx = (inputs.get("ArrowRight", False)-inputs.get("ArrowLeft", False))*player.speed
+            dy = (inputs.get("ArrowDown", False)-inputs.get("ArrowUp", False))*player.speed
+            player.x = clamp(player.x+dx, 0, self.width-player.w)
+            player.y = clamp(player.y+dy, 0, self.height-player.h)
+
+        # Shooting：自动连射（无需按键）
+        player.shoot(self)
+        if player.shoot_cd > 0:
+            player.shoot_cd -= 1
+        if player.shield > 0:
+            player.shield -= 1
+        self.run_clear_wave()
+
+    def _phase_spawn(self, inputs):
+        self.maybe_spawn_boss()
+        # The boss moves (and fires) before the enemy spawn roll.
+        if self.boss:
+            self.boss.update(self)
+        if self.rng.random() < self.params.enemy_rate:
+            if self.boss is None:
+                self.spawn_enemy()
+            else:
+                if self.selected_diff == "easy":
+                    pass
+                elif self.selected_diff == "normal":
+                    if len(self.enemies) < MAX_ENEMIES:
+                        self.enemies.append(self._enemy_pool.acquire().spawn(self, "small"))
+                else:
+                    self.spawn_enemy()
+
+    def _phase_enemies(self, inputs):
+        enemies = self.enemies
+        limit = self.height + 40
+        for e in enemies:
+            if e.dead:
+                continue
+            e.update(self)
+            if e.y > limit:
+                enemies.kill(e)
+
+    def _phase_bullets(self, inputs):
+        bullets = self.bullets
+        if self._soa:
+            bullets.step(self.width, self.height, self._steer_row)
+            return
+        width = self.width
+        height = self.height
+        for b in bullets:
+            if b.dead:
+                continue
+            b.update(self)
+            if b.ttl == 0 and b.bullet_type == "laser":
+                bullets.kill(b)
+                continue
+            if b.y<-40 or b.y>height+40 or b.x<-40 or b.x>width+40:
+                bullets.kill(b)
+
+    def _phase_collisions(self, inputs):
+        player = self.player
+        enemies = self.enemies
+        # One enemy grid per frame serves the bullet pass and the body pass.
+        egrid = self._enemy_grid
+        egrid.build(e for e in enemies if not e.dead)
+        if self._soa:
+            self._collide_bullets_soa()
+        else:
+            self._collide_bullets()
+
+        # Enemy body vs player
+        eitems = egrid.items
+        qx, qy, qs = self._player_hit_box()
+        for i in egrid.query(qx, qy, qs, qs):
+            e = eitems[i]
+            if e.hp <= 0:
+                continue
+            if self.player_center_hit(e):
+                damaged = player.hit(25)
+                enemies.kill(e)
+                if damaged:
+                    self.add_explosion(player.x+player.w/2, player.y+player.h/2)
+                    self.sound("boom", 0.25)
+                    self.shake = 10
+
+    def _player_hit_box(self):
+        # Player hit circle as a query square: anything whose centre lies in
+        # the circle has its box overlapping this square.
+        r = PLAYER_HIT_RADIUS
+        pcx, pcy = _obj_center(self.player)
+        return pcx - r, pcy - r, 2 * r
+
+    def _collide_bullets(self):
+        player = self.player
+        enemies = self.enemies
+        bullets = self.bullets
+
+        # Player bullets vs enemies/boss: each bullet only meets the enemies
+        # sharing its grid cells, in the same order as the enemy list.
+        egrid = self._enemy_grid
+        eitems = egrid.items
+        query = egrid.query
+        for b in bullets:
+            if b.dead or b.owner != "player":
+                continue
+            for i in query(b.x, b.y, b.w, b.h):
+                e = eitems[i]
+                if e.hp <= 0:
+                    continue  # already destroyed earlier in this pass
+                if rects_collide(b, e):
+                    self.add_explosion(b.x, b.y)
+                    self.sound("boom", 0.25)
+                    bullets.kill(b); e.hp -= b.damage
+                    if e.hp<=0:
+                        self.score += 10 if e.kind=="small" else 25
+                        if self.rng.random()<0.25: self.spawn_power(e.x+e.w/2, e.y+e.h/2)
+                        enemies.kill(e)
+                    break
+            boss = self.boss
+            if boss and rects_collide(b, boss):
+                self.add_explosion(b.x, b.y)
+                self.sound("boom2", 0.25)
+                bullets.kill(b)
+                boss.hp -= b.damage
+                self.score += 2
+
+                if boss.hp <= 0:
+                    self._defeat_boss()
+
+        # Enemy bullets vs player
+        qx, qy, qs = self._player_hit_box()
+        bgrid = self._bullet_grid
+        bgrid.build(bb for bb in bullets if bb.owner=="enemy" and not bb.dead)
+        bitems = bgrid.items
+        for i in bgrid.query(qx, qy, qs, qs):
+            b = bitems[i]
+            if self.player_center_hit(b):
+                damaged = player.hit(b.damage)
+                bullets.kill(b)
+                if damaged:
+                    self.add_explosion(player.x+player.w/2, player.y+player.h/2)
+                    self.sound("boom", 0.25)
+                    self.shake = 8
+
+    def _phase_powers(self, inputs):
+        # Power-ups move before collisions: one dropped this tick stays put until the next.
+        powers = self.powers
+        limit = self.height + 40
+        for p in powers:
+            if p.dead:
+                continue
+            p.update()
+            if p.y > limit:
+                powers.kill(p)
+
+    def _phase_pickups(self, inputs):
+        player = self.player
+        powers = self.powers
+        pgrid = self._power_grid
+        pgrid.build(p for p in powers if not p.dead)
+        pitems = pgrid.items
+        for i in pgrid.query(player.x, player.y, player.w, player.h):
+            p = pitems[i]
+            if rects_collide(p, player):
+                self.sound("pickup", 0.35)
+                if p.kind == "weapon":
+                    if player.weapon == "single":
+                        player.weapon = "twin"
+                        _apply_tier_sprite(player)
+                    elif player.weapon == "twin":
+                        player.weapon = "spread"
+                        _apply_tier_sprite(player)
+                    else:
+                        self.trigger_clear_wave()
+                elif p.kind=="shield":
+                    player.shield = 300
+                else:
+                    player.hp = min(100, player.hp+30)
+                powers.kill(p)
+
+    def _phase_effects(self, inputs):
+        effects = self.effects
+        for fx in effects:
+            fx.update()
+        effects.expire(_effect_done)
+
+        if self.shake>0:
+            self.shake -= 1
+
+    def _phase_compact(self, inputs):
+        # Everything killed this frame leaves the live lists here, in one
+        # order-preserving pass per list, and goes back to its pool.
+        self.enemies.compact()
+        self.powers.compact()
+        if not self._soa:
+            self.bullets.compact()